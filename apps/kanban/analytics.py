@@ -0,0 +1,316 @@
+"""
+Throughput, velocity, burndown and cycle time of a board, in time bins.
+
+A card is done at its end_time once that has passed, or when it was created
+if it was entered already done, and its cycle time runs from start_time to
+end_time. Archived cards and those moved to the archive tier count too,
+these are charts of the board's history.
+
+The columns a chart needs are read in one pass with values_list, already
+turned into epoch seconds and floats by the database, into NumPy arrays,
+or array.array when NumPy is not installed. Each series is then a few
+whole-array operations: the columns are sorted by creation and by done
+time, running sums answer "how much was done before t" for any t and one
+binary search per bin edge finds where the bins fall. Python loops over
+bins, never over cards. Results are cached under the board's snapshot
+version, so they go with its snapshots whenever a card on it changes.
+"""
+import bisect
+import hashlib
+import math
+from array import array
+from datetime import datetime, time, timedelta
+from itertools import accumulate, chain
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Func, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import ArchivedCard, Card
+from .snapshots import board_version, get_cache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BINS = ('day', 'week', 'month')
+MAX_BINS = 400
+# range of a request naming neither end
+DEFAULT_DAYS = 90
+PERCENTILES = (50, 85, 95)
+# done time of the cards that are not
+NEVER = float('inf')
+
+
+class Epoch(Func):
+    """A datetime as seconds since 1970, in a float."""
+    function = 'EPOCH'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)',
+            **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='EXTRACT(EPOCH FROM %(expressions)s)', **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template='UNIX_TIMESTAMP(%(expressions)s)',
+            **extra_context
+        )
+
+
+def number(field):
+    # decimals as floats, a missing value as 0
+    return Coalesce(Cast(field, FloatField()), Value(0.0))
+
+
+def card_rows(board_id, since, now):
+    """
+    (created, done, cycle time, complexity, hours) of the board's cards,
+    times in seconds, leaving out those done before since: they are in no
+    bin and cancel out of the burndown. done is infinite for cards not
+    done by now and the cycle time -1 for those that never started.
+    """
+    before = min(since, now)
+
+    def rows(queryset):
+        return (
+            queryset.filter(container__board=board_id)
+            .exclude(created_time__lt=before, end_time__lt=before)
+            .annotate(
+                created=Epoch('created_time'),
+                done=Case(
+                    When(end_time__lte=now, then=Greatest(
+                        Epoch('created_time'), Epoch('end_time')
+                    )),
+                    default=Value(NEVER), output_field=FloatField()
+                ),
+                cycle=Coalesce(
+                    Epoch('end_time') - Epoch('start_time'), Value(-1.0)
+                ),
+                points=number('complexity'), worked=number('hours')
+            )
+            .values_list('created', 'done', 'cycle', 'points', 'worked')
+            .order_by()
+        )
+    return rows(Card.objects).union(rows(ArchivedCard.objects), all=True)
+
+
+def columns(queryset, width) -> list:
+    """
+    The columns of a values_list queryset as arrays of floats. It is run
+    on a plain cursor, the values are floats already and Django's per-row
+    converters would take longer than the rest of the work together.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        values = chain.from_iterable(cursor.fetchall())
+    if numpy is not None:
+        flat = numpy.fromiter(values, dtype=float)
+    else:
+        flat = array('d', values)
+    return [flat[i::width] for i in range(width)]
+
+
+def sort_by(key, *values) -> list:
+    """key sorted and values put in the same order."""
+    if numpy is not None:
+        order = numpy.argsort(key)
+        return [column[order] for column in (key, *values)]
+    order = sorted(range(len(key)), key=key.__getitem__)
+    return [
+        array('d', map(column.__getitem__, order))
+        for column in (key, *values)
+    ]
+
+
+def running_sums(values):
+    """sums[i] is the total of values[:i]."""
+    if numpy is not None:
+        return numpy.concatenate(([0.0], numpy.cumsum(values)))
+    return array('d', accumulate(values, initial=0.0))
+
+
+def positions(ordered, edges) -> list:
+    """How many of the sorted values fall before each edge."""
+    if numpy is not None:
+        return numpy.searchsorted(ordered, edges).tolist()
+    return [bisect.bisect_left(ordered, edge) for edge in edges]
+
+
+def started(cycles):
+    """The known cycle times, sorted."""
+    if numpy is not None:
+        return numpy.sort(cycles[cycles >= 0])
+    return sorted(filter((0.0).__le__, cycles))
+
+
+def percentile(ordered, q):
+    """The q-th percentile of sorted values, interpolated as NumPy does."""
+    if not len(ordered):
+        return None
+    at = (len(ordered) - 1) * q / 100
+    low, high = math.floor(at), math.ceil(at)
+    return float(
+        ordered[low] + (ordered[high] - ordered[low]) * (at - low)
+    )
+
+
+def mean(ordered):
+    if not len(ordered):
+        return None
+    if numpy is not None:
+        return float(ordered.mean())
+    return math.fsum(ordered) / len(ordered)
+
+
+def amount(value):
+    return round(float(value), 4)
+
+
+def in_hours(seconds):
+    return None if seconds is None else round(seconds / 3600, 2)
+
+
+def bin_starts(since, until, size) -> list:
+    """The first day of every bin from since's to until's, and of the next."""
+    if size == 'week':
+        since -= timedelta(days=since.weekday())
+    elif size == 'month':
+        since = since.replace(day=1)
+    starts = [since]
+    while starts[-1] <= until:
+        day = starts[-1]
+        if size == 'day':
+            day += timedelta(days=1)
+        elif size == 'week':
+            day += timedelta(weeks=1)
+        else:
+            day = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        starts.append(day)
+        if len(starts) > MAX_BINS + 1:
+            raise ValueError(f'ask for at most {MAX_BINS} bins')
+    return starts
+
+
+def parse_day(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'{name} must be a date as YYYY-MM-DD')
+    return day
+
+
+def parse_range(params) -> tuple:
+    """
+    (since, until, bin) of a request's ?since=, ?until= and ?bin=, raising
+    ValueError with a message for the client on bad values.
+    """
+    size = params.get('bin', 'week')
+    if size not in BINS:
+        raise ValueError(f'bin must be one of {", ".join(BINS)}')
+    until = parse_day(params, 'until') or timezone.localdate()
+    since = (
+        parse_day(params, 'since') or until - timedelta(days=DEFAULT_DAYS - 1)
+    )
+    if since > until:
+        raise ValueError('since must not be after until')
+    return since, until, size
+
+
+def board_analytics(board_id, since, until, size, now=None) -> dict:
+    """Compute the series of the board, one value per bin."""
+    now = now or timezone.now()
+    starts = bin_starts(since, until, size)
+    bounds = [
+        timezone.make_aware(datetime.combine(day, time.min))
+        for day in starts
+    ]
+    edges = [bound.timestamp() for bound in bounds]
+    created, done, cycles, points, worked = columns(
+        card_rows(board_id, bounds[0], now), 5
+    )
+    created, scope = sort_by(created, points)
+    done, cycles, points, worked = sort_by(done, cycles, points, worked)
+
+    done_at = positions(done, edges)
+    created_at = positions(created, edges)
+    done_points, done_hours, scope_points = (
+        running_sums(values) for values in (points, worked, scope)
+    )
+    throughput, velocity, hours_worked, cycle_time = [], [], [], []
+    remaining, remaining_points = [], []
+    for i in range(len(starts) - 1):
+        first, last = done_at[i], done_at[i + 1]
+        throughput.append(last - first)
+        velocity.append(amount(done_points[last] - done_points[first]))
+        hours_worked.append(amount(done_hours[last] - done_hours[first]))
+        cycle_time.append(
+            in_hours(percentile(started(cycles[first:last]), 50))
+        )
+        # open at the end of the bin: created before it and not yet done
+        remaining.append(created_at[i + 1] - last)
+        remaining_points.append(
+            amount(scope_points[created_at[i + 1]] - done_points[last])
+        )
+    ordered = started(cycles[done_at[0]:done_at[-1]])
+    return {
+        'board': board_id,
+        'bin': size,
+        'since': since.isoformat(),
+        'until': until.isoformat(),
+        'bins': [day.isoformat() for day in starts[:-1]],
+        'throughput': throughput,
+        'velocity': velocity,
+        'hours': hours_worked,
+        'burndown': {'cards': remaining, 'complexity': remaining_points},
+        'cycle_time': cycle_time,
+        'cycle_time_summary': {
+            'cards': len(ordered),
+            'mean': in_hours(mean(ordered)),
+            **{
+                f'p{q}': in_hours(percentile(ordered, q))
+                for q in PERCENTILES
+            },
+        },
+    }
+
+
+def get_analytics(board_id, since, until, size) -> tuple:
+    """
+    Return (data, hit), computing the series on a miss. Entries live under
+    the board's snapshot version and for KANBAN_ANALYTICS_TIMEOUT seconds
+    at most, since cards become done as their end_time passes.
+    """
+    cache = get_cache()
+    variant = hashlib.sha1(
+        f'{since}|{until}|{size}'.encode()
+    ).hexdigest()[:16]
+    key = (
+        f'kanban:board:{board_id}:analytics:'
+        f'{board_version(board_id)}:{variant}'
+    )
+    data = cache.get(key)
+    if data is not None:
+        return data, True
+    data = board_analytics(board_id, since, until, size)
+    cache.set(key, data, getattr(settings, 'KANBAN_ANALYTICS_TIMEOUT', 300))
+    return data, False
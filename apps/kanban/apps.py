@@ -2,4 +2,9 @@ from django.apps import AppConfig
 
 
 class KanbanConfig(AppConfig):
-    name = 'kanban'
+    name = 'apps.kanban'
+    label = 'kanban'
+
+    def ready(self):
+        from . import signals
+        signals.connect()
@@ -0,0 +1,93 @@
+"""
+The archive tier for cards.
+
+Archived cards are only ever listed by the archive endpoint, yet they stay
+in the card table and every container scan, position rebalance and index
+lookup steps over them. compact_archives moves them, with their m2m links,
+into ArchivedCard a batch at a time; restore_card brings one back.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedCard, Card
+from .search import get_backend
+
+# the Card columns an ArchivedCard keeps
+CARD_FIELDS = [
+    'id', 'slug', 'container_id', 'name', 'content', 'start_time',
+    'end_time', 'complexity', 'hours', 'position', 'created_by_id',
+    'created_time', 'changed_by_id', 'changed_time', 'archived_by_id',
+    'archived_time',
+]
+
+
+def link_tables():
+    """(field name, through model, card column, related column) per m2m."""
+    return [
+        (
+            field.name, field.remote_field.through,
+            f'{field.m2m_field_name()}_id',
+            f'{field.m2m_reverse_field_name()}_id',
+        )
+        for field in Card._meta.many_to_many
+    ]
+
+
+def compact_cards(card_ids) -> int:
+    """
+    Move the archived cards among card_ids to the archive tier, in one
+    transaction with a few queries. Returns the number moved.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            Card.objects
+            .select_for_update()
+            .filter(pk__in=card_ids, archived=True)
+            .values(*CARD_FIELDS)
+        )
+        ids = [row['id'] for row in rows]
+        links = {card_id: {} for card_id in ids}
+        for name, through, card_column, related_column in link_tables():
+            pairs = through.objects.filter(**{f'{card_column}__in': ids})
+            for card_id, related_id in pairs.values_list(
+                    card_column, related_column):
+                links[card_id].setdefault(name, []).append(related_id)
+            pairs.delete()
+        ArchivedCard.objects.bulk_create([
+            ArchivedCard(
+                **dict(row, archived_time=row['archived_time'] or now),
+                links=links[row['id']]
+            )
+            for row in rows
+        ])
+        # the cards are moved rather than deleted, skip the delete signals
+        # that would record tombstones and tell boards they were deleted
+        cards = Card.objects.filter(pk__in=ids)
+        cards._raw_delete(cards.db)
+        get_backend().remove(ids)
+    return len(ids)
+
+
+def restore_card(archived, user=None) -> Card:
+    """
+    Move an ArchivedCard back to the card table, unarchived and appended
+    to its container. Links to rows deleted since are dropped.
+    """
+    with transaction.atomic():
+        card = Card(**{
+            field: getattr(archived, field) for field in CARD_FIELDS
+        })
+        card.archived, card.archived_by, card.archived_time = \
+            False, None, None
+        card.changed_by = user
+        # its old place may have been taken since
+        card.position = None
+        card.save(force_insert=True)
+        for name, through, card_column, related_column in link_tables():
+            related = Card._meta.get_field(name).related_model
+            getattr(card, name).add(*related._base_manager.filter(
+                pk__in=archived.links.get(name, [])
+            ))
+        archived.delete()
+    return card
@@ -0,0 +1,75 @@
+"""
+Async entry points for the read endpoints, served under /async/.
+
+These are not a throughput improvement. Django 3.1 has no async ORM and
+DRF 3.12 no async views, so each view here is the sync view run on a worker
+thread with its own connection; nothing awaits the database. Under an ASGI
+server Django 3.1 runs sync views on one shared thread, and moving the view
+off it lets a few requests waiting on a slow database overlap. Every
+request still makes its sync middleware hops on that thread though, and
+under many connections those queue up: bench_async measures the /async/
+routes at or below the sync ones from 100 connections on. AsyncNormalizedView
+also queries and serializes its entity lists concurrently.
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import close_old_connections
+
+from .flat import flat_data, wants_flat
+from .serializers import FLAT_SERIALIZERS
+from .views import NormalizedView
+
+
+def to_thread(func, *args, **kwargs):
+    """
+    Await func on a worker thread. Worker threads outlive the request that
+    used them, so afterwards the thread's connections are closed as at the
+    end of a request: when broken or older than CONN_MAX_AGE.
+    """
+    def run():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+def async_view(view):
+    """Serve a sync view, rendered on a worker thread, as an async view."""
+    def render(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await to_thread(render, request, *args, **kwargs)
+
+    return wrapper
+
+
+def serialize_entity(request, serializer_class, key, value):
+    """Render one entry of a payload, as serialize_entities would."""
+    if wants_flat(request):
+        return flat_data({key: value}, FLAT_SERIALIZERS)[key]
+    field = serializer_class(context={'request': request}).fields[key]
+    return field.to_representation(value)
+
+
+class AsyncNormalizedView(NormalizedView):
+    """NormalizedView rendering each entity list on its own thread."""
+
+    def serialize(self, request, entities, serializer_class):
+        async def gather():
+            return await asyncio.gather(*[
+                to_thread(
+                    serialize_entity, request, serializer_class, key, value
+                )
+                for key, value in entities.items()
+            ])
+
+        return dict(zip(entities, async_to_sync(gather)()))
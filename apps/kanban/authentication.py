@@ -0,0 +1,123 @@
+"""
+JWT authentication with a cached user lookup.
+
+JWTAuthentication loads the token's user from the database on every
+request. CachedJWTAuthentication keeps recently seen users in a bounded
+in-process LRU with a short lifetime, optionally backed by a shared cache
+(KANBAN_USER_CACHE) so a worker's first request for a user skips the
+database too. Saving or deleting a user drops it from both; another
+process's in-process copy lives at most KANBAN_USER_CACHE_TIMEOUT seconds.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserCache:
+    """A thread-safe LRU of users by id whose entries expire."""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.users = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self.users[user_id]
+                return None
+            self.users.move_to_end(user_id)
+            return user
+
+    def set(self, user_id, user):
+        with self.lock:
+            self.users[user_id] = (user, time.monotonic() + self.timeout)
+            self.users.move_to_end(user_id)
+            while len(self.users) > self.size:
+                self.users.popitem(last=False)
+
+    def delete(self, user_id):
+        with self.lock:
+            self.users.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.users.clear()
+
+
+_users = UserCache(
+    getattr(settings, 'KANBAN_USER_CACHE_SIZE', 1024),
+    getattr(settings, 'KANBAN_USER_CACHE_TIMEOUT', 60),
+)
+
+
+def shared_cache():
+    """The shared cache backing the LRU, or None if there is none."""
+    alias = getattr(settings, 'KANBAN_USER_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def user_key(user_id) -> str:
+    return f'kanban:user:{user_id}'
+
+
+def get_cached_user(user_id):
+    user = _users.get(user_id)
+    if user is None and shared_cache() is not None:
+        user = shared_cache().get(user_key(user_id))
+        if user is not None:
+            _users.set(user_id, user)
+    return user
+
+
+def cache_user(user_id, user):
+    _users.set(user_id, user)
+    if shared_cache() is not None:
+        shared_cache().set(
+            user_key(user_id), user, _users.timeout
+        )
+
+
+def invalidate_user(user_id) -> None:
+    """
+    Forget a user now and again once the write commits, so a request
+    reading the old row in between cannot cache it for long.
+    """
+    def forget():
+        _users.delete(user_id)
+        if shared_cache() is not None:
+            shared_cache().delete(user_key(user_id))
+
+    forget()
+    transaction.on_commit(forget)
+
+
+def clear_user_cache() -> None:
+    """Empty this process's LRU, the shared cache is left alone."""
+    _users.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication resolving the token's user through the cache."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = get_cached_user(user_id) if user_id is not None else None
+        if user is None:
+            # validates the claim and rejects missing or inactive users
+            user = super().get_user(validated_token)
+            cache_user(user_id, user)
+        # each request gets its own instance to modify
+        return copy.copy(user)
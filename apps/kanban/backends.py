@@ -0,0 +1,40 @@
+"""Authentication backends."""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+from .hashing import HashingBusy, check_password, hash_password
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend checking passwords on the hashing pool. When the pool is
+    full the login is refused with PermissionDenied, which authenticate()
+    turns into a failed login, and HashingBusy is left on the request for
+    the API to answer with a 429.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        try:
+            return self.check_credentials(username, password, **kwargs)
+        except HashingBusy as busy:
+            if request is not None:
+                request._kanban_hashing_busy = busy
+            raise PermissionDenied(str(busy))
+
+    def check_credentials(self, username, password, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # hash anyway so unknown usernames take as long (Django #20760)
+            hash_password(password)
+            return None
+        if check_password(user, password) and \
+                self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,97 @@
+"""
+Cheap version tags for conditional GETs.
+
+A set of rows is fingerprinted by its row count and latest changed_time:
+every insert or update moves the latest time forward and every delete
+lowers the count, so the pair changes whenever the set does. Tags are
+computed with aggregate queries only, no serializer runs.
+"""
+import hashlib
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, Max, Q
+
+from .flat import wants_flat
+from .models import Attachment, Board, Card, Container, Label, Member, Tag
+from .permissions import accessible_board_ids
+
+
+def fingerprint(*parts) -> str:
+    """Return a quoted strong ETag for the given parts."""
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def summarize(queryset, filters, field='changed_time') -> tuple:
+    """Return (count, latest field) for each filter, in a single query."""
+    aggregates = {}
+    for i, condition in enumerate(filters):
+        aggregates[f'count_{i}'] = Count('id', filter=condition)
+        aggregates[f'latest_{i}'] = Max(field, filter=condition)
+    result = queryset.filter(reduce(or_, filters)).aggregate(**aggregates)
+    return tuple(
+        (result[f'count_{i}'], result[f'latest_{i}'])
+        for i in range(len(filters))
+    )
+
+
+def request_parts(request) -> tuple:
+    """The parts of a request that change the rendered body."""
+    return (
+        request.build_absolute_uri('/'), request.accepted_renderer.format,
+        wants_flat(request)
+    )
+
+
+def normalized_etag(request) -> str:
+    """Version tag of everything NormalizedView renders for a user."""
+    user = request.user
+    board_ids = accessible_board_ids(request)
+    mine = Q(created_by=user)
+    on_my_boards = Q(board__created_by=user)
+    reachable = Q(board__in=board_ids)
+    return fingerprint(
+        request_parts(request),
+        (user.pk, user.username, user.first_name, user.last_name,
+         user.email, user.is_staff, user.is_active),
+        sorted(board_ids),
+        summarize(Board.live.all(), [mine]),
+        summarize(Container.live.all(), [mine & reachable, on_my_boards]),
+        summarize(
+            Card.live.all(),
+            [mine & Q(container__board__in=board_ids),
+             Q(container__created_by=user)]
+        ),
+        summarize(Label.objects.all(), [reachable]),
+        summarize(
+            Attachment.objects.all(),
+            [Q(uploaded_by=user) & reachable, on_my_boards],
+            field='uploaded_time'
+        ),
+        summarize(Member.objects.all(), [Q(user=user), on_my_boards]),
+        summarize(Tag.objects.all(), [Q(user=user)]),
+    )
+
+
+def board_etag(request, queryset, pk):
+    """Version tag of one board and its related lists, None if missing."""
+    ((count, latest),) = summarize(queryset, [Q(pk=pk)])
+    if not count:
+        return None
+    on_board = [Q(board__pk=pk)]
+    return fingerprint(
+        request_parts(request), pk, latest,
+        summarize(Container.live.all(), on_board),
+        summarize(Label.objects.all(), on_board),
+        summarize(Attachment.objects.all(), on_board, field='uploaded_time'),
+        summarize(Member.objects.all(), on_board),
+    )
+
+
+def card_etag(request, queryset, pk):
+    """Version tag of one card, None if missing."""
+    ((count, latest),) = summarize(queryset, [Q(pk=pk)])
+    if not count:
+        return None
+    return fingerprint(request_parts(request), pk, latest)
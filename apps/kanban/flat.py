@@ -0,0 +1,164 @@
+"""
+Flat serializers for bulk reads.
+
+Rows are built straight from values_list() tuples, with relations rendered
+as primary keys, and each many relation costs one query on its link table.
+DRF's field machinery never runs and no url is reversed, which is what
+dominates rendering thousands of hyperlinked rows. Field names and value
+formats match the hyperlinked serializers, less their url.
+
+Clients opt in with ?flat=true or an Accept media type parameter, e.g.
+`Accept: application/json; flat=true`.
+"""
+from datetime import datetime
+from decimal import Decimal
+from functools import partial
+from itertools import islice
+
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework.settings import api_settings
+
+FLAT_PARAM = 'flat'
+TRUE_VALUES = ('true', '1')
+
+
+def wants_flat(request) -> bool:
+    """True when a request asks for flat rows, by query param or Accept."""
+    if request is None:
+        return False
+    if request.query_params.get(FLAT_PARAM) in TRUE_VALUES:
+        return True
+    media_type = getattr(request, 'accepted_media_type', None) or ''
+    for param in media_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip() == FLAT_PARAM:
+            return value.strip().strip('"') in TRUE_VALUES
+    return False
+
+
+def format_datetime(value, tz=None) -> str:
+    """
+    The ISO 8601 form DRF's DateTimeField renders, in tz or the current
+    time zone. Pass tz when formatting many values, looking it up is slow.
+    """
+    if timezone.is_aware(value):
+        value = value.astimezone(tz or timezone.get_current_timezone())
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def decimal_formatter(field):
+    """The string (or float) form DRF's DecimalField renders for field."""
+    exponent = Decimal(1).scaleb(-field.decimal_places)
+    if not api_settings.COERCE_DECIMAL_TO_STRING:
+        return lambda value: float(value.quantize(exponent))
+    return lambda value: '{:f}'.format(value.quantize(exponent))
+
+
+class FlatSerializer:
+    """
+    Render querysets of a hyperlinked serializer's model as plain dicts
+    with the same fields, relations as ids. Nothing is validated or saved.
+    """
+
+    def __init__(self, serializer_class):
+        meta = serializer_class.Meta
+        self.model = meta.model
+        self.columns = []
+        self.converters = []
+        self.relations = []
+        for name in meta.fields:
+            if name == 'url':
+                continue
+            field = self.model._meta.get_field(name)
+            if field.one_to_many or field.many_to_many:
+                self.relations.append((name, field))
+                continue
+            self.columns.append((name, field.attname))
+            internal_type = field.get_internal_type()
+            if internal_type == 'DateTimeField':
+                # None marks values that need the current time zone
+                self.converters.append((name, None))
+            elif internal_type == 'DecimalField':
+                self.converters.append((name, decimal_formatter(field)))
+
+    def related_ids(self, pks, field) -> dict:
+        """
+        Map each of pks, a list or a values('pk') subquery, to the ids of
+        field, in one query.
+        """
+        if field.many_to_many:
+            pairs = field.remote_field.through.objects.filter(**{
+                f'{field.m2m_field_name()}__in': pks
+            }).values_list(field.m2m_column_name(), field.m2m_reverse_name())
+        else:
+            # reverse foreign key, e.g. Board.containers
+            pairs = field.related_model._default_manager.filter(**{
+                f'{field.field.name}__in': pks
+            }).values_list(field.field.attname, 'pk')
+        ids = {}
+        for source, target in pairs.order_by(*pairs.query.values_select):
+            ids.setdefault(source, []).append(target)
+        return ids
+
+    def records(self, queryset):
+        return queryset.prefetch_related(None).values_list(
+            'pk', *[attname for _, attname in self.columns]
+        )
+
+    def build(self, records, pks) -> list:
+        """Turn values_list records into dicts, loading relations of pks."""
+        names = [name for name, _ in self.columns]
+        tz = timezone.get_current_timezone()
+        converters = [
+            (name, convert or partial(format_datetime, tz=tz))
+            for name, convert in self.converters
+        ]
+        relations = [
+            (name, self.related_ids(pks, field))
+            for name, field in self.relations
+        ]
+        result = []
+        for pk, *values in records:
+            row = dict(zip(names, values))
+            for name, convert in converters:
+                if row[name] is not None:
+                    row[name] = convert(row[name])
+            for name, ids in relations:
+                row[name] = ids.get(pk) or []
+            result.append(row)
+        return result
+
+    def rows(self, queryset) -> list:
+        return self.build(self.records(queryset), queryset.values('pk'))
+
+    def iter_rows(self, queryset, chunk_size):
+        """
+        Yield lists of at most chunk_size rows, reading the queryset with a
+        server side cursor so memory stays flat however many rows there are.
+        chunk_size also bounds the parameters of the relation queries.
+        """
+        records = self.records(queryset).iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                return
+            yield self.build(chunk, [record[0] for record in chunk])
+
+
+def flat_data(entities, serializers) -> dict:
+    """
+    Render a dict of querysets with the FlatSerializer of their model,
+    taken from serializers; other values are passed through as is.
+    """
+    data = {}
+    for key, value in entities.items():
+        if isinstance(value, QuerySet):
+            value = serializers[value.model].rows(value)
+        elif isinstance(value, datetime):
+            value = format_datetime(value)
+        data[key] = value
+    return data
@@ -0,0 +1,113 @@
+"""
+Password hashing off the request threads.
+
+Hashing a password costs tens of milliseconds of CPU by design, so a burst
+of signups or logins hashed on the web workers starves every other
+request. Here hashes run on a small process pool whose workers are
+niced, so the board APIs keep priority over them. Each web process allows
+KANBAN_HASHING_QUEUE_SIZE hashes in flight; a caller finding no room waits
+up to KANBAN_HASHING_WAIT seconds and then gets HashingBusy, which the API
+views answer with a 429. KANBAN_HASHING_WORKERS = 0 hashes inline, as
+Django does.
+
+Pool workers import this module before Django is set up, keep its imports
+free of models.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import get_context
+
+import django
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """Django's PBKDF2 hasher doing KANBAN_PBKDF2_ITERATIONS rounds."""
+
+    @property
+    def iterations(self):
+        return getattr(
+            settings, 'KANBAN_PBKDF2_ITERATIONS',
+            hashers.PBKDF2PasswordHasher.iterations
+        )
+
+
+class HashingBusy(Exception):
+    """No room on the pool within KANBAN_HASHING_WAIT, retry after wait."""
+
+    def __init__(self, wait):
+        super().__init__('Too many password checks in progress.')
+        self.wait = wait
+
+
+def init_worker(niceness):
+    if hasattr(os, 'nice'):
+        os.nice(niceness)
+    django.setup()
+
+
+@lru_cache(maxsize=None)
+def get_pool() -> ProcessPoolExecutor:
+    # spawned rather than forked, the web process may be running threads
+    return ProcessPoolExecutor(
+        max_workers=settings.KANBAN_HASHING_WORKERS,
+        mp_context=get_context('spawn'),
+        initializer=init_worker,
+        initargs=(getattr(settings, 'KANBAN_HASHING_NICE', 10),),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_slots() -> threading.BoundedSemaphore:
+    return threading.BoundedSemaphore(
+        getattr(settings, 'KANBAN_HASHING_QUEUE_SIZE', 16)
+    )
+
+
+def reset_pool() -> None:
+    """Stop the pool, the next hash starts one with the current settings."""
+    if get_pool.cache_info().currsize:
+        get_pool().shutdown()
+    get_pool.cache_clear()
+    get_slots.cache_clear()
+
+
+def run(func, *args):
+    """Call func(*args) on the pool, throttling callers beyond the queue."""
+    if not getattr(settings, 'KANBAN_HASHING_WORKERS', 0):
+        return func(*args)
+    wait = getattr(settings, 'KANBAN_HASHING_WAIT', 1)
+    slots = get_slots()
+    if not slots.acquire(timeout=wait):
+        raise HashingBusy(wait=max(wait, 1))
+    try:
+        return get_pool().submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def verify(password, encoded):
+    """check_password, returning (correct, whether to rehash)."""
+    rehash = []
+    correct = hashers.check_password(password, encoded, rehash.append)
+    return correct, bool(rehash)
+
+
+def hash_password(password) -> str:
+    """make_password on the pool."""
+    return run(hashers.make_password, password)
+
+
+def check_password(user, password) -> bool:
+    """
+    user.check_password on the pool. A hash made with outdated parameters
+    is upgraded, as Django does.
+    """
+    correct, rehash = run(verify, password, user.password)
+    if correct and rehash:
+        user.password = hash_password(password)
+        user.save(update_fields=['password'])
+    return correct
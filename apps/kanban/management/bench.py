@@ -0,0 +1,84 @@
+"""
+Throwaway data sets for the bench_* commands.
+
+A command seeds boards, containers and cards inside rolled_back(), measures
+and leaves nothing behind: the transaction is rolled back at the end.
+"""
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from ..models import POSITION_GAP, Board, Card, Container
+
+# cards written per bulk_create
+BATCH_SIZE = 5000
+ROLLED_BACK = 'Everything runs in one transaction that is rolled back.'
+
+
+class Rollback(Exception):
+    """Raised to throw the seeded rows away at the end of a run."""
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back."""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def add_seed_arguments(parser, boards=True):
+    """The size of the seeded data set, on one board unless boards."""
+    parser.add_argument('--cards', type=int, default=1000000)
+    parser.add_argument('--cards-per-container', type=int, default=500)
+    if boards:
+        parser.add_argument('--containers-per-board', type=int, default=10)
+
+
+def seed_containers(options, prefix, board_owner, created_by) -> list:
+    """
+    Create the containers options['cards'] cards need, on boards of
+    options['containers_per_board'] containers or on one board. board_owner
+    is called with a board's number for its creator. Returns the
+    containers in id order.
+    """
+    needed = -(-options['cards'] // options['cards_per_container'])
+    per_board = options.get('containers_per_board') or needed
+    Board.objects.bulk_create([
+        Board(name=f'board {b}', slug=f'{prefix}-board-{b}',
+              created_by=board_owner(b))
+        for b in range(-(-needed // per_board))
+    ])
+    boards = list(
+        Board.objects.filter(slug__startswith=f'{prefix}-board-')
+        .order_by('id')
+    )
+    Container.objects.bulk_create([
+        Container(board=boards[c // per_board], name=f'column {c}',
+                  slug=f'{prefix}-container-{c}', created_by=created_by,
+                  position=(c % per_board + 1) * POSITION_GAP)
+        for c in range(needed)
+    ])
+    return list(Container.objects.filter(board__in=boards).order_by('id'))
+
+
+def seed_cards(options, containers, fields) -> None:
+    """
+    Bulk create options['cards'] cards, options['cards_per_container'] to
+    each container in turn. fields is called with a card's number for the
+    rest of its fields.
+    """
+    per_container = options['cards_per_container']
+    batch = []
+    for i in range(options['cards']):
+        batch.append(Card(
+            container=containers[i // per_container],
+            position=(i % per_container + 1) * POSITION_GAP, **fields(i)
+        ))
+        if len(batch) == BATCH_SIZE:
+            Card.objects.bulk_create(batch)
+            batch = []
+    Card.objects.bulk_create(batch)
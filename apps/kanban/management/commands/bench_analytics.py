@@ -0,0 +1,168 @@
+import bisect
+import random
+import statistics
+import time
+from datetime import datetime, time as day_start, timedelta
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from ... import analytics
+from ...models import Card, KanBanUser
+from ...snapshots import get_cache
+from ..bench import (ROLLED_BACK, add_seed_arguments, rolled_back, seed_cards,
+                     seed_containers)
+
+
+def per_object(board, since, until, size, now):
+    """
+    Throughput, velocity and burndown the straightforward way, a Python loop
+    over card instances, to compare with and check analytics against.
+    """
+    starts = analytics.bin_starts(since, until, size)
+    edges = [
+        timezone.make_aware(datetime.combine(day, day_start.min))
+        for day in starts
+    ]
+    bins = len(starts) - 1
+    throughput, velocity = [0] * bins, [0.0] * bins
+    opened, closed = [0] * (bins + 2), [0] * (bins + 2)
+    cards = (
+        Card.objects.filter(container__board=board)
+        .only('created_time', 'end_time', 'complexity')
+        .iterator(chunk_size=2000)
+    )
+    for card in cards:
+        opened[bisect.bisect_right(edges, card.created_time)] += 1
+        if card.end_time is None or card.end_time > now:
+            continue
+        done = max(card.created_time, card.end_time)
+        i = bisect.bisect_right(edges, done) - 1
+        closed[i + 1] += 1
+        if 0 <= i < bins:
+            throughput[i] += 1
+            velocity[i] += float(card.complexity or 0)
+    # open at the end of bin i: created before edges[i + 1], not done by it
+    remaining = [
+        sum(opened[:i + 2]) - sum(closed[:i + 2]) for i in range(bins)
+    ]
+    return {
+        'throughput': throughput,
+        'velocity': [round(points, 4) for points in velocity],
+        'burndown': remaining,
+    }
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway board of cards spread over a year and time '
+            'its analytics: a per-object loop, the vectorized series with '
+            'NumPy and with array.array, and a cache hit. ' + ROLLED_BACK)
+
+    def add_arguments(self, parser):
+        add_seed_arguments(parser, boards=False)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            started = time.perf_counter()
+            self.seed(options)
+            self.stdout.write(
+                f'seeded {options["cards"]} cards in '
+                f'{time.perf_counter() - started:.1f}s'
+            )
+            self.report(options)
+
+    def seed(self, options):
+        owner = KanBanUser.objects.create(username='bench-analytics')
+        containers = seed_containers(
+            options, 'bench-analytics', lambda b: owner, owner
+        )
+        self.board = containers[0].board
+        rng = random.Random(0)
+        now = timezone.now()
+        span = options['days'] * 86400
+        created = []
+
+        def history(i):
+            born = now - timedelta(seconds=rng.uniform(0, span))
+            start = end = None
+            if rng.random() < 0.8:
+                start = born + timedelta(hours=rng.expovariate(1 / 48))
+                if rng.random() < 0.85:
+                    end = start + timedelta(hours=rng.expovariate(1 / 96))
+            created.append(born)
+            return {
+                'name': f'card {i}', 'slug': f'bench-analytics-card-{i}',
+                'created_by': owner, 'start_time': start, 'end_time': end,
+                'complexity': rng.choice((1, 2, 3, 5, 8, 13)),
+                'hours': round(rng.uniform(0.5, 16), 1),
+                'archived': i % 10 == 0,
+            }
+        seed_cards(options, containers, history)
+        # created_time is auto_now_add, backdate it by id
+        ids = (
+            Card.objects.filter(created_by=owner)
+            .order_by('id').values_list('id', flat=True)
+        )
+        adapt = connection.ops.adapt_datetimefield_value
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'UPDATE kanban_card SET created_time = %s WHERE id = %s',
+                [(adapt(born), pk) for born, pk in zip(created, ids)]
+            )
+
+    def timed(self, options, run):
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            result = run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
+
+    def report(self, options):
+        until = timezone.localdate()
+        since = until - timedelta(days=options['days'] - 1)
+        for size in ('day', 'week'):
+            self.stdout.write(f'\n== {since} to {until} by {size} ==')
+            # one now for all, cards become done as their end_time passes
+            now = timezone.now()
+            expected, loop = self.timed(
+                options,
+                lambda: per_object(self.board, since, until, size, now)
+            )
+            self.stdout.write(f'per-object loop: {loop:.0f}ms')
+            data, vectorized = self.timed(
+                options,
+                lambda: analytics.board_analytics(
+                    self.board.pk, since, until, size, now
+                )
+            )
+            self.stdout.write(f'vectorized, NumPy: {vectorized:.0f}ms')
+            with mock.patch.object(analytics, 'numpy', None):
+                fallback, plain = self.timed(
+                    options,
+                    lambda: analytics.board_analytics(
+                        self.board.pk, since, until, size, now
+                    )
+                )
+            self.stdout.write(f'vectorized, array.array: {plain:.0f}ms')
+            self.stdout.write(
+                'series agree: ' + str(
+                    data == fallback and
+                    data['throughput'] == expected['throughput'] and
+                    data['velocity'] == expected['velocity'] and
+                    data['burndown']['cards'] == expected['burndown']
+                )
+            )
+            get_cache().clear()
+            analytics.get_analytics(self.board.pk, since, until, size)
+            _, hit = self.timed(
+                options,
+                lambda: analytics.get_analytics(
+                    self.board.pk, since, until, size
+                )
+            )
+            self.stdout.write(f'cache hit: {hit:.2f}ms')
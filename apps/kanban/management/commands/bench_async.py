@@ -0,0 +1,128 @@
+import asyncio
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ...models import KanBanUser
+from ...streaming import ASGIHandler
+
+# endpoints measured, each served at /<path> and /async/<path>
+PATHS = ['normalized/', 'boards/', 'cards/']
+
+
+class Command(BaseCommand):
+    help = ('Compare the throughput of the sync and async read endpoints by '
+            'driving the ASGI application in-process with many concurrent '
+            'connections. Run seed_kanban first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='seed-user-0')
+        parser.add_argument('--concurrency', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='requests per endpoint and path')
+        parser.add_argument('--path', action='append',
+                            help=f'endpoints to measure, default {PATHS}')
+        parser.add_argument('--db-latency-ms', type=float, default=0,
+                            help='round trip added to every query, to '
+                                 'mimic a database server over the network')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('--requests must be at least 2 to compute '
+                               'percentiles')
+        try:
+            user = KanBanUser.objects.get(username=options['user'])
+        except KanBanUser.DoesNotExist:
+            raise CommandError(
+                f'no user {options["user"]}, run seed_kanban first'
+            )
+        token = AccessToken.for_user(user)
+        token.set_exp(lifetime=timedelta(hours=1))
+        self.token = str(token)
+        if options['db_latency_ms']:
+            self.add_latency(options['db_latency_ms'] / 1000)
+        self.application = ASGIHandler()
+        results = {}
+        for path in options['path'] or PATHS:
+            for prefix in ('/', '/async/'):
+                results[prefix + path] = asyncio.run(self.measure(
+                    prefix + path, options['requests'],
+                    options['concurrency']
+                ))
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def add_latency(self, seconds):
+        """Sleep before every query, releasing the GIL like real I/O."""
+        def delay(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        def install(connection, **kwargs):
+            connection.execute_wrappers.append(delay)
+
+        connection_created.connect(install, weak=False)
+        for connection in connections.all():
+            install(connection)
+
+    async def request(self, path):
+        """One GET through the ASGI application, returns the status."""
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'https',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', b'localhost'),
+                (b'authorization', f'Bearer {self.token}'.encode()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 443),
+        }
+        sent = {}
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                sent['status'] = message['status']
+
+        await self.application(scope, receive, send)
+        return sent.get('status')
+
+    async def measure(self, path, requests, concurrency):
+        slots = asyncio.Semaphore(concurrency)
+        timings, errors = [], 0
+
+        async def one():
+            nonlocal errors
+            async with slots:
+                started = time.perf_counter()
+                status = await self.request(path)
+                timings.append((time.perf_counter() - started) * 1000)
+                if status != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(requests)])
+        elapsed = time.perf_counter() - started
+        quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'requests': requests,
+            'concurrency': concurrency,
+            'errors': errors,
+            'requests_per_second': round(requests / elapsed, 1),
+            'p50_ms': round(quantiles[49], 3),
+            'p95_ms': round(quantiles[94], 3),
+        }
@@ -0,0 +1,145 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, Index, Max, Q
+from django.utils import timezone
+
+from ...models import POSITION_GAP, Board, Card, Container, KanBanUser, Member
+from ..bench import (ROLLED_BACK, add_seed_arguments, rolled_back, seed_cards,
+                     seed_containers)
+
+# models whose Meta.indexes are measured, see 0015_query_indexes
+INDEXED_MODELS = [Board, Container, Card, Member]
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway data set and show the query plans and timings '
+            'of the hot queries without and with the tuned indexes. '
+            + ROLLED_BACK)
+
+    def add_arguments(self, parser):
+        add_seed_arguments(parser)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        tuned = [
+            (model, index)
+            for model in INDEXED_MODELS for index in model._meta.indexes
+        ]
+        baseline = self.baseline_indexes()
+        with rolled_back():
+            self.run_index_sql(tuned, 'remove_sql')
+            self.run_index_sql(baseline, 'create_sql')
+            started = time.perf_counter()
+            self.seed(options)
+            self.stdout.write(
+                f'seeded {options["cards"]} cards in '
+                f'{time.perf_counter() - started:.1f}s'
+            )
+            self.report('before')
+            self.run_index_sql(baseline, 'remove_sql')
+            self.run_index_sql(tuned, 'create_sql')
+            self.report('after')
+
+    def seed(self, options):
+        self.user = KanBanUser.objects.create(username='bench-indexes')
+        containers = seed_containers(
+            options, 'bench-indexes', lambda b: self.user, self.user
+        )
+        Member.objects.bulk_create([
+            Member(board=board, user=self.user, position=i)
+            for i, board in enumerate(
+                Board.objects.filter(created_by=self.user).order_by('id')
+            )
+        ])
+        now = timezone.now()
+        seed_cards(options, containers, lambda i: {
+            'name': f'card {i}', 'slug': f'bench-indexes-card-{i}',
+            'created_by': self.user, 'archived': i % 10 == 0,
+        })
+        # spread changed_time so the sync queries select a slice
+        Card.objects.filter(created_by=self.user, id__lt=(
+            Card.objects.filter(created_by=self.user).aggregate(
+                Max('id'))['id__max'] // 2
+        )).update(changed_time=now - timedelta(days=30))
+        self.container = containers[len(containers) // 2]
+        self.board = self.container.board
+        self.since = now - timedelta(days=1)
+
+    def baseline_indexes(self):
+        """
+        The single column index each foreign key had by default before the
+        tuned indexes covered it.
+        """
+        return [
+            (model, Index(
+                fields=[field.name],
+                name=f'bench_{model._meta.model_name}_{field.name}'
+            ))
+            for model in INDEXED_MODELS
+            for field in model._meta.concrete_fields
+            if field.many_to_one and not field.db_index
+        ]
+
+    def run_index_sql(self, indexes, method):
+        """
+        Drop or create (model, index) pairs. The statements are run by hand
+        because SQLite's schema editor refuses to work inside a transaction.
+        """
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, index in indexes:
+                cursor.execute(str(getattr(index, method)(model, editor)))
+
+    def queries(self):
+        """The hot queries issued by the models and views, by name."""
+        user, container = self.user, self.container
+        middle = 250 * POSITION_GAP
+        return {
+            'card collision check': Card.objects.filter(
+                container=container, position=middle
+            ),
+            'card predecessor': Card.objects.filter(
+                container=container, position__lt=middle
+            ).order_by('-position')[:1],
+            'container cards in order': Card.objects.filter(
+                container=container, archived=False
+            ).order_by('position')[:100],
+            'card keyset page': Card.objects.filter(
+                Q(container__gt=container.pk) |
+                Q(container=container.pk, position__gt=middle)
+            ).order_by('container', 'position', 'id')[:100],
+            'board containers in order': Container.objects.filter(
+                board=self.board
+            ).order_by('position'),
+            'cards changed since': Card.objects.filter(
+                created_by=user, changed_time__gte=self.since
+            ).order_by('changed_time', 'id')[:100],
+            'card etag aggregate': Card.objects.filter(
+                created_by=user
+            ).values('created_by').annotate(
+                count=Count('id'), latest=Max('changed_time')
+            ),
+            'boards of member': Member.objects.filter(
+                user=user
+            ).values_list('board', flat=True),
+        }
+
+    def report(self, label):
+        self.stdout.write(f'\n== {label} ==')
+        for name, queryset in self.queries().items():
+            timings = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{name}: median {statistics.median(timings):.2f}ms '
+                f'max {max(timings):.2f}ms'
+            )
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f'    {line}')
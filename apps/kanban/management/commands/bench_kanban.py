@@ -0,0 +1,140 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (CaptureQueriesContext, setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.test import APIClient
+
+from ...models import POSITION_GAP, Card, Container, KanBanUser
+from ..bench import rolled_back
+
+
+def percentile(quantiles, p):
+    return round(quantiles[p - 1], 3)
+
+
+class Command(BaseCommand):
+    help = ('Drive the API with the DRF test client and report latency '
+            'percentiles, queries per request and rows per second as JSON. '
+            'Run seed_kanban first; writes are rolled back afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='seed-user-0',
+                            help='username to authenticate as')
+        parser.add_argument('--requests', type=int, default=50,
+                            help='measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--scenario', action='append',
+                            help='run only these scenarios')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('--requests must be at least 2 to compute '
+                               'percentiles')
+        try:
+            user = KanBanUser.objects.get(username=options['user'])
+        except KanBanUser.DoesNotExist:
+            raise CommandError(
+                f'no user {options["user"]}, run seed_kanban first'
+            )
+        self.random = random.Random(options['seed'])
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        # targets are read up front so they stay out of the measurements
+        self.containers = list(
+            Container.objects.filter(created_by=user)
+            .values_list('pk', flat=True)
+        )
+        self.cards = list(
+            Card.objects.filter(created_by=user).values_list('pk', flat=True)
+        )
+        if not self.containers or not self.cards:
+            raise CommandError(f'{user} has no containers or cards')
+        scenarios = {
+            'normalized': self.normalized,
+            'normalized_flat': self.normalized_flat,
+            'board_list': self.board_list,
+            'card_create': self.card_create,
+            'card_move': self.card_move,
+        }
+        wanted = options['scenario'] or list(scenarios)
+        results = {}
+        # the test environment lets the client through ALLOWED_HOSTS
+        setup_test_environment()
+        try:
+            with rolled_back():
+                for name in wanted:
+                    results[name] = self.measure(
+                        scenarios[name], options['requests'],
+                        options['warmup']
+                    )
+        finally:
+            teardown_test_environment()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def measure(self, scenario, requests, warmup):
+        for _ in range(warmup):
+            scenario()
+        timings, queries, rows = [], [], 0
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                rows += scenario()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+        quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'requests': requests,
+            'p50_ms': percentile(quantiles, 50),
+            'p95_ms': percentile(quantiles, 95),
+            'p99_ms': percentile(quantiles, 99),
+            'queries_per_request': statistics.mean(queries),
+            'rows_per_second': round(rows / (sum(timings) / 1000), 1),
+        }
+
+    def request(self, method, path, data=None):
+        response = getattr(self.client, method)(
+            path, data, format='json', secure=True
+        )
+        if response.status_code >= 400:
+            raise CommandError(f'{method} {path}: {response.status_code}')
+        return response
+
+    # scenarios, each returns the number of rows it read or wrote
+
+    def normalized(self, path='/normalized/'):
+        data = self.request('get', path).data
+        return sum(
+            len(rows) for rows in data.values() if isinstance(rows, list)
+        )
+
+    def normalized_flat(self):
+        return self.normalized('/normalized/?flat=true')
+
+    def board_list(self):
+        return len(self.request('get', '/boards/').data['results'])
+
+    def random_container(self):
+        return self.random.choice(self.containers)
+
+    def card_create(self):
+        self.request('post', '/cards/', {
+            'name': 'bench card',
+            'container': f'https://testserver/containers/'
+                         f'{self.random_container()}/',
+        })
+        return 1
+
+    def card_move(self):
+        card = self.random.choice(self.cards)
+        self.request('patch', f'/cards/{card}/', {
+            'container': f'https://testserver/containers/'
+                         f'{self.random_container()}/',
+            'position': self.random.randint(1, 20) * POSITION_GAP,
+        })
+        return 1
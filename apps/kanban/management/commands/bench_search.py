@@ -0,0 +1,99 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from ...models import Board, Card, KanBanUser
+from ...permissions import board_ids_of
+from ...search import FTS5Search, PostgresSearch, get_backend
+from ..bench import (ROLLED_BACK, add_seed_arguments, rolled_back, seed_cards,
+                     seed_containers)
+
+# words of the generated cards, the first ones far more common than the rest
+VOCABULARY = [
+    'fix', 'login', 'page', 'test', 'api', 'user', 'deploy', 'review',
+    'update', 'error', 'report', 'design', 'mobile', 'cache', 'billing',
+    'invoice', 'export', 'search', 'docs', 'sprint',
+] + [f'word{i}' for i in range(5000)]
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway set of cards, index them and time card '
+            'searches of common and rare words. ' + ROLLED_BACK)
+
+    def add_arguments(self, parser):
+        add_seed_arguments(parser)
+        parser.add_argument('--member-of', type=int, default=20,
+                            help='boards the searching user can reach')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if not isinstance(get_backend(), (FTS5Search, PostgresSearch)):
+            raise CommandError('only the FTS5 and Postgres backends are '
+                               'measured')
+        with rolled_back():
+            started = time.perf_counter()
+            self.seed(options)
+            self.stdout.write(
+                f'seeded and indexed {options["cards"]} cards in '
+                f'{time.perf_counter() - started:.1f}s'
+            )
+            self.report(options)
+
+    def seed(self, options):
+        self.user = KanBanUser.objects.create(username='bench-search')
+        owner = KanBanUser.objects.create(username='bench-search-owner')
+        containers = seed_containers(
+            options, 'bench-search',
+            lambda b: self.user if b < options['member_of'] else owner, owner
+        )
+        rng = random.Random(0)
+        weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+        def words(i):
+            name, content = (
+                ' '.join(rng.choices(VOCABULARY, weights, k=k))
+                for k in (4, 20)
+            )
+            return {
+                'name': name, 'content': content,
+                'slug': f'bench-search-card-{i}', 'created_by': owner,
+                'archived': i % 10 == 0,
+            }
+        seed_cards(options, containers, words)
+        # plain bulk_create bypasses the index, refill it in one statement
+        get_backend().rebuild()
+        self.card = Card.objects.filter(created_by=owner).first()
+
+    def report(self, options):
+        backend = get_backend()
+        scopes = {
+            f'{options["member_of"]} boards': set(board_ids_of(self.user)),
+            'every board': set(
+                Board.objects.values_list('id', flat=True)
+            ),
+        }
+        queries = ['login', 'word4321', 'invoice', 'deploy error', 'nothing']
+        for scope, board_ids in scopes.items():
+            self.stdout.write(f'\n== {scope} ==')
+            for query in queries:
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    found = backend.search(query, board_ids, 20)
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f'{query!r}: {len(found)} found, median '
+                    f'{statistics.median(timings):.2f}ms '
+                    f'max {max(timings):.2f}ms'
+                )
+        timings = []
+        for i in range(options['repeat']):
+            self.card.name = f'renamed {i}'
+            started = time.perf_counter()
+            self.card.save(update_fields=['name'])
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f'\nrename and reindex one card: median '
+            f'{statistics.median(timings):.2f}ms'
+        )
@@ -0,0 +1,108 @@
+import json
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.test import APIClient
+
+from ...hashing import hash_password, reset_pool
+from ...models import KanBanUser
+
+PREFIX = 'bench-signup-'
+
+
+class Command(BaseCommand):
+    help = ('Measure board list latency while threads register users, with '
+            'passwords hashed inline and on the hashing pool, and report '
+            'signups per second and latency percentiles as JSON. Run '
+            'seed_kanban first; the registered users are deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='seed-user-0',
+                            help='username reading the boards')
+        parser.add_argument('--signups', type=int, default=8,
+                            help='threads registering users concurrently')
+        parser.add_argument('--duration', type=float, default=10,
+                            help='seconds measured per mode')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='hashing pool size of the pooled mode')
+
+    def handle(self, *args, **options):
+        try:
+            self.user = KanBanUser.objects.get(username=options['user'])
+        except KanBanUser.DoesNotExist:
+            raise CommandError(
+                f'no user {options["user"]}, run seed_kanban first'
+            )
+        modes = {
+            'idle': (0, 0),
+            'inline': (options['signups'], 0),
+            'pool': (options['signups'], options['workers']),
+        }
+        results = {}
+        # the test environment lets the client through ALLOWED_HOSTS
+        setup_test_environment()
+        try:
+            for mode, (signups, workers) in modes.items():
+                with override_settings(KANBAN_HASHING_WORKERS=workers):
+                    reset_pool()
+                    # start the pool's workers outside the measurement
+                    hash_password('warm up')
+                    results[mode] = self.measure(
+                        signups, options['duration']
+                    )
+                    reset_pool()
+        finally:
+            teardown_test_environment()
+            KanBanUser.objects.filter(username__startswith=PREFIX).delete()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def measure(self, signups, duration):
+        stop = threading.Event()
+        statuses = []
+        threads = [
+            threading.Thread(target=self.sign_up, args=(stop, statuses))
+            for _ in range(signups)
+        ]
+        for thread in threads:
+            thread.start()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        timings = []
+        started = time.perf_counter()
+        while time.perf_counter() - started < duration:
+            request_started = time.perf_counter()
+            response = client.get('/boards/', secure=True)
+            timings.append((time.perf_counter() - request_started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'GET /boards/: {response.status_code}')
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'signups_per_second': round(statuses.count(201) / elapsed, 1),
+            'throttled': statuses.count(429),
+            'board_reads': len(timings),
+            'board_p50_ms': round(quantiles[49], 3),
+            'board_p95_ms': round(quantiles[94], 3),
+            'board_p99_ms': round(quantiles[98], 3),
+        }
+
+    def sign_up(self, stop, statuses):
+        client = APIClient()
+        try:
+            while not stop.is_set():
+                response = client.post('/register/', {
+                    'username': PREFIX + uuid.uuid4().hex,
+                    'password': 'bench password',
+                }, secure=True)
+                statuses.append(response.status_code)
+        finally:
+            connection.close()
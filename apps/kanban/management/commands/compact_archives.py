@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from ...archives import compact_cards
+from ...models import Card
+
+
+class Command(BaseCommand):
+    help = ('Move cards archived more than --days ago, and their labels, '
+            'tags, attachments and assignees, out of the card table into '
+            'the archive tier, a batch per transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help='only move cards archived this long ago')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # cards archived before archived_time was recorded count as old
+        old = (
+            Card.objects
+            .filter(archived=True)
+            .filter(Q(archived_time__lt=cutoff) |
+                    Q(archived_time__isnull=True))
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        moved = 0
+        while True:
+            card_ids = list(old[:options['batch_size']])
+            if not card_ids:
+                break
+            moved += compact_cards(card_ids)
+        self.stdout.write(f'moved {moved} archived cards')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from ...models import (POSITION_GAP, Card, Container,
+                       rebalance_positions)
+
+
+def tightest_gap(positions) -> int:
+    """Return the smallest distance between neighbouring positions."""
+    gaps = [b - a for a, b in zip(positions, positions[1:])]
+    return min(gaps, default=POSITION_GAP)
+
+
+class Command(BaseCommand):
+    help = ('Respace card and container positions in any container or '
+            'board whose gaps are running out. Safe to run from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-gap', type=int, default=8,
+            help='rebalance when two siblings are closer than this'
+        )
+
+    def handle(self, *args, **options):
+        min_gap = options['min_gap']
+        groups = (
+            (Card, 'container_id'),
+            (Container, 'board_id'),
+        )
+        for model, parent in groups:
+            positions = {}
+            rows = (
+                model.objects
+                .order_by(parent, 'position')
+                .values_list(parent, 'position')
+            )
+            for parent_id, position in rows.iterator():
+                positions.setdefault(parent_id, []).append(position)
+            rebalanced = 0
+            for parent_id, values in positions.items():
+                if tightest_gap(values) < min_gap:
+                    rebalance_positions(model, parent_id)
+                    rebalanced += 1
+            self.stdout.write(
+                f'{model.__name__}: rebalanced {rebalanced} '
+                f'of {len(positions)} groups'
+            )
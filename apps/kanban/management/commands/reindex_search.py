@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...search import get_backend
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the card search index from the cards in one '
+            'transaction, e.g. after loading cards with bulk inserts.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            indexed = get_backend().rebuild()
+        self.stdout.write(
+            f'indexed {indexed} cards in '
+            f'{time.perf_counter() - started:.1f}s'
+        )
@@ -0,0 +1,192 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ...models import (POSITION_GAP, Board, Card, Container, KanBanUser,
+                       Label, Member, Tag, rebuild_card_stats)
+from ...search import get_backend
+
+WORDS = [
+    'fix', 'add', 'review', 'deploy', 'design', 'refactor', 'test', 'plan',
+    'login', 'billing', 'search', 'export', 'api', 'docs', 'mobile', 'cache',
+    'report', 'import', 'profile', 'settings', 'invoice', 'alerts', 'sync',
+]
+COLUMNS = ['Backlog', 'Todo', 'Doing', 'Review', 'Done', 'Blocked']
+COLORS = ['#e74c3c', '#3498db', '#2ecc71', '#f1c40f', '#9b59b6', '#aaaaaa']
+
+
+class Command(BaseCommand):
+    help = ('Generate a reproducible kanban data set: users with boards, '
+            'containers, cards, labels, tags, members and assignments.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--boards', type=int, default=3,
+                            help='boards per user')
+        parser.add_argument('--containers', type=int, default=5,
+                            help='containers per board')
+        parser.add_argument('--cards', type=int, default=20,
+                            help='cards per container')
+        parser.add_argument('--labels', type=int, default=5,
+                            help='labels per board')
+        parser.add_argument('--tags', type=int, default=5,
+                            help='tags per user')
+        parser.add_argument('--members', type=int, default=2,
+                            help='extra members per board')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='seed',
+                            help='prefix for usernames, slugs and names')
+        parser.add_argument('--password', default='kanban')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if KanBanUser.objects.filter(
+                username__startswith=f'{prefix}-user-').exists():
+            raise CommandError(
+                f'users named {prefix}-user-* already exist, '
+                'pick another --prefix'
+            )
+        self.random = random.Random(options['seed'])
+        self.prefix = prefix
+        self.now = timezone.now()
+        with transaction.atomic():
+            counts = self.seed(options)
+        self.stdout.write(', '.join(
+            f'{count} {name}' for name, count in counts.items()
+        ))
+
+    def created(self, model, slug_field='slug'):
+        """
+        Read back seeded rows in insertion order, archived ones included.
+
+        bulk_create does not set primary keys on every backend.
+        """
+        return list(
+            model.objects
+            .filter(**{f'{slug_field}__startswith': f'{self.prefix}-'})
+            .order_by('id')
+        )
+
+    def seed(self, options):
+        rand, prefix = self.random, self.prefix
+        password = make_password(options['password'])
+        KanBanUser.objects.bulk_create([
+            KanBanUser(username=f'{prefix}-user-{u}', password=password)
+            for u in range(options['users'])
+        ])
+        users = list(
+            KanBanUser.objects
+            .filter(username__startswith=f'{prefix}-user-')
+            .order_by('id')
+        )
+        Tag.objects.bulk_create([
+            Tag(user=user, name=f'{prefix}-tag-{user.pk}-{t}',
+                color=rand.choice(COLORS))
+            for user in users for t in range(options['tags'])
+        ])
+        tags = {}
+        for tag in self.created(Tag, 'name'):
+            tags.setdefault(tag.user_id, []).append(tag)
+
+        Board.objects.bulk_create([
+            Board(name=f'{rand.choice(WORDS).title()} board {b}',
+                  slug=f'{prefix}-board-{user.pk}-{b}', created_by=user,
+                  last_container_position=(
+                      options['containers'] * POSITION_GAP
+                  ))
+            for user in users for b in range(options['boards'])
+        ])
+        boards = self.created(Board)
+        members = []
+        for board in boards:
+            owner = next(u for u in users if u.pk == board.created_by_id)
+            others = [u for u in users if u is not owner]
+            extra = rand.sample(others, min(options['members'], len(others)))
+            for position, user in enumerate([owner] + extra):
+                members.append(
+                    Member(board=board, user=user, position=position)
+                )
+        Member.objects.bulk_create(members)
+        members = {}
+        for member in Member.objects.filter(board__in=boards).order_by('id'):
+            members.setdefault(member.board_id, []).append(member)
+        Label.objects.bulk_create([
+            Label(board=board, name=f'{prefix}-label-{board.pk}-{n}',
+                  color=rand.choice(COLORS))
+            for board in boards for n in range(options['labels'])
+        ])
+        labels = {}
+        for label in self.created(Label, 'name'):
+            labels.setdefault(label.board_id, []).append(label)
+
+        Container.objects.bulk_create([
+            Container(board=board, name=COLUMNS[c % len(COLUMNS)],
+                      slug=f'{prefix}-container-{board.pk}-{c}',
+                      created_by_id=board.created_by_id,
+                      position=(c + 1) * POSITION_GAP,
+                      last_card_position=options['cards'] * POSITION_GAP)
+            for board in boards for c in range(options['containers'])
+        ])
+        containers = self.created(Container)
+        board_of = {board.pk: board for board in boards}
+
+        cards = []
+        for container in containers:
+            for n in range(options['cards']):
+                start = self.now - timedelta(days=rand.randint(0, 365))
+                cards.append(Card(
+                    container=container,
+                    name=f'{rand.choice(WORDS)} {rand.choice(WORDS)} {n}',
+                    slug=f'{prefix}-card-{container.pk}-{n}',
+                    content=' '.join(rand.choices(WORDS, k=12)),
+                    created_by_id=container.created_by_id,
+                    position=(n + 1) * POSITION_GAP,
+                    start_time=start,
+                    end_time=start + timedelta(days=rand.randint(1, 60)),
+                    complexity=Decimal(rand.choice([1, 2, 3, 5, 8, 13])),
+                    hours=Decimal(rand.randint(1, 400)) / 4,
+                    archived=rand.random() < 0.05,
+                ))
+        Card.objects.bulk_create(cards, batch_size=5000)
+        cards = self.created(Card)
+
+        board_of_container = {c.pk: c.board_id for c in containers}
+        links = {'labels': [], 'tags': [], 'assigned_users': []}
+        for card in cards:
+            board_id = board_of_container[card.container_id]
+            owner_id = board_of[board_id].created_by_id
+            choices = labels.get(board_id, [])
+            for label in rand.sample(choices, min(rand.randint(0, 2),
+                                                  len(choices))):
+                links['labels'].append((card.pk, label.pk))
+            if tags.get(owner_id) and rand.random() < 0.3:
+                links['tags'].append((card.pk, rand.choice(tags[owner_id]).pk))
+            if rand.random() < 0.6:
+                member = rand.choice(members[board_id])
+                links['assigned_users'].append((card.pk, member.pk))
+        for name, pairs in links.items():
+            field = Card._meta.get_field(name)
+            through = field.remote_field.through
+            through.objects.bulk_create([
+                through(**{
+                    f'{field.m2m_field_name()}_id': card_id,
+                    f'{field.m2m_reverse_field_name()}_id': related_id,
+                })
+                for card_id, related_id in pairs
+            ], batch_size=5000)
+        # bulk_create sends no signals, index the cards with their links
+        # and total them
+        get_backend().index([card.pk for card in cards])
+        rebuild_card_stats()
+        return {
+            'users': len(users), 'boards': len(boards),
+            'containers': len(containers), 'cards': len(cards),
+            'labels': sum(map(len, labels.values())),
+            'tags': sum(map(len, tags.values())),
+            'card links': sum(map(len, links.values())),
+        }
@@ -0,0 +1,184 @@
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# metrics of the request being served, None outside RequestMetricsMiddleware
+current_metrics = contextvars.ContextVar('kanban_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Query count and time buckets of one request, durations in seconds.
+    Async views may query and serialize on several threads at once.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        # queries run while serializing, counted in db_time only
+        self.serialize_db_time = 0.0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @property
+    def serializing(self) -> bool:
+        return getattr(self.local, 'serializing', False)
+
+    @serializing.setter
+    def serializing(self, value):
+        self.local.serializing = value
+
+    def add_query(self, duration) -> None:
+        with self.lock:
+            self.queries += 1
+            self.db_time += duration
+            if self.serializing:
+                self.serialize_db_time += duration
+
+    def add_serialization(self, duration) -> None:
+        with self.lock:
+            self.serialize_time += duration
+
+    def timings(self):
+        """Exclusive db, serialize and view buckets plus the total, in ms."""
+        total = time.perf_counter() - self.started
+        serialize = self.serialize_time - self.serialize_db_time
+        return {
+            'db': self.db_time * 1000,
+            'serialize': serialize * 1000,
+            # concurrent work can add up to more than the wall clock time
+            'view': max(total - self.db_time - serialize, 0) * 1000,
+            'total': total * 1000,
+        }
+
+
+def install_query_wrapper(connection, **kwargs):
+    """
+    Wrap every query of a connection with record_query. Connections are per
+    thread and async views query from worker threads, so the wrapper stays
+    installed and the metrics of the request reach it through a contextvar.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def query_stack():
+    """The frames of this project that led to a query, outermost first."""
+    base = str(settings.BASE_DIR)
+    return ''.join(traceback.format_list([
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(base)
+        and frame.filename != __file__
+        and 'site-packages' not in frame.filename
+    ]))
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper feeding the current RequestMetrics."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        metrics.add_query(duration)
+        if duration * 1000 >= settings.KANBAN_SLOW_QUERY_MS:
+            logger.warning(
+                'slow query %.1fms: %s\n%s', duration * 1000, sql,
+                query_stack()
+            )
+
+
+class TimedSerializerMixin:
+    """
+    Add the time spent in to_representation to the request's serialize
+    bucket. Nested serializers are covered by their outermost caller.
+    """
+
+    def to_representation(self, instance):
+        metrics = current_metrics.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.add_serialization(time.perf_counter() - started)
+            metrics.serializing = False
+
+
+class RequestMetricsMiddleware:
+    """
+    Count and time the queries of each request, split the remaining time
+    into serializer and view time, and report it all as a Server-Timing
+    header and one JSON log line. Enabled by KANBAN_REQUEST_METRICS.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.KANBAN_REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # let Django await us, as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        connection_created.connect(
+            install_query_wrapper, dispatch_uid='kanban_request_metrics'
+        )
+        for connection in connections.all():
+            install_query_wrapper(connection)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics)
+
+    def report(self, request, response, metrics):
+        timings = metrics.timings()
+        response['Server-Timing'] = ', '.join(
+            [f'db;dur={timings["db"]:.1f};desc="{metrics.queries} queries"']
+            + [f'{name};dur={timings[name]:.1f}'
+               for name in ('serialize', 'view', 'total')]
+        )
+        size = None if response.streaming else len(response.content)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            **{f'{name}_ms': round(ms, 1) for name, ms in timings.items()},
+            'bytes': size,
+        }))
+        return response
@@ -0,0 +1,43 @@
+# Generated by Django 3.1.3 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+# copied from apps.kanban.models, migrations must not import the live module
+POSITION_GAP = 1024
+
+
+def spread_positions(apps, schema_editor):
+    """Space existing card and container positions POSITION_GAP apart."""
+    for model_name, parent in (('Card', 'container_id'),
+                               ('Container', 'board_id')):
+        model = apps.get_model('kanban', model_name)
+        changed = []
+        parent_id, i = None, 0
+        for row in model.objects.order_by(parent, 'position', 'id'):
+            if getattr(row, parent) != parent_id:
+                parent_id, i = getattr(row, parent), 0
+            i += 1
+            row.position = i * POSITION_GAP
+            changed.append(row)
+        model.objects.bulk_update(changed, ['position'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0010_auto_20210228_1629'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='card',
+            name='position',
+            field=models.PositiveIntegerField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='container',
+            name='position',
+            field=models.PositiveIntegerField(blank=True),
+        ),
+        migrations.RunPython(spread_positions, migrations.RunPython.noop),
+    ]
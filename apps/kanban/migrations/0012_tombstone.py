@@ -0,0 +1,29 @@
+# Generated by Django 3.1.3 on 2026-10-18 18:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0011_sparse_positions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('boards', 'Board'), ('containers', 'Container'), ('cards', 'Card')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('deleted_time', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tombstones', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['created_by', 'deleted_time'], name='tombstone_user_time'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.3 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0012_tombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='label',
+            name='changed_time',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='changed_time',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='changed_time',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
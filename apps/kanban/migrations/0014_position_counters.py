@@ -0,0 +1,37 @@
+# Generated by Django 3.1.3 on 2026-10-18 18:31
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def fill_counters(apps, schema_editor):
+    """Start each position counter at the current max position."""
+    for model_name, counter, children in (
+            ('Container', 'last_card_position', 'cards'),
+            ('Board', 'last_container_position', 'containers')):
+        model = apps.get_model('kanban', model_name)
+        rows = list(model.objects.annotate(last=Max(f'{children}__position')))
+        for row in rows:
+            setattr(row, counter, row.last or 0)
+        model.objects.bulk_update(rows, [counter], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0013_changed_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='last_container_position',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='container',
+            name='last_card_position',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 3.1.3 on 2026-10-18 18:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# foreign keys whose own index is dropped, an index added here or
+# unique_board_member leads with the same column
+FOREIGN_KEYS = [
+    ('board', 'created_by'),
+    ('card', 'container'),
+    ('card', 'created_by'),
+    ('container', 'board'),
+    ('container', 'created_by'),
+    ('member', 'board'),
+    ('member', 'user'),
+]
+
+
+def foreign_key_indexes(apps, schema_editor):
+    """The single column index of each of FOREIGN_KEYS, by model."""
+    for model_name, field_name in FOREIGN_KEYS:
+        model = apps.get_model('kanban', model_name)
+        column = model._meta.get_field(field_name).column
+        for name in schema_editor._constraint_names(
+                model, [column], index=True, unique=False,
+                type_=models.Index.suffix):
+            yield model, name
+
+
+def drop_foreign_key_indexes(apps, schema_editor):
+    """
+    Drop the indexes as AlterField(db_index=False) would, without the
+    table rebuild it takes on SQLite.
+    """
+    for model, name in list(foreign_key_indexes(apps, schema_editor)):
+        schema_editor.execute(schema_editor._delete_index_sql(model, name))
+
+
+def create_foreign_key_indexes(apps, schema_editor):
+    for model_name, field_name in FOREIGN_KEYS:
+        model = apps.get_model('kanban', model_name)
+        schema_editor.execute(schema_editor._create_index_sql(
+            model, [model._meta.get_field(field_name)]
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0014_position_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='board',
+            index=models.Index(fields=['created_by', 'changed_time'], name='board_user_changed'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['container', 'position'], name='card_container_position'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['created_by', 'changed_time'], name='card_user_changed'),
+        ),
+        migrations.AddIndex(
+            model_name='container',
+            index=models.Index(fields=['board', 'position'], name='container_board_position'),
+        ),
+        migrations.AddIndex(
+            model_name='container',
+            index=models.Index(fields=['created_by', 'changed_time'], name='container_user_changed'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['user', 'board'], name='member_user_board'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(
+                    drop_foreign_key_indexes, create_foreign_key_indexes
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='board',
+                    name='created_by',
+                    field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='boards_created', to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='card',
+                    name='container',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='cards', to='kanban.container'),
+                ),
+                migrations.AlterField(
+                    model_name='card',
+                    name='created_by',
+                    field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cards_created', to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='container',
+                    name='board',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='containers', to='kanban.board'),
+                ),
+                migrations.AlterField(
+                    model_name='container',
+                    name='created_by',
+                    field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='containers_created', to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='member',
+                    name='board',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='members', to='kanban.board'),
+                ),
+                migrations.AlterField(
+                    model_name='member',
+                    name='user',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,63 @@
+import secrets
+
+from django.db import migrations
+from django.template.defaultfilters import slugify
+
+# slugs made by the old generator: slugify(str(time.time()) + '-' + ...)
+TIMESTAMP_SLUG = r'^[0-9]{10,}(-|$)'
+
+# copied from apps.kanban.slugs as it was, migrations must not import the
+# live module
+ALPHABET = '0123456789abcdefghjkmnpqrstvwxyz'
+RANDOM_BITS = 80
+SLUG_LENGTH = 120
+
+
+def encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def ulid_at(milliseconds):
+    return encode(milliseconds, 10) + encode(secrets.randbits(RANDOM_BITS), 16)
+
+
+def make_slug(name, ulid):
+    name = slugify(name)[:SLUG_LENGTH - len(ulid) - 1].strip('-')
+    return f'{ulid}-{name}' if name else ulid
+
+
+def ulid_slugs(apps, schema_editor):
+    """Re-slug rows named by timestamp, ordered by their created_time."""
+    for model_name in ('Board', 'Container', 'Card'):
+        model = apps.get_model('kanban', model_name)
+        # ids first, the rows being rewritten are not read while scanning
+        pks = list(
+            model.objects
+            .filter(slug__regex=TIMESTAMP_SLUG)
+            .values_list('pk', flat=True)
+        )
+        for start in range(0, len(pks), 500):
+            rows = list(
+                model.objects
+                .filter(pk__in=pks[start:start + 500])
+                .only('pk', 'name', 'created_time')
+            )
+            for row in rows:
+                milliseconds = int(row.created_time.timestamp() * 1000)
+                row.slug = make_slug(row.name, ulid_at(milliseconds))
+            model.objects.bulk_update(rows, ['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0015_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(ulid_slugs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.1.3 on 2026-10-18 19:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0016_ulid_slugs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCard',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('slug', models.SlugField(max_length=120, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('content', models.TextField(blank=True, null=True)),
+                ('start_time', models.DateTimeField(blank=True, null=True)),
+                ('end_time', models.DateTimeField(blank=True, null=True)),
+                ('complexity', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('hours', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True)),
+                ('position', models.PositiveIntegerField()),
+                ('created_time', models.DateTimeField()),
+                ('changed_time', models.DateTimeField()),
+                ('archived_time', models.DateTimeField()),
+                ('links', models.JSONField(default=dict)),
+                ('archived_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('changed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('container', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_cards', to='kanban.container')),
+                ('created_by', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedcard',
+            index=models.Index(fields=['container', 'position'], name='archivedcard_position'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcard',
+            index=models.Index(fields=['created_by', 'changed_time'], name='archivedcard_user_changed'),
+        ),
+    ]
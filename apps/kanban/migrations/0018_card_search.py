@@ -0,0 +1,84 @@
+from django.db import migrations
+
+# copied from apps.kanban.search as it was, migrations must not import the
+# live module
+TABLE = 'kanban_card_search'
+DOCUMENTS = (
+    "SELECT c.id, c.name, coalesce(c.content, ''), "
+    "coalesce((SELECT group_concat(l.name, ' ') "
+    "FROM kanban_card_labels AS cl "
+    "JOIN kanban_label AS l ON l.id = cl.label_id "
+    "WHERE cl.card_id = c.id), ''), "
+    "coalesce((SELECT group_concat(t.name, ' ') "
+    "FROM kanban_card_tags AS ct "
+    "JOIN kanban_tag AS t ON t.id = ct.tag_id "
+    "WHERE ct.card_id = c.id), ''), "
+    "'b' || k.board_id "
+    "FROM kanban_card AS c "
+    "JOIN kanban_container AS k ON k.id = c.container_id"
+)
+POSTGRES_DOCUMENTS = (
+    "SELECT c.id, k.board_id, "
+    "setweight(to_tsvector('simple', c.name), 'A') || "
+    "setweight(to_tsvector('simple', "
+    "coalesce((SELECT string_agg(l.name, ' ') "
+    "FROM kanban_card_labels AS cl "
+    "JOIN kanban_label AS l ON l.id = cl.label_id "
+    "WHERE cl.card_id = c.id), '') || ' ' || "
+    "coalesce((SELECT string_agg(t.name, ' ') "
+    "FROM kanban_card_tags AS ct "
+    "JOIN kanban_tag AS t ON t.id = ct.tag_id "
+    "WHERE ct.card_id = c.id), '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(c.content, '')), 'D') "
+    "FROM kanban_card AS c "
+    "JOIN kanban_container AS k ON k.id = c.container_id"
+)
+
+
+def create_index(apps, schema_editor):
+    """Create and fill the FTS5 or tsvector card index."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+            f'card_id integer PRIMARY KEY, board_id integer NOT NULL, '
+            f'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TABLE}_document '
+            f'ON {TABLE} USING gin (document)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TABLE}_board '
+            f'ON {TABLE} (board_id)'
+        )
+        schema_editor.execute(
+            f'INSERT INTO {TABLE} (card_id, board_id, document) '
+            f'{POSTGRES_DOCUMENTS}'
+        )
+    if vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} '
+        f'USING fts5(name, content, labels, tags, board)'
+    )
+    schema_editor.execute(
+        f'INSERT INTO {TABLE} (rowid, name, content, labels, tags, board) '
+        f'{DOCUMENTS}'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0017_archived_card'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.1.3 on 2026-10-18 20:23
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def fill_card_stats(apps, schema_editor):
+    """Count the live cards, as rebuild_card_stats does."""
+    Card = apps.get_model('kanban', 'Card')
+    CardStats = apps.get_model('kanban', 'CardStats')
+    rows = (
+        Card.objects.filter(archived=False)
+        .values('container_id', 'container__board_id',
+                due_date=TruncDate('end_time'))
+        .annotate(cards=Count('id'), complexity=Sum('complexity'),
+                  hours=Sum('hours'))
+        .order_by()
+    )
+    CardStats.objects.bulk_create([
+        CardStats(
+            board_id=row['container__board_id'],
+            container_id=row['container_id'], due_date=row['due_date'],
+            cards=row['cards'], complexity=row['complexity'] or 0,
+            hours=row['hours'] or 0
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban', '0018_card_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_date', models.DateField(blank=True, null=True)),
+                ('cards', models.IntegerField(default=0)),
+                ('complexity', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('hours', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='card_stats', to='kanban.board')),
+                ('container', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='card_stats', to='kanban.container')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='cardstats',
+            constraint=models.UniqueConstraint(fields=('container', 'due_date'), name='cardstats_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='cardstats',
+            constraint=models.UniqueConstraint(condition=models.Q(due_date__isnull=True), fields=('container',), name='cardstats_undated'),
+        ),
+        migrations.RunPython(fill_card_stats, migrations.RunPython.noop),
+    ]
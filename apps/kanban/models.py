@@ -1,45 +1,583 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django.db.models import Max
-from django.template.defaultfilters import slugify
-import time
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .realtime import publish
+from .search import get_backend
+from .slugs import make_slug
+from .snapshots import invalidate_boards
 
 
 # helpers
-def max_container_position(board_id: int) -> int:
-    if board_id > 0:
-        # return the max container position for this board
-        query_result = (
-            Container
-            .objects
-            .filter(board__pk=board_id)
-            .aggregate(Max('position'))
+# positions are sparse: siblings are spaced POSITION_GAP apart so that moving
+# a card or container usually only rewrites its own row
+POSITION_GAP = 1024
+# largest value a PositiveIntegerField holds on every supported database
+MAX_POSITION = 2147483647
+
+
+def siblings_of(model, parent_id):
+    """The Cards of a Container or the Containers of a Board."""
+    return model.objects.filter(**{model.position_parent: parent_id})
+
+
+def counter_row(model, parent_id):
+    """Queryset for the parent row holding model's position counter."""
+    parent = model._meta.get_field(model.position_parent).related_model
+    return parent.objects.filter(pk=parent_id)
+
+
+def reserve_positions(model, parent_id, count=1) -> int:
+    """
+    Take count positions after the parent's counter and return the first.
+
+    The UPDATE locks the counter row until commit, so concurrent inserts
+    can never be handed the same position.
+    """
+    counter = model.position_counter
+    step = count * POSITION_GAP
+    with transaction.atomic():
+        reserved = (
+            counter_row(model, parent_id)
+            .filter(**{f'{counter}__lte': MAX_POSITION - step})
+            .update(**{counter: F(counter) + step})
         )
-        # query_result is a dict, return just the int value or zero if None
-        if query_result['position__max'] is None:
-            return 0
-        else:
-            return query_result['position__max']
-    else:
-        raise Exception('Invalid board id passed in')
+        if not reserved:
+            # out of room, respacing the siblings resets the counter
+            rebalance_positions(model, parent_id)
+            counter_row(model, parent_id).update(
+                **{counter: F(counter) + step}
+            )
+        last = counter_row(model, parent_id).values_list(
+            counter, flat=True
+        ).get()
+    return last - step + POSITION_GAP
+
+
+def raise_counter(model, parent_id, position: int) -> None:
+    """Make sure later appends land after an explicitly placed position."""
+    counter = model.position_counter
+    (
+        counter_row(model, parent_id)
+        .filter(**{f'{counter}__lt': position})
+        .update(**{counter: position})
+    )
 
 
-def max_card_position(container_id: int) -> int:
-    if container_id > 0:
-        # return the max card position for this container
-        query_result = (
-            Card
-            .objects
-            .filter(container__pk=container_id)
-            .aggregate(Max('position'))
+def boards_of_parent(model, parent_id) -> list:
+    """The board a Container of Cards or a Board of Containers belongs to."""
+    if model is Card:
+        return list(
+            Container.objects.filter(pk=parent_id)
+            .values_list('board_id', flat=True)
+        )
+    return [parent_id]
+
+
+def rows_event(model, kind, rows) -> dict:
+    """
+    A compact event listing rows for WebSocket clients, as [id, container,
+    position] for Cards and [id, position] for Containers.
+    """
+    if model is Card:
+        return {
+            'type': f'cards.{kind}',
+            'cards': [[row.pk, row.container_id, row.position]
+                      for row in rows],
+        }
+    return {
+        'type': f'containers.{kind}',
+        'containers': [[row.pk, row.position] for row in rows],
+    }
+
+
+def rebalance_positions(model, parent_id, insert=None) -> None:
+    """
+    Renumber siblings POSITION_GAP apart, keeping their current order.
+
+    If insert is given it is slotted in ahead of the first sibling whose
+    position is >= insert.position, and its position is set but not saved.
+    """
+    with transaction.atomic():
+        # lock the counter so nobody appends while positions are rewritten
+        list(counter_row(model, parent_id).select_for_update())
+        rows = list(
+            siblings_of(model, parent_id).order_by('position', 'id')
+        )
+        if insert is not None:
+            rows = [row for row in rows if row.pk != insert.pk]
+            index = next(
+                (i for i, row in enumerate(rows)
+                 if row.position >= insert.position),
+                len(rows)
+            )
+            rows.insert(index, insert)
+        now = timezone.now()
+        changed = []
+        for i, row in enumerate(rows, start=1):
+            if row.position != i * POSITION_GAP:
+                row.position = i * POSITION_GAP
+                if row is not insert:
+                    # bulk_update skips auto_now, keep sync cursors honest
+                    row.changed_time = now
+                    changed.append(row)
+        if changed:
+            model.objects.bulk_update(changed, ['position', 'changed_time'])
+            # bulk_update sends no signals
+            board_ids = boards_of_parent(model, parent_id)
+            invalidate_boards(board_ids)
+            publish(
+                board_ids,
+                rows_event(
+                    model, 'moved' if model is Card else 'reordered', changed
+                )
+            )
+        counter_row(model, parent_id).update(
+            **{model.position_counter: len(rows) * POSITION_GAP}
+        )
+
+
+def make_room(instance) -> None:
+    """
+    Keep instance.position unique among its siblings.
+
+    When the requested position is taken the instance is placed halfway
+    between the occupant and its predecessor, and the siblings are only
+    renumbered when there is no gap left to split. The counter is never
+    below a sibling's position, so it is only raised for a position past
+    the last sibling.
+    """
+    model = type(instance)
+    parent_id = getattr(instance, f'{model.position_parent}_id')
+    position = instance.position
+    found = (
+        siblings_of(model, parent_id).exclude(pk=instance.pk)
+        .aggregate(
+            taken=Count('id', filter=Q(position=position)),
+            lower=Max('position', filter=Q(position__lt=position)),
+            last=Max('position')
+        )
+    )
+    if found['last'] is None or found['last'] < position:
+        raise_counter(model, parent_id, position)
+    if not found['taken']:
+        return
+    lower = found['lower'] or 0
+    if instance.position - lower > 1:
+        instance.position = (lower + instance.position) // 2
+    else:
+        rebalance_positions(model, parent_id, insert=instance)
+
+
+def bulk_move_cards(moves, user=None) -> list:
+    """
+    Apply many card moves in one transaction.
+
+    moves is a list of (card, container_id, position) tuples, position may
+    be None to append. A moved card lands ahead of any card already at its
+    requested position, each target container is renumbered once and all
+    rows are written with bulk_update. Returns the moved cards.
+    """
+    now = timezone.now()
+    moved = {card.pk: card for card, container_id, position in moves}
+    targets = {container_id for card, container_id, position in moves}
+    sources = {card.container_id for card in moved.values()}
+    origins = {card.pk: card.container_id for card in moved.values()}
+    with transaction.atomic():
+        # lock the targets' position counters against concurrent appends
+        list(Container.objects.select_for_update().filter(pk__in=targets))
+        siblings = (
+            Card.objects
+            .select_for_update()
+            .filter(container__pk__in=targets)
+            .exclude(pk__in=moved)
+            .order_by('container', 'position', 'id')
+        )
+        # sort key puts a moved card ahead of a sibling at the same position
+        # and cards without a position at the end, in request order
+        rows = {container_id: [] for container_id in targets}
+        for sibling in siblings:
+            rows[sibling.container_id].append(
+                ((sibling.position, 1, 0), sibling)
+            )
+        for i, (card, container_id, position) in enumerate(moves):
+            card.container_id = container_id
+            key = (position, 0, i) if position else (MAX_POSITION + 1, 1, i)
+            rows[container_id].append((key, card))
+        changed_siblings = []
+        for container_id, container_rows in rows.items():
+            container_rows.sort(key=lambda row: row[0])
+            raise_counter(
+                Card, container_id, len(container_rows) * POSITION_GAP
+            )
+            for i, (key, card) in enumerate(container_rows, start=1):
+                if card.pk in moved:
+                    card.position = i * POSITION_GAP
+                elif card.position != i * POSITION_GAP:
+                    card.position = i * POSITION_GAP
+                    changed_siblings.append(card)
+        for card in moved.values():
+            card.changed_by = user
+            card.changed_time = now
+        for card in changed_siblings:
+            card.changed_time = now
+        Card.objects.bulk_update(
+            list(moved.values()),
+            ['container', 'position', 'changed_by', 'changed_time']
+        )
+        Card.objects.bulk_update(
+            changed_siblings, ['position', 'changed_time']
+        )
+        # bulk_update sends no signals, reindex the cards moved to other
+        # boards, drop the cached board snapshots and tell the boards'
+        # listeners here
+        board_of = dict(
+            Container.objects
+            .filter(pk__in=targets | sources)
+            .values_list('id', 'board_id')
+        )
+        get_backend().index([
+            card.pk for card in moved.values()
+            if board_of[card.container_id] != board_of[origins[card.pk]]
+        ])
+        stats = {}
+        for card in moved.values():
+            fields = (card.end_time, card.complexity, card.hours,
+                      card.archived)
+            add_card_stats(stats, card_stats_row(origins[card.pk], *fields),
+                           sign=-1)
+            add_card_stats(stats, card_stats_row(card.container_id, *fields))
+        apply_card_stats(stats)
+        board_ids = list(board_of.values())
+        invalidate_boards(board_ids)
+        publish(
+            board_ids,
+            rows_event(Card, 'moved', list(moved.values()) + changed_siblings)
+        )
+    return list(moved.values())
+
+
+def bulk_create_auditable(model, rows, user=None) -> list:
+    """
+    Create many Cards or Containers with a handful of queries.
+
+    rows is a list of (fields, links, position) tuples: fields for the
+    model, links mapping m2m field names to related objects and position
+    None to append. Slugs and positions are assigned in memory, rows and
+    m2m links are written with bulk_create and explicitly positioned rows
+    are placed afterwards. Returns the instances in the order given.
+    """
+    parent = model.position_parent
+    instances = [
+        model(**{**fields, 'created_by': user}) for fields, _, _ in rows
+    ]
+    per_parent = {}
+    for instance in instances:
+        instance.slug = make_slug(instance.name)
+        per_parent.setdefault(getattr(instance, f'{parent}_id'), []).append(
+            instance
         )
-        # query_result is a dict, return just the int value or zero if None
-        if query_result['position__max'] is None:
-            return 0
+    with transaction.atomic():
+        for parent_id, children in per_parent.items():
+            first = reserve_positions(model, parent_id, count=len(children))
+            for i, instance in enumerate(children):
+                instance.position = first + i * POSITION_GAP
+        model.objects.bulk_create(instances)
+        if any(instance.pk is None for instance in instances):
+            # the backend can't return ids from a bulk insert, the slugs
+            # are unique so read them back in one query
+            ids = dict(
+                model.objects
+                .filter(slug__in=[instance.slug for instance in instances])
+                .values_list('slug', 'id')
+            )
+            for instance in instances:
+                instance.pk = ids[instance.slug]
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            through.objects.bulk_create([
+                through(**{source: instance, target: related})
+                for instance, (_, links, _) in zip(instances, rows)
+                for related in links.get(field.name, [])
+            ])
+        placed = [
+            (instance, getattr(instance, f'{parent}_id'), position)
+            for instance, (_, _, position) in zip(instances, rows)
+            if position
+        ]
+        if model is Card:
+            if placed:
+                bulk_move_cards(placed, user=user)
+        else:
+            for instance, parent_id, position in placed:
+                instance.position = position
+                instance.save(update_fields=['position'])
+        # bulk_create sends no signals, index and count the cards, drop the
+        # cached board snapshots and tell the boards' listeners here
+        if model is Card:
+            get_backend().index([instance.pk for instance in instances])
+            stats = {}
+            for instance in instances:
+                add_card_stats(stats, card_stats_row(
+                    instance.container_id, instance.end_time,
+                    instance.complexity, instance.hours, instance.archived
+                ))
+            apply_card_stats(stats)
+            board_ids = list(
+                Container.objects
+                .filter(pk__in=per_parent)
+                .values_list('board_id', flat=True)
+            )
         else:
-            return query_result['position__max']
+            board_ids = list(per_parent)
+        invalidate_boards(board_ids)
+        publish(board_ids, rows_event(model, 'created', instances))
+    return instances
+
+
+def archive_cascade(instance) -> dict:
+    """The rows archiving a Board, Container or Card cascades to, by entity."""
+    if isinstance(instance, Card):
+        return {'cards': Card.objects.filter(pk=instance.pk)}
+    if isinstance(instance, Board):
+        return {
+            'boards': Board.objects.filter(pk=instance.pk),
+            'containers': Container.objects.filter(board=instance),
+            'cards': Card.objects.filter(container__board=instance),
+        }
+    return {
+        'containers': Container.objects.filter(pk=instance.pk),
+        'cards': Card.objects.filter(container=instance),
+    }
+
+
+def card_stats_row(container_id, end_time, complexity, hours, archived):
+    """
+    The CardStats bucket a card counts in and what it adds there, None for
+    archived cards which count nowhere.
+    """
+    if archived or container_id is None:
+        return None
+    due_date = timezone.localdate(end_time) if end_time else None
+    return (container_id, due_date), (1, complexity or 0, hours or 0)
+
+
+def add_card_stats(deltas, row, sign=1) -> dict:
+    """
+    Add a card_stats_row, or take it away with sign -1, to deltas mapping
+    (container id, due date) to (cards, complexity, hours).
+    """
+    if row is not None:
+        key, values = row
+        deltas[key] = tuple(
+            total + sign * value
+            for total, value in zip(deltas.get(key, (0, 0, 0)), values)
+        )
+    return deltas
+
+
+def card_stats_totals(cards) -> dict:
+    """
+    A queryset of cards summed per (container id, due date), with one
+    query. Returns {key: (board id, cards, complexity, hours)}.
+    """
+    rows = (
+        cards
+        .values('container_id', 'container__board_id',
+                due_date=TruncDate('end_time'))
+        .annotate(
+            cards=Count('id'), complexity=Sum('complexity'),
+            hours=Sum('hours')
+        )
+        .order_by()
+    )
+    return {
+        (row['container_id'], row['due_date']): (
+            row['container__board_id'], row['cards'],
+            row['complexity'] or 0, row['hours'] or 0
+        )
+        for row in rows
+    }
+
+
+def apply_card_stats(deltas) -> None:
+    """
+    Write deltas, see add_card_stats, to the CardStats rows with an UPDATE
+    per bucket, creating buckets on their first card and dropping the ones
+    left empty.
+    """
+    deltas = {key: values for key, values in deltas.items() if any(values)}
+    if not deltas:
+        return
+    with transaction.atomic(savepoint=False):
+        for (container_id, due_date), values in deltas.items():
+            cards, complexity, hours = values
+            bucket = CardStats.objects.filter(
+                container_id=container_id, due_date=due_date
+            )
+            changes = {
+                'cards': F('cards') + cards,
+                'complexity': F('complexity') + complexity,
+                'hours': F('hours') + hours,
+            }
+            # a missing bucket taking cards away went with its container
+            if bucket.update(**changes) or cards <= 0:
+                continue
+            board_id = Container.objects.filter(
+                pk=container_id
+            ).values_list('board_id', flat=True).get()
+            try:
+                with transaction.atomic():
+                    CardStats.objects.create(
+                        board_id=board_id, container_id=container_id,
+                        due_date=due_date, cards=cards,
+                        complexity=complexity, hours=hours
+                    )
+            except IntegrityError:
+                # a concurrent write created it first
+                bucket.update(**changes)
+        if any(values[0] < 0 for values in deltas.values()):
+            CardStats.objects.filter(
+                container_id__in={key[0] for key in deltas}, cards__lte=0
+            ).delete()
+
+
+def rebuild_card_stats() -> int:
+    """
+    Recompute every CardStats row from the cards in one transaction.
+    Returns the number of buckets that were wrong or missing.
+    """
+    with transaction.atomic():
+        stored = {
+            (row.container_id, row.due_date): (
+                row.board_id, row.cards, row.complexity, row.hours
+            )
+            for row in CardStats.objects.all()
+        }
+        CardStats.objects.all().delete()
+        totals = card_stats_totals(Card.live.all())
+        CardStats.objects.bulk_create([
+            CardStats(
+                board_id=board_id, container_id=container_id,
+                due_date=due_date, cards=cards, complexity=complexity,
+                hours=hours
+            )
+            for (container_id, due_date), (board_id, cards, complexity,
+                                           hours) in totals.items()
+        ], batch_size=500)
+    return sum(
+        stored.get(key) != values for key, values in totals.items()
+    ) + len(stored.keys() - totals.keys())
+
+
+def board_stats(board_id) -> dict:
+    """
+    The card totals of a board and of each container on it holding cards,
+    read from its CardStats rows with one query.
+    """
+    rows = (
+        CardStats.objects.filter(board_id=board_id, cards__gt=0)
+        .values('container')
+        .annotate(
+            total_cards=Sum('cards'), total_complexity=Sum('complexity'),
+            total_hours=Sum('hours'), overdue=Sum('cards', filter=Q(
+                due_date__lt=timezone.localdate()
+            ))
+        )
+        .order_by('container')
+    )
+    containers = [
+        {
+            'container': row['container'],
+            'cards': row['total_cards'],
+            'complexity': row['total_complexity'],
+            'hours': row['total_hours'],
+            'overdue': row['overdue'] or 0,
+        }
+        for row in rows
+    ]
+    return {
+        'board': board_id,
+        **{
+            total: sum(row[total] for row in containers)
+            for total in ('cards', 'complexity', 'hours', 'overdue')
+        },
+        'containers': containers,
+    }
+
+
+def set_archived(instance, archived, user=None) -> dict:
+    """
+    Archive or unarchive a Board, Container or Card and everything on it,
+    with one UPDATE per table. Rows archived before instance keep their
+    own archived state: unarchiving only restores the rows archived along
+    with it. Returns the number of rows changed per entity.
+    """
+    now = timezone.now()
+    if archived:
+        changes = {
+            'archived': True, 'archived_by': user, 'archived_time': now
+        }
+        condition = Q(archived=False)
     else:
-        raise Exception('Invalid container id passed in')
+        changes = {
+            'archived': False, 'archived_by': None, 'archived_time': None
+        }
+        condition = Q(archived=True, archived_time=instance.archived_time)
+    with transaction.atomic():
+        cascade = archive_cascade(instance)
+        # the cards leave the stats when archived and rejoin when restored
+        sign = -1 if archived else 1
+        stats = {
+            key: tuple(sign * value for value in values[1:])
+            for key, values in card_stats_totals(
+                cascade['cards'].filter(condition)
+            ).items()
+        }
+        counts = {
+            entity: queryset.filter(condition).update(
+                changed_time=now, **changes
+            )
+            for entity, queryset in cascade.items()
+        }
+        apply_card_stats(stats)
+        # update() sends no signals, drop the cached board snapshot and
+        # tell the board's listeners here
+        if isinstance(instance, Board):
+            board_id = instance.pk
+        elif isinstance(instance, Card):
+            board_id = instance.container.board_id
+        else:
+            board_id = instance.board_id
+        invalidate_boards([board_id])
+        entity = type(instance).__name__.lower()
+        publish([board_id], {
+            'type': f'{entity}.{"archived" if archived else "unarchived"}',
+            'id': instance.pk,
+        })
+    for field, value in changes.items():
+        setattr(instance, field, value)
+    instance.changed_time = now
+    return counts
+
+
+class LoadedValuesMixin:
+    """Remember the values a row was loaded with, so moves can be detected."""
+
+    # https://docs.djangoproject.com/en/3.1/ref/models/instances/#customizing-model-loading
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def loaded_value(self, field_name):
+        """The value field_name had in the database, None if new."""
+        return getattr(self, '_loaded_values', {}).get(field_name)
 
 
 class KanBanUser(AbstractUser):
@@ -53,14 +591,22 @@ class KanBanUser(AbstractUser):
 # https://docs.djangoproject.com/en/3.1/ref/models/fields/#django.db.models.ForeignKey.related_name
 # abstract base classes:
 # https://docs.djangoproject.com/en/3.1/topics/db/models/#abstract-base-classes
+class ActiveManager(models.Manager):
+    """Rows that are not archived, Auditable.live."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(archived=False)
+
+
 class Auditable(models.Model):
     """A base class to define common auditable fields."""
     slug = models.SlugField(
         max_length=120, unique=True, blank=True, null=False
     )
+    # indexed by each model's (created_by, changed_time) index
     created_by = models.ForeignKey(
         KanBanUser, related_name='%(class)ss_created',
-        on_delete=models.SET_NULL, blank=True, null=True
+        on_delete=models.SET_NULL, blank=True, null=True, db_index=False
     )
     created_time = models.DateTimeField(auto_now_add=True)
     changed_by = models.ForeignKey(
@@ -75,13 +621,18 @@ class Auditable(models.Model):
     )
     archived_time = models.DateTimeField(blank=True, null=True)
 
+    # every row, as dumpdata, the admin and position maths need them, and
+    # only the rows that are not archived for the read paths
+    objects = models.Manager()
+    live = ActiveManager()
+
     class Meta:
         abstract = True
 
-    # slugify timestamp and name on initial save
+    # a unique slug from a ULID and the name on initial save
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify("-".join((str(time.time()), self.name)))
+            self.slug = make_slug(self.name)
         return super().save(*args, **kwargs)
 
 
@@ -91,6 +642,19 @@ class Board(Auditable):
         max_length=50,
         blank=False, null=False
     )
+    # position handed to the last appended container, see reserve_positions
+    last_container_position = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+
+    class Meta:
+        indexes = [
+            # sync cursors and ETags scan a user's rows by changed_time
+            models.Index(
+                fields=['created_by', 'changed_time'],
+                name='board_user_changed'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -98,12 +662,16 @@ class Board(Auditable):
 
 class Member(models.Model):
     """A Member maps a KanBanUser to a Board and provides additional fields."""
+    # indexed by unique_board_member and member_user_board
     board = models.ForeignKey(Board, related_name='members',
-                              on_delete=models.CASCADE, null=False)
+                              on_delete=models.CASCADE, null=False,
+                              db_index=False)
     user = models.ForeignKey(KanBanUser, related_name='memberships',
-                             on_delete=models.CASCADE, null=False)
+                             on_delete=models.CASCADE, null=False,
+                             db_index=False)
     starred = models.BooleanField(default=False, blank=True, null=False)
     position = models.PositiveSmallIntegerField(blank=True, null=False)
+    changed_time = models.DateTimeField(auto_now=True)
 
     class Meta:
         constraints = [
@@ -112,9 +680,13 @@ class Member(models.Model):
                 name='unique_board_member'
             )
         ]
+        indexes = [
+            # a user's boards, resolved from their memberships
+            models.Index(fields=['user', 'board'], name='member_user_board'),
+        ]
 
 
-class Tag(models.Model):
+class Tag(LoadedValuesMixin, models.Model):
     """A Tag is only visible to the KanBanUser that created it."""
     user = models.ForeignKey(
         KanBanUser, related_name='tags', on_delete=models.CASCADE,
@@ -126,6 +698,7 @@ class Tag(models.Model):
     color = models.CharField(
         max_length=32, default="#aaaaaa", blank=True, null=False
     )
+    changed_time = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -135,7 +708,7 @@ class Tag(models.Model):
         return super().create(validated_data)
 
 
-class Label(models.Model):
+class Label(LoadedValuesMixin, models.Model):
     """A Label is visible to the members of the Board that it belongs to."""
     board = models.ForeignKey(
         Board, related_name='labels', on_delete=models.CASCADE,
@@ -147,6 +720,7 @@ class Label(models.Model):
     color = models.CharField(
         max_length=32, default="#aaaaaa", blank=True, null=False
     )
+    changed_time = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -171,38 +745,60 @@ class Attachment(models.Model):
         return self.name
 
 
-class Container(Auditable):
+class Container(LoadedValuesMixin, Auditable):
     """A Container contains many Cards and belongs to a single Board."""
+    # indexed by container_board_position
     board = models.ForeignKey(
         Board, related_name="containers", on_delete=models.CASCADE,
-        blank=False, null=False
+        blank=False, null=False, db_index=False
     )
     name = models.CharField(
         max_length=50, blank=False, null=False
     )
-    position = models.PositiveSmallIntegerField(blank=True, null=False)
+    position = models.PositiveIntegerField(blank=True, null=False)
     labels = models.ManyToManyField(Label, blank=True)
     tags = models.ManyToManyField(Tag, blank=True)
+    # position handed to the last appended card, see reserve_positions
+    last_card_position = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+
+    position_parent = 'board'
+    position_counter = 'last_container_position'
+
+    class Meta:
+        indexes = [
+            # position maths and the board's foreign key use every row,
+            # reads of the live ones filter the few archived out
+            models.Index(
+                fields=['board', 'position'], name='container_board_position'
+            ),
+            models.Index(
+                fields=['created_by', 'changed_time'],
+                name='container_user_changed'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
+        # important! make sure 'reordering' kwarg is removed
+        do_reorder = kwargs.pop('reorder', True)
         if not self.position:
-            # get the max position of a containers in this container's board
-            max_position = max_container_position(self.board_id)
-            # increment that max position
-            new_position = max_position + 1
-            # set self.position
-            self.position = new_position
+            # append after the last container in this container's board
+            self.position = reserve_positions(Container, self.board_id)
+        elif do_reorder:
+            make_room(self)
         return super().save(*args, **kwargs)
 
 
-class Card(Auditable):
+class Card(LoadedValuesMixin, Auditable):
     """The most fundamental KanBan unit, represents an item or task."""
+    # indexed by card_container_position
     container = models.ForeignKey(
         Container, related_name='cards', on_delete=models.CASCADE,
-        blank=False, null=False
+        blank=False, null=False, db_index=False
     )
     name = models.CharField(
         max_length=100, blank=False, null=False
@@ -216,31 +812,32 @@ class Card(Auditable):
     hours = models.DecimalField(
         max_digits=12, decimal_places=4, blank=True, null=True
     )
-    position = models.PositiveSmallIntegerField(blank=True, null=False)
+    position = models.PositiveIntegerField(blank=True, null=False)
     assigned_users = models.ManyToManyField(Member, blank=True)
     labels = models.ManyToManyField(Label, blank=True)
     tags = models.ManyToManyField(Tag, blank=True)
     attachments = models.ManyToManyField(Attachment, blank=True)
 
+    position_parent = 'container'
+    position_counter = 'last_card_position'
+
+    class Meta:
+        indexes = [
+            # position maths and the container's foreign key use every row,
+            # reads of the live ones filter the few archived out
+            models.Index(
+                fields=['container', 'position'],
+                name='card_container_position'
+            ),
+            models.Index(
+                fields=['created_by', 'changed_time'],
+                name='card_user_changed'
+            ),
+        ]
+
     def reorder_cards(self):
-        """Card being saved is source of truth, reorder others around it"""
-        # get all the other cards in this container, ordered by position
-        cards = list(
-            Card.objects
-            .filter(container__pk=self.container_id)
-            .exclude(id=self.id)
-            .order_by('position')
-        )
-        i = 1
-        while len(cards) > 0:
-            if (i != self.position):
-                # pop the card with the lowest position, set position and save
-                c = cards.pop(0)
-                if (c.position != i):
-                    c.position = i
-                    # save with reorder kwarg False to prevent recursion
-                    c.save(reorder=False)
-            i += 1
+        """Renumber the cards in this container, this card included."""
+        rebalance_positions(Card, self.container_id, insert=self)
 
     def __str__(self):
         return self.name
@@ -249,13 +846,139 @@ class Card(Auditable):
         # important! make sure 'reordering' kwarg is removed
         # https://docs.python.org/3/library/stdtypes.html#dict.pop
         do_reorder = kwargs.pop('reorder', True)
-        if not self.position:
-            # get the max position of a cards in this card's containers
-            max_position = max_card_position(self.container_id)
-            # increment that max position
-            new_position = max_position + 1
-            # set self.position
-            self.position = new_position
-        if do_reorder:
-            self.reorder_cards()
-        return super().save(*args, **kwargs)
+        # the post_save handlers' CardStats and search index writes commit
+        # with the card
+        with transaction.atomic(savepoint=False):
+            if not self.position:
+                # append after the last card in this card's container
+                self.position = reserve_positions(Card, self.container_id)
+            elif do_reorder:
+                make_room(self)
+            return super().save(*args, **kwargs)
+
+
+class ArchivedCard(models.Model):
+    """
+    An archived Card moved out of the card table by compact_archives, see
+    .archives. It keeps the Card's id and its m2m links as lists of ids, so
+    it can be restored as it was.
+    """
+    id = models.IntegerField(primary_key=True)
+    slug = models.SlugField(max_length=120, unique=True)
+    # indexed by archivedcard_position
+    container = models.ForeignKey(
+        Container, related_name='archived_cards', on_delete=models.CASCADE,
+        db_index=False
+    )
+    name = models.CharField(max_length=100)
+    content = models.TextField(blank=True, null=True)
+    start_time = models.DateTimeField(blank=True, null=True)
+    end_time = models.DateTimeField(blank=True, null=True)
+    complexity = models.DecimalField(
+        max_digits=12, decimal_places=4, blank=True, null=True
+    )
+    hours = models.DecimalField(
+        max_digits=12, decimal_places=4, blank=True, null=True
+    )
+    position = models.PositiveIntegerField()
+    # indexed by archivedcard_user_changed
+    created_by = models.ForeignKey(
+        KanBanUser, related_name='+', on_delete=models.SET_NULL, null=True,
+        db_index=False
+    )
+    created_time = models.DateTimeField()
+    changed_by = models.ForeignKey(
+        KanBanUser, related_name='+', on_delete=models.SET_NULL, null=True
+    )
+    changed_time = models.DateTimeField()
+    archived_by = models.ForeignKey(
+        KanBanUser, related_name='+', on_delete=models.SET_NULL, null=True
+    )
+    archived_time = models.DateTimeField()
+    # m2m field name to related ids, e.g. {"labels": [1, 2]}
+    links = models.JSONField(default=dict)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['container', 'position'],
+                name='archivedcard_position'
+            ),
+            # archived cards are tombstones to incremental sync
+            models.Index(
+                fields=['created_by', 'changed_time'],
+                name='archivedcard_user_changed'
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class CardStats(models.Model):
+    """
+    Totals of the live Cards in a Container due on one day, or without an
+    end_time, so dashboards read a handful of rows instead of the cards.
+    Card writes keep them in the same transaction (see apply_card_stats)
+    and reconcile_stats rebuilds them.
+    """
+    board = models.ForeignKey(
+        Board, related_name='card_stats', on_delete=models.CASCADE
+    )
+    # indexed by cardstats_bucket
+    container = models.ForeignKey(
+        Container, related_name='card_stats', on_delete=models.CASCADE,
+        db_index=False
+    )
+    # end_time's date in the current time zone
+    due_date = models.DateField(blank=True, null=True)
+    cards = models.IntegerField(default=0)
+    complexity = models.DecimalField(
+        max_digits=16, decimal_places=4, default=0
+    )
+    hours = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['container', 'due_date'], name='cardstats_bucket'
+            ),
+            # NULLs never collide in the constraint above
+            models.UniqueConstraint(
+                fields=['container'], condition=Q(due_date__isnull=True),
+                name='cardstats_undated'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.container_id} {self.due_date}'
+
+
+class Tombstone(models.Model):
+    """Records a deleted Board, Container or Card for incremental sync."""
+    ENTITY_CHOICES = [
+        ('boards', 'Board'),
+        ('containers', 'Container'),
+        ('cards', 'Card'),
+    ]
+    entity = models.CharField(
+        max_length=20, choices=ENTITY_CHOICES, blank=False, null=False
+    )
+    object_id = models.PositiveIntegerField(blank=False, null=False)
+    # indexed by tombstone_user_time
+    created_by = models.ForeignKey(
+        KanBanUser, related_name='tombstones',
+        on_delete=models.SET_NULL, blank=True, null=True, db_index=False
+    )
+    deleted_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_by', 'deleted_time'],
+                name='tombstone_user_time'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.entity} {self.object_id}'
@@ -0,0 +1,107 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination over a composite ordering.
+
+    The cursor holds the ordering values of the last row served and the
+    next page is read with a WHERE on those values, so a deep page costs the
+    same index range scan as the first. Views set `ordering` to a tuple of
+    non-null fields ending in a unique one, e.g. ('container', 'position',
+    'id'); it defaults to ('id',).
+    """
+    ordering = ('id',)
+    page_size = api_settings.PAGE_SIZE or 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fields = tuple(getattr(view, 'ordering', self.ordering))
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.fields)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                queryset = queryset.filter(self.after(self.decode(cursor)))
+            except (ValueError, ValidationError):
+                raise NotFound('Invalid cursor')
+        # read one extra row to learn whether there is a next page
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        values = [
+            str(getattr(last, last._meta.get_field(field).attname))
+            for field in self.fields
+        ]
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode(values)
+        )
+
+    def after(self, values):
+        """Rows strictly after values in lexicographic ordering order."""
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            step = Q(**{f'{field}__gt': values[i]})
+            for earlier, value in zip(self.fields[:i], values[:i]):
+                step &= Q(**{earlier: value})
+            condition |= step
+        return condition
+
+    def encode(self, values) -> str:
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise NotFound('Invalid cursor')
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise NotFound('Invalid cursor')
+        return values
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
@@ -0,0 +1,120 @@
+"""
+Board membership permissions.
+
+A user can reach a board they created or are a Member of, and every row
+on it. The ids of those boards are read with one query the first time a
+request needs them and remembered on the request, then used both to
+scope querysets and to check single objects, so no check queries per row.
+Related objects named in a write are looked up in the same scope.
+"""
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import BasePermission
+
+from .models import Board, Member
+
+
+def board_ids_of(user):
+    """
+    Ids of the boards user created or is a member of, archived or not, as
+    one query.
+    """
+    return (
+        Board.objects.filter(created_by=user)
+        .values_list('id', flat=True)
+        .union(
+            Member.objects.filter(user=user)
+            .values_list('board_id', flat=True)
+        )
+    )
+
+
+def accessible_board_ids(request) -> frozenset:
+    """board_ids_of the request's user, queried once per request."""
+    board_ids = getattr(request, '_kanban_board_ids', None)
+    if board_ids is None:
+        board_ids = frozenset(board_ids_of(request.user))
+        request._kanban_board_ids = board_ids
+    return board_ids
+
+
+def on_boards(board_lookup):
+    """
+    A related field scope, see CachedHyperlinkedRelatedField: the rows on
+    the request's boards, board_lookup leading from them to their Board.
+    """
+    def scope(queryset, request):
+        return queryset.filter(**{
+            f'{board_lookup}__in': accessible_board_ids(request)
+        })
+    return scope
+
+
+def owned_by(user_lookup):
+    """A related field scope: the rows of the request's user."""
+    def scope(queryset, request):
+        return queryset.filter(**{user_lookup: request.user})
+    return scope
+
+
+def board_id_of(obj, board_lookup):
+    """
+    Follow board_lookup, as used by BoardScopedMixin, from obj to the id
+    of its board.
+    """
+    if board_lookup == 'pk':
+        return obj.pk
+    *hops, last = board_lookup.split('__')
+    for hop in hops:
+        obj = getattr(obj, hop)
+    return getattr(obj, f'{last}_id')
+
+
+class IsBoardMember(BasePermission):
+    """Allow access to the rows on the boards the user can reach."""
+    message = 'You are not a member of this board.'
+
+    def has_object_permission(self, request, view, obj):
+        return board_id_of(obj, view.board_lookup) in \
+            accessible_board_ids(request)
+
+
+class BoardScopedMixin:
+    """
+    Limit a viewset to rows on the caller's boards. board_lookup is the
+    path from the model to its Board, 'pk' for Boards themselves. Writes
+    may only place rows on those boards too.
+    """
+    board_lookup = 'board'
+
+    def get_queryset(self):
+        queryset = super().get_queryset().filter(**{
+            f'{self.board_lookup}__in': accessible_board_ids(self.request)
+        })
+        hops = self.board_lookup.split('__')[:-1]
+        if hops:
+            # IsBoardMember follows the path without querying
+            queryset = queryset.select_related('__'.join(hops))
+        return queryset
+
+    def check_boards(self, validated_data):
+        """Deny writes placing rows on boards the user can't reach."""
+        if self.board_lookup == 'pk':
+            return
+        rows = validated_data
+        if not isinstance(rows, list):
+            rows = [rows]
+        field, _, rest = self.board_lookup.partition('__')
+        board_ids = {
+            board_id_of(row[field], rest or 'pk')
+            for row in rows if row.get(field) is not None
+        }
+        if not board_ids <= accessible_board_ids(self.request):
+            raise PermissionDenied(IsBoardMember.message)
+
+    def perform_create(self, serializer):
+        self.check_boards(serializer.validated_data)
+        super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        self.check_boards(serializer.validated_data)
+        super().perform_update(serializer)
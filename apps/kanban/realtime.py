@@ -0,0 +1,125 @@
+"""
+Board change events for WebSocket clients, see .sockets.
+
+Writes publish compact JSON events to a channel per board once their
+transaction commits. A broker fans them out to the sockets subscribed to
+that board; listeners cost no database queries while they wait. The broker
+is pluggable through KANBAN_REALTIME_BROKER: the default InProcessBroker
+only reaches sockets served by the process that made the change, so run one
+ASGI process or plug in a broker backed by a shared message bus.
+"""
+import asyncio
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# sent instead of the events a slow listener missed, it should refetch
+RESYNC = json.dumps({'type': 'resync'})
+
+
+def board_channel(board_id) -> str:
+    return f'board:{board_id}'
+
+
+class Subscription:
+    """The events of one channel for one listener, read with get()."""
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+    def put(self, message) -> None:
+        """Queue a message, must be called on the listener's loop."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # drop the backlog rather than buffer without bound
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    Interface of the event fan out. publish() is called from request
+    threads and must not block; subscribe() is called on an event loop.
+    """
+
+    def publish(self, channel, message) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, channel) -> Subscription:
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription) -> None:
+        raise NotImplementedError
+
+
+class InProcessBroker(Broker):
+    """Fan out to the subscriptions of this process."""
+
+    def __init__(self):
+        self.channels = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel) -> Subscription:
+        subscription = Subscription(
+            self, channel, getattr(settings, 'KANBAN_REALTIME_QUEUE_SIZE', 100)
+        )
+        with self.lock:
+            self.channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription) -> None:
+        with self.lock:
+            listeners = self.channels.get(subscription.channel, set())
+            listeners.discard(subscription)
+            if not listeners:
+                self.channels.pop(subscription.channel, None)
+
+    def publish(self, channel, message) -> None:
+        with self.lock:
+            listeners = list(self.channels.get(channel, ()))
+        for subscription in listeners:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription.put, message
+                )
+            except RuntimeError:
+                # the listener's loop is gone
+                self.unsubscribe(subscription)
+
+
+@lru_cache(maxsize=None)
+def get_broker() -> Broker:
+    return import_string(getattr(
+        settings, 'KANBAN_REALTIME_BROKER',
+        'apps.kanban.realtime.InProcessBroker'
+    ))()
+
+
+def publish(board_ids, event) -> None:
+    """Send event to the listeners of each board once the write commits."""
+    board_ids = set(board_ids) - {None}
+    if not board_ids:
+        return
+    message = json.dumps(event, separators=(',', ':'))
+
+    def send():
+        broker = get_broker()
+        for board_id in board_ids:
+            broker.publish(board_channel(board_id), message)
+
+    transaction.on_commit(send)
@@ -0,0 +1,295 @@
+"""
+Full-text search over cards.
+
+On SQLite cards are indexed in an FTS5 table, kanban_card_search, holding
+a card's name, content, label and tag names and a token naming its board
+under the card's id. It is kept up to date by the signals in .signals and
+by the bulk paths, reindex_search refills it. A search matches whole words
+on the caller's boards. By default cards whose name holds every word come
+first, then those matching within name, labels and tags, then the rest,
+newest first within each rank: FTS5 hands its matches over in id order,
+so each rank stops reading at the limit however common the words are.
+KANBAN_SEARCH_RANKING = 'bm25' ranks every match with FTS5's bm25()
+instead, name matches weighing most; it reads every match and the word
+counts of the whole index, and is several times slower on common words.
+Setting KANBAN_SEARCH_CANDIDATES ranks only that many of the newest
+matches, approximate: an older card matching better is missed.
+
+On Postgres the same table holds a weighted tsvector of each card and its
+board, matches are ranked with ts_rank(). Other databases fall back to
+LikeSearch, an unindexed scan; KANBAN_SEARCH_BACKEND plugs in another.
+"""
+import re
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+TABLE = 'kanban_card_search'
+COLUMNS = ('name', 'content', 'labels', 'tags')
+# bm25() weights of the columns, the board token is only a filter
+WEIGHTS = (10.0, 1.0, 4.0, 4.0, 0.0)
+# the columns holding every word of a card's default rank, best first
+RANKS = (('name',), ('name', 'labels', 'tags'), COLUMNS)
+# the indexed document of each card, its id first
+DOCUMENTS = (
+    "SELECT c.id, c.name, coalesce(c.content, ''), "
+    "coalesce((SELECT group_concat(l.name, ' ') "
+    "FROM kanban_card_labels AS cl "
+    "JOIN kanban_label AS l ON l.id = cl.label_id "
+    "WHERE cl.card_id = c.id), ''), "
+    "coalesce((SELECT group_concat(t.name, ' ') "
+    "FROM kanban_card_tags AS ct "
+    "JOIN kanban_tag AS t ON t.id = ct.tag_id "
+    "WHERE ct.card_id = c.id), ''), "
+    "'b' || k.board_id "
+    "FROM kanban_card AS c "
+    "JOIN kanban_container AS k ON k.id = c.container_id"
+)
+# the Postgres document of each card, its id and board first; the weights
+# rank name matches over label and tag matches over content ones
+POSTGRES_DOCUMENTS = (
+    "SELECT c.id, k.board_id, "
+    "setweight(to_tsvector('simple', c.name), 'A') || "
+    "setweight(to_tsvector('simple', "
+    "coalesce((SELECT string_agg(l.name, ' ') "
+    "FROM kanban_card_labels AS cl "
+    "JOIN kanban_label AS l ON l.id = cl.label_id "
+    "WHERE cl.card_id = c.id), '') || ' ' || "
+    "coalesce((SELECT string_agg(t.name, ' ') "
+    "FROM kanban_card_tags AS ct "
+    "JOIN kanban_tag AS t ON t.id = ct.tag_id "
+    "WHERE ct.card_id = c.id), '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(c.content, '')), 'D') "
+    "FROM kanban_card AS c "
+    "JOIN kanban_container AS k ON k.id = c.container_id"
+)
+
+
+def card_model():
+    # looked up lazily, .models indexes the cards it bulk creates
+    return apps.get_model('kanban', 'Card')
+
+
+def terms_of(text) -> list:
+    # words as FTS5's unicode61 tokenizer splits them
+    return re.findall(r'[^\W_]+', text.lower())
+
+
+def placeholders(values) -> str:
+    return ', '.join(['%s'] * len(values))
+
+
+def chunks(card_ids, size=500):
+    """card_ids in lists short enough for SQLite's parameter limit."""
+    card_ids = list(card_ids)
+    for start in range(0, len(card_ids), size):
+        yield card_ids[start:start + size]
+
+
+class SearchBackend:
+    """Keeps an index of cards and finds the ids matching a query."""
+
+    def index(self, card_ids) -> None:
+        """Index these cards anew."""
+
+    def remove(self, card_ids) -> None:
+        """Drop these cards from the index."""
+
+    def search(self, query, board_ids, limit) -> list:
+        """Ids of the live cards on board_ids matching query, best first."""
+        raise NotImplementedError
+
+    def rebuild(self) -> int:
+        """Index every card anew, returns how many were indexed."""
+        card_ids = list(card_model().objects.values_list('id', flat=True))
+        self.index(card_ids)
+        return len(card_ids)
+
+
+class LikeSearch(SearchBackend):
+    """Needs no index, scans every card with LIKE."""
+
+    def search(self, query, board_ids, limit) -> list:
+        condition = Q()
+        for term in terms_of(query):
+            condition &= (
+                Q(name__icontains=term) | Q(content__icontains=term) |
+                Q(labels__name__icontains=term) |
+                Q(tags__name__icontains=term)
+            )
+        return list(
+            card_model().live
+            .filter(condition, container__board__in=board_ids)
+            .order_by('-changed_time')
+            .values_list('id', flat=True)
+            .distinct()[:limit]
+        )
+
+
+class FTS5Search(SearchBackend):
+    """SQLite FTS5, the table is created by migration 0018."""
+
+    def index(self, card_ids) -> None:
+        for chunk in chunks(card_ids):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT OR REPLACE INTO {TABLE} '
+                    f'(rowid, name, content, labels, tags, board) '
+                    f'{DOCUMENTS} '
+                    f'WHERE c.id IN ({placeholders(chunk)})',
+                    chunk
+                )
+
+    def rebuild(self) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+            cursor.execute(
+                f'INSERT INTO {TABLE} '
+                f'(rowid, name, content, labels, tags, board) {DOCUMENTS}'
+            )
+            return cursor.rowcount
+
+    def remove(self, card_ids) -> None:
+        for chunk in chunks(card_ids):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {TABLE} WHERE rowid IN '
+                    f'({placeholders(chunk)})',
+                    chunk
+                )
+
+    def search(self, query, board_ids, limit) -> list:
+        terms = terms_of(query)
+        board_ids = list(board_ids)
+        if not terms or not board_ids:
+            return []
+        # quoted so user input can't use the query syntax; the board
+        # tokens let FTS5 skip the matches on other boards, the join
+        # checks them against the boards themselves
+        words = ' '.join(f'"{term}"' for term in terms)
+        scope = f'board : ({" OR ".join(f"b{pk}" for pk in board_ids)})'
+        matches = (
+            f'FROM {TABLE} '
+            f'JOIN kanban_card AS c ON c.id = {TABLE}.rowid '
+            f'JOIN kanban_container AS k ON k.id = c.container_id '
+            f'WHERE {TABLE} MATCH %s AND NOT c.archived '
+            f'AND k.board_id IN ({placeholders(board_ids)})'
+        )
+
+        def match(columns):
+            return f'{{{" ".join(columns)}}} : ({words}) AND {scope}'
+
+        with connection.cursor() as cursor:
+            if getattr(settings, 'KANBAN_SEARCH_RANKING', None) == 'bm25':
+                return self.rank_bm25(
+                    cursor, matches, [match(COLUMNS), *board_ids], limit
+                )
+            found = []
+            for columns in RANKS:
+                # the cards found so far match again, wherever they are
+                cursor.execute(
+                    f'SELECT {TABLE}.rowid {matches} '
+                    f'ORDER BY {TABLE}.rowid DESC LIMIT %s',
+                    [match(columns), *board_ids, limit + len(found)]
+                )
+                for (pk,) in cursor.fetchall():
+                    if pk not in found:
+                        found.append(pk)
+                if len(found) >= limit:
+                    break
+            return found[:limit]
+
+    def rank_bm25(self, cursor, matches, params, limit) -> list:
+        candidates = getattr(settings, 'KANBAN_SEARCH_CANDIDATES', None)
+        weights = ', '.join(map(str, WEIGHTS))
+        if candidates:
+            # the id of the oldest candidate, FTS5 takes the ids from it on
+            # as a range
+            cursor.execute(
+                f'SELECT {TABLE}.rowid {matches} '
+                f'ORDER BY {TABLE}.rowid DESC LIMIT 1 OFFSET %s',
+                [*params, candidates - 1]
+            )
+            oldest = cursor.fetchone()
+            if oldest is not None:
+                matches += f' AND {TABLE}.rowid >= %s'
+                params = [*params, oldest[0]]
+        cursor.execute(
+            f'SELECT {TABLE}.rowid {matches} '
+            f'ORDER BY bm25({TABLE}, {weights}), {TABLE}.rowid DESC '
+            f'LIMIT %s',
+            [*params, limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearch(SearchBackend):
+    """A GIN indexed tsvector, the table is created by migration 0018."""
+
+    def index(self, card_ids) -> None:
+        for chunk in chunks(card_ids):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {TABLE} (card_id, board_id, document) '
+                    f'{POSTGRES_DOCUMENTS} '
+                    f'WHERE c.id IN ({placeholders(chunk)}) '
+                    f'ON CONFLICT (card_id) DO UPDATE SET '
+                    f'board_id = EXCLUDED.board_id, '
+                    f'document = EXCLUDED.document',
+                    chunk
+                )
+
+    def rebuild(self) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+            cursor.execute(
+                f'INSERT INTO {TABLE} (card_id, board_id, document) '
+                f'{POSTGRES_DOCUMENTS}'
+            )
+            return cursor.rowcount
+
+    def remove(self, card_ids) -> None:
+        for chunk in chunks(card_ids):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {TABLE} '
+                    f'WHERE card_id IN ({placeholders(chunk)})',
+                    chunk
+                )
+
+    def search(self, query, board_ids, limit) -> list:
+        # the words as the other backends split them, plainto_tsquery
+        # wants every one of them
+        words = ' '.join(terms_of(query))
+        board_ids = list(board_ids)
+        if not words or not board_ids:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT s.card_id FROM {TABLE} AS s "
+                f"JOIN kanban_card AS c ON c.id = s.card_id "
+                f"JOIN kanban_container AS k ON k.id = c.container_id, "
+                f"plainto_tsquery('simple', %s) AS q "
+                f"WHERE s.document @@ q AND NOT c.archived "
+                f"AND s.board_id IN ({placeholders(board_ids)}) "
+                f"AND k.board_id = s.board_id "
+                f"ORDER BY ts_rank(s.document, q) DESC, s.card_id DESC "
+                f"LIMIT %s",
+                [words, *board_ids, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+@lru_cache(maxsize=None)
+def get_backend() -> SearchBackend:
+    path = getattr(settings, 'KANBAN_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    backend = {
+        'sqlite': FTS5Search, 'postgresql': PostgresSearch,
+    }.get(connection.vendor, LikeSearch)
+    return backend()
@@ -1,8 +1,15 @@
-from rest_framework.serializers import (HyperlinkedModelSerializer,
-                                        HyperlinkedRelatedField, Serializer)
-
-from .models import (Attachment, Board, Card, Container, KanBanUser, Label,
-                     Member, Tag)
+from django.db.models import Prefetch
+from rest_framework.serializers import (DateTimeField, DecimalField,
+                                        DictField, HyperlinkedModelSerializer,
+                                        HyperlinkedRelatedField, IntegerField,
+                                        ListField, ListSerializer, Serializer)
+from rest_framework.utils import model_meta
+
+from .flat import FlatSerializer
+from .metrics import TimedSerializerMixin
+from .models import (ArchivedCard, Attachment, Board, Card, Container,
+                     KanBanUser, Label, Member, Tag, bulk_create_auditable)
+from .permissions import on_boards, owned_by
 
 # constants
 AUDITABLE_FIELDS = [
@@ -11,31 +18,139 @@ AUDITABLE_FIELDS = [
 ]
 
 
-class BoardSerializer(HyperlinkedModelSerializer):
-    """Serialize a Board object."""
+# helpers
+def prefetch_ids(lookup, model, *fields):
+    """
+    Prefetch a relation rendered as hyperlinks, loading only the columns
+    needed to build the url (reverse foreign keys also need their fk).
+    Archived Containers and Cards are left out, as in lists.
+    """
+    manager = getattr(model, 'live', model.objects)
+    return Prefetch(lookup, queryset=manager.only('id', *fields))
+
+
+def eager_load(queryset, fields, prefetches):
+    """Apply the prefetches of rendered fields, all if fields is None."""
+    return queryset.prefetch_related(*[
+        prefetch for prefetch in prefetches
+        if fields is None or prefetch.prefetch_to in fields
+    ])
+
+
+def requested_fields(request):
+    """The set of fields asked for with ?fields=a,b on a read, else None."""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',')}
+
+
+class SparseFieldsMixin(TimedSerializerMixin):
+    """
+    Render only the fields listed in ?fields= on top level reads. Also
+    reports its rendering time to RequestMetricsMiddleware.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # nested serializers, e.g. inside NormalizedSerializer, keep theirs
+        if self.root is not self and self.root is not self.parent:
+            return fields
+        wanted = requested_fields(self.context.get('request'))
+        if wanted is None:
+            return fields
+        return {
+            name: field for name, field in fields.items() if name in wanted
+        }
+
+
+class CachedHyperlinkedRelatedField(HyperlinkedRelatedField):
+    """
+    Resolve and build each distinct url once per serializer, so a list
+    payload that repeats the same container or label costs one query and
+    one url lookup for it. scope, e.g. on_boards('board'), limits the rows
+    a write may name to those the request's user can reach.
+    """
+
+    def __init__(self, *args, scope=None, **kwargs):
+        self.scope = scope
+        super().__init__(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if self.scope is not None and request is not None:
+            queryset = self.scope(queryset, request)
+        return queryset
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            return super().to_internal_value(data)
+        cache = self.__dict__.setdefault('_object_cache', {})
+        if data not in cache:
+            cache[data] = super().to_internal_value(data)
+        return cache[data]
+
+    def get_url(self, obj, view_name, request, format):
+        cache = self.__dict__.setdefault('_url_cache', {})
+        key = (view_name, obj.pk, format)
+        if key not in cache:
+            cache[key] = super().get_url(obj, view_name, request, format)
+        return cache[key]
+
+
+class BulkCreateListSerializer(ListSerializer):
+    """Create a list of Cards or Containers with bulk inserts."""
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        # m2m and reverse relations are set after the rows exist, as
+        # ModelSerializer.create does
+        to_many = {
+            name for name, relation
+            in model_meta.get_field_info(model).relations.items()
+            if relation.to_many
+        }
+        rows = []
+        for data in validated_data:
+            links = {
+                name: data.pop(name) for name in to_many if name in data
+            }
+            # rows are created by the requesting user, as in create()
+            data.pop('created_by', None)
+            position = data.pop('position', None)
+            rows.append((data, links, position))
+        return bulk_create_auditable(
+            model, rows, user=self.context['request'].user
+        )
+
+
+class BoardSerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
+    """
+    Serialize a Board object. Its containers, labels, attachments and
+    members are read only, they join a board by naming it themselves.
+    """
     containers = HyperlinkedRelatedField(
         many=True,
-        required=False,
-        view_name='container-detail',
-        queryset=Container.objects.all()
+        read_only=True,
+        view_name='container-detail'
     )
     labels = HyperlinkedRelatedField(
         many=True,
-        required=False,
-        view_name='label-detail',
-        queryset=Label.objects.all()
+        read_only=True,
+        view_name='label-detail'
     )
     attachments = HyperlinkedRelatedField(
         many=True,
-        required=False,
-        view_name='attachment-detail',
-        queryset=Attachment.objects.all()
+        read_only=True,
+        view_name='attachment-detail'
     )
     members = HyperlinkedRelatedField(
         many=True,
-        required=False,
-        view_name='member-detail',
-        queryset=Member.objects.all()
+        read_only=True,
+        view_name='member-detail'
     )
 
     class Meta:
@@ -45,12 +160,22 @@ class BoardSerializer(HyperlinkedModelSerializer):
             'members', 'labels', 'attachments'
         ] + AUDITABLE_FIELDS
 
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        """Prefetch the many relations rendered, for constant queries."""
+        return eager_load(queryset, fields, [
+            prefetch_ids('containers', Container, 'board'),
+            prefetch_ids('labels', Label, 'board'),
+            prefetch_ids('attachments', Attachment, 'board'),
+            prefetch_ids('members', Member, 'board'),
+        ])
+
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
         return super().create(validated_data)
 
 
-class MemberSerializer(HyperlinkedModelSerializer):
+class MemberSerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
     """Serialize a Member object."""
 
     class Meta:
@@ -58,26 +183,31 @@ class MemberSerializer(HyperlinkedModelSerializer):
         fields = ['url', 'id', 'board', 'user', 'starred', 'position']
 
 
-class ContainerSerializer(HyperlinkedModelSerializer):
-    """Serialize a Container object."""
+class ContainerSerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
+    """
+    Serialize a Container object. Its cards are read only, a card is moved
+    by naming its container.
+    """
+    serializer_related_field = CachedHyperlinkedRelatedField
 
-    cards = HyperlinkedRelatedField(
+    cards = CachedHyperlinkedRelatedField(
         many=True,
-        required=False,
-        view_name='card-detail',
-        queryset=Card.objects.all()
+        read_only=True,
+        view_name='card-detail'
     )
-    labels = HyperlinkedRelatedField(
+    labels = CachedHyperlinkedRelatedField(
         many=True,
         required=False,
         view_name='label-detail',
-        queryset=Label.objects.all()
+        queryset=Label.objects.all(),
+        scope=on_boards('board')
     )
-    tags = HyperlinkedRelatedField(
+    tags = CachedHyperlinkedRelatedField(
         many=True,
         required=False,
         view_name='tag-detail',
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        scope=owned_by('user')
     )
 
     class Meta:
@@ -86,43 +216,58 @@ class ContainerSerializer(HyperlinkedModelSerializer):
             'url', 'id', 'board', 'name', 'slug',
             'position', 'cards', 'labels', 'tags'
         ] + AUDITABLE_FIELDS
+        list_serializer_class = BulkCreateListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        """Prefetch the many relations rendered, for constant queries."""
+        return eager_load(queryset, fields, [
+            prefetch_ids('cards', Card, 'container'),
+            prefetch_ids('labels', Label),
+            prefetch_ids('tags', Tag),
+        ])
 
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
         return super().create(validated_data)
 
 
-class CardSerializer(HyperlinkedModelSerializer):
+class CardSerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
     """Serialize a Card object."""
+    serializer_related_field = CachedHyperlinkedRelatedField
 
-    container = HyperlinkedRelatedField(
+    container = CachedHyperlinkedRelatedField(
         required=True,
         view_name='container-detail',
         queryset=Container.objects.all()
     )
-    labels = HyperlinkedRelatedField(
+    labels = CachedHyperlinkedRelatedField(
         many=True,
         required=False,
         view_name='label-detail',
-        queryset=Label.objects.all()
+        queryset=Label.objects.all(),
+        scope=on_boards('board')
     )
-    tags = HyperlinkedRelatedField(
+    tags = CachedHyperlinkedRelatedField(
         many=True,
         required=False,
         view_name='tag-detail',
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        scope=owned_by('user')
     )
-    attachments = HyperlinkedRelatedField(
+    attachments = CachedHyperlinkedRelatedField(
         many=True,
         required=False,
         view_name='attachment-detail',
-        queryset=Attachment.objects.all()
+        queryset=Attachment.objects.all(),
+        scope=on_boards('board')
     )
-    assigned_users = HyperlinkedRelatedField(
+    assigned_users = CachedHyperlinkedRelatedField(
         many=True,
         required=False,
         view_name='member-detail',
-        queryset=Member.objects.all()
+        queryset=Member.objects.all(),
+        scope=on_boards('board')
     )
 
     class Meta:
@@ -132,13 +277,45 @@ class CardSerializer(HyperlinkedModelSerializer):
             'start_time', 'end_time', 'complexity', 'hours', 'position',
             'assigned_users', 'labels', 'tags', 'attachments'
         ] + AUDITABLE_FIELDS
+        list_serializer_class = BulkCreateListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        """Prefetch the many relations rendered, for constant queries."""
+        return eager_load(queryset, fields, [
+            prefetch_ids('assigned_users', Member),
+            prefetch_ids('labels', Label),
+            prefetch_ids('tags', Tag),
+            prefetch_ids('attachments', Attachment),
+        ])
 
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
         return super().create(validated_data)
 
 
-class TagSerializer(HyperlinkedModelSerializer):
+class ArchivedCardSerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
+    """Serialize a card in the archive tier, links are lists of ids."""
+
+    class Meta:
+        model = ArchivedCard
+        fields = [
+            'url', 'id', 'container', 'name', 'slug', 'content',
+            'start_time', 'end_time', 'complexity', 'hours', 'position',
+            'links', 'created_by', 'created_time', 'changed_by',
+            'changed_time', 'archived_by', 'archived_time'
+        ]
+        read_only_fields = fields
+
+
+class CardMoveSerializer(Serializer):
+    """Validate one entry of a bulk card move, relations are by id."""
+    card = IntegerField(min_value=1)
+    container = IntegerField(min_value=1)
+    position = IntegerField(min_value=1, required=False, allow_null=True)
+
+
+class TagSerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
     """Serialize a Tag object."""
 
     class Meta:
@@ -146,7 +323,7 @@ class TagSerializer(HyperlinkedModelSerializer):
         fields = ['url', 'id', 'user', 'name', 'color']
 
 
-class LabelSerializer(HyperlinkedModelSerializer):
+class LabelSerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
     """Serialize a Label object."""
 
     class Meta:
@@ -154,7 +331,7 @@ class LabelSerializer(HyperlinkedModelSerializer):
         fields = ['url', 'id', 'board', 'name', 'color']
 
 
-class AttachmentSerializer(HyperlinkedModelSerializer):
+class AttachmentSerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
     """Serialize an Attachment object."""
 
     class Meta:
@@ -165,7 +342,7 @@ class AttachmentSerializer(HyperlinkedModelSerializer):
         ]
 
 
-class KanBanUserSerializer(HyperlinkedModelSerializer):
+class KanBanUserSerializer(SparseFieldsMixin, HyperlinkedModelSerializer):
     """Serialize a KanBanUser object."""
     tags = HyperlinkedRelatedField(
         many=True,
@@ -187,6 +364,25 @@ class KanBanUserSerializer(HyperlinkedModelSerializer):
             'is_staff', 'is_active', 'tags', 'memberships'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        """Prefetch the many relations rendered, for constant queries."""
+        return eager_load(queryset, fields, [
+            prefetch_ids('tags', Tag, 'user'),
+            prefetch_ids('memberships', Member, 'user'),
+        ])
+
+
+# flat renderings of the same models for bulk reads, see .flat
+FLAT_SERIALIZERS = {
+    serializer.Meta.model: FlatSerializer(serializer)
+    for serializer in [
+        BoardSerializer, MemberSerializer, ContainerSerializer,
+        CardSerializer, TagSerializer, LabelSerializer,
+        AttachmentSerializer, KanBanUserSerializer,
+    ]
+}
+
 
 class NormalizedSerializer(Serializer):
     """
@@ -202,3 +398,49 @@ class NormalizedSerializer(Serializer):
     tags = TagSerializer(many=True, read_only=True)
     attachments = AttachmentSerializer(many=True, read_only=True)
     members = MemberSerializer(many=True, read_only=True)
+    cursor = DateTimeField(read_only=True)
+
+
+class BoardSnapshotSerializer(Serializer):
+    """Serialize the containers, cards and labels shown on one board."""
+    containers = ContainerSerializer(many=True, read_only=True)
+    cards = CardSerializer(many=True, read_only=True)
+    labels = LabelSerializer(many=True, read_only=True)
+
+
+class ChangesSerializer(Serializer):
+    """
+    Serialize what changed for a user since a sync cursor.
+
+    tombstones lists the ids of archived or deleted rows per entity, and
+    cursor is the value to pass as ?since= on the next sync. Rows changed
+    shortly before the cursor come again then, to be upserted by id.
+    """
+    boards = BoardSerializer(many=True, read_only=True)
+    containers = ContainerSerializer(many=True, read_only=True)
+    cards = CardSerializer(many=True, read_only=True)
+    tombstones = DictField(
+        child=ListField(child=IntegerField()), read_only=True
+    )
+    cursor = DateTimeField(read_only=True)
+
+
+class CardTotalsSerializer(Serializer):
+    """Serialize the live card totals of a board or container."""
+    cards = IntegerField(read_only=True)
+    complexity = DecimalField(
+        max_digits=16, decimal_places=4, read_only=True
+    )
+    hours = DecimalField(max_digits=16, decimal_places=4, read_only=True)
+    # cards whose end_time fell on a day before today
+    overdue = IntegerField(read_only=True)
+
+
+class ContainerStatsSerializer(CardTotalsSerializer):
+    container = IntegerField(read_only=True)
+
+
+class BoardStatsSerializer(CardTotalsSerializer):
+    """Serialize board_stats, the board's totals and its containers'."""
+    board = IntegerField(read_only=True)
+    containers = ContainerStatsSerializer(many=True, read_only=True)
@@ -0,0 +1,372 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import invalidate_user
+from .models import (Attachment, Board, Card, CardStats, Container,
+                     KanBanUser, Label, Member, Tag, Tombstone,
+                     add_card_stats, apply_card_stats, card_stats_row)
+from .realtime import publish
+from .search import get_backend
+from .snapshots import invalidate_boards
+
+# the normalized payload key each synced model is listed under
+SYNCED_MODELS = {
+    Board: 'boards',
+    Container: 'containers',
+    Card: 'cards',
+}
+
+
+def record_tombstone(sender, instance, **kwargs):
+    """Remember a deleted row so incremental sync can report it."""
+    Tombstone.objects.create(
+        entity=SYNCED_MODELS[sender],
+        object_id=instance.pk,
+        created_by_id=instance.created_by_id
+    )
+
+
+def touch_changed_time(sender, instance, action, reverse, model, pk_set,
+                       **kwargs):
+    """Bump changed_time when a Card or Container's m2m links change."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    now = timezone.now()
+    if not reverse:
+        type(instance).objects.filter(pk=instance.pk).update(
+            changed_time=now
+        )
+    elif pk_set:
+        model.objects.filter(pk__in=pk_set).update(changed_time=now)
+
+
+def touch_linked_on_delete(sender, instance, **kwargs):
+    """
+    Deleting a Label, Tag, Attachment or Member silently drops its m2m
+    rows, so bump changed_time on the Cards and Containers linking it and
+    drop the snapshots of their boards.
+    """
+    now = timezone.now()
+    board_ids = set()
+    for model, board in ((Card, 'container__board_id'),
+                         (Container, 'board_id')):
+        for field in model._meta.many_to_many:
+            if field.related_model is sender:
+                linking = model.objects.filter(**{field.name: instance})
+                board_ids.update(
+                    linking.values_list(board, flat=True).distinct()
+                )
+                linking.update(changed_time=now)
+    invalidate_boards(board_ids)
+
+
+def boards_of_cards(container_ids):
+    return (
+        Container.objects
+        .filter(pk__in=container_ids)
+        .values_list('board_id', flat=True)
+    )
+
+
+def boards_of(instance):
+    """The boards a row shows on, before and after it was saved."""
+    if isinstance(instance, Board):
+        return [instance.pk]
+    if isinstance(instance, Card):
+        container_ids = {
+            instance.container_id, instance.loaded_value('container_id')
+        } - {None}
+        if Card.container.is_cached(instance) and \
+                container_ids == {instance.container_id}:
+            # the common case, no query needed
+            return [instance.container.board_id]
+        return list(boards_of_cards(container_ids))
+    return [instance.board_id, instance.loaded_value('board_id')]
+
+
+def invalidate_snapshot(sender, instance, **kwargs):
+    """Drop the snapshot of every board a saved or deleted row shows on."""
+    invalidate_boards(boards_of(instance))
+
+
+def change_event(instance, created) -> dict:
+    """The compact WebSocket event describing a saved Card or Container."""
+    if isinstance(instance, Card):
+        entity, moved = 'card', 'moved'
+        place = {
+            'container': instance.container_id,
+            'position': instance.position,
+        }
+        loaded = {
+            'container': instance.loaded_value('container_id'),
+            'position': instance.loaded_value('position'),
+        }
+    else:
+        entity, moved = 'container', 'reordered'
+        place = {'position': instance.position}
+        loaded = {'position': instance.loaded_value('position')}
+    if created:
+        return {'type': f'{entity}.created', 'id': instance.pk, **place}
+    if instance.archived and not instance.loaded_value('archived'):
+        return {'type': f'{entity}.archived', 'id': instance.pk}
+    if place != loaded:
+        return {'type': f'{entity}.{moved}', 'id': instance.pk, **place}
+    return {'type': f'{entity}.changed', 'id': instance.pk}
+
+
+def publish_change(sender, instance, created, **kwargs):
+    """Tell the listeners of a saved Card or Container's boards."""
+    publish(boards_of(instance), change_event(instance, created))
+
+
+def publish_delete(sender, instance, **kwargs):
+    entity = 'card' if sender is Card else 'container'
+    publish(
+        boards_of(instance), {'type': f'{entity}.deleted', 'id': instance.pk}
+    )
+
+
+def invalidate_snapshot_on_m2m(sender, instance, action, reverse, model,
+                               pk_set, **kwargs):
+    """Drop the snapshot of boards whose cards or containers were relinked."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        rows = [instance]
+    elif pk_set:
+        rows = model._base_manager.filter(pk__in=pk_set)
+    else:
+        return
+    if model is Card or isinstance(instance, Card):
+        invalidate_boards(boards_of_cards(
+            [row.container_id for row in rows]
+        ))
+    else:
+        invalidate_boards([row.board_id for row in rows])
+
+
+def index_card(sender, instance, created, **kwargs):
+    """Reindex a Card created or saved with a new name, content or place."""
+    fields = ('name', 'content', 'container_id')
+    values = tuple(getattr(instance, field) for field in fields)
+    indexed = getattr(instance, '_kanban_indexed', None) or tuple(
+        instance.loaded_value(field) for field in fields
+    )
+    if created or values != indexed:
+        get_backend().index([instance.pk])
+        instance._kanban_indexed = values
+
+
+def index_moved_container(sender, instance, created, **kwargs):
+    """Reindex the Cards of a Container moved to another Board."""
+    if not created and \
+            instance.board_id != instance.loaded_value('board_id'):
+        get_backend().index(
+            Card.objects.filter(container=instance)
+            .values_list('id', flat=True)
+        )
+
+
+def unindex_card(sender, instance, **kwargs):
+    get_backend().remove([instance.pk])
+
+
+def cards_linking(instance) -> list:
+    """Ids of the Cards linking a Label or Tag."""
+    field = 'labels' if isinstance(instance, Label) else 'tags'
+    return list(
+        Card.objects.filter(**{field: instance})
+        .values_list('id', flat=True)
+    )
+
+
+def index_relinked_cards(sender, instance, action, reverse, model, pk_set,
+                         **kwargs):
+    """Reindex the Cards whose Labels or Tags changed."""
+    if action == 'pre_clear' and reverse:
+        # the links are gone once post_clear is sent
+        instance._kanban_cleared_cards = cards_linking(instance)
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        get_backend().index([instance.pk])
+    elif action == 'post_clear':
+        get_backend().index(instance.__dict__.pop('_kanban_cleared_cards'))
+    elif pk_set:
+        get_backend().index(pk_set)
+
+
+def index_renamed_cards(sender, instance, created, **kwargs):
+    """Reindex the Cards linking a renamed Label or Tag."""
+    if not created and instance.name != instance.loaded_value('name'):
+        get_backend().index(cards_linking(instance))
+
+
+def remember_linked_cards(sender, instance, **kwargs):
+    instance._kanban_linked_cards = cards_linking(instance)
+
+
+def index_unlinked_cards(sender, instance, **kwargs):
+    """Reindex the Cards that linked a deleted Label or Tag."""
+    get_backend().index(instance.__dict__.pop('_kanban_linked_cards', []))
+
+
+# the Card fields its CardStats bucket and totals come from, in the order
+# card_stats_row takes them
+STATS_FIELDS = ('container', 'end_time', 'complexity', 'hours', 'archived')
+
+
+def counted_values(instance):
+    """The STATS_FIELDS values a Card is counted with, None if unknown."""
+    counted = getattr(instance, '_kanban_counted', None)
+    if counted is None and hasattr(instance, '_loaded_values'):
+        counted = tuple(
+            instance.loaded_value(Card._meta.get_field(name).attname)
+            for name in STATS_FIELDS
+        )
+    return counted
+
+
+def remember_counted_card(sender, instance, **kwargs):
+    """Read how a Card that was never loaded counts before it is saved."""
+    if instance.pk is not None and counted_values(instance) is None:
+        instance._kanban_counted = Card.objects.filter(
+            pk=instance.pk
+        ).values_list(*STATS_FIELDS).first()
+
+
+def count_card(sender, instance, created, update_fields, **kwargs):
+    """Move a saved Card's share of the CardStats to where it now counts."""
+    old = None if created else counted_values(instance)
+    new = []
+    for i, name in enumerate(STATS_FIELDS):
+        field = Card._meta.get_field(name)
+        if old is None or update_fields is None or \
+                {field.name, field.attname} & update_fields:
+            new.append(getattr(instance, field.attname))
+        else:
+            # not written by this save
+            new.append(old[i])
+    new = tuple(new)
+    if old != new:
+        stats = {}
+        if old is not None:
+            add_card_stats(stats, card_stats_row(*old), sign=-1)
+        add_card_stats(stats, card_stats_row(*new))
+        apply_card_stats(stats)
+    instance._kanban_counted = new
+
+
+def uncount_card(sender, instance, **kwargs):
+    counted = counted_values(instance) or tuple(
+        getattr(instance, Card._meta.get_field(name).attname)
+        for name in STATS_FIELDS
+    )
+    apply_card_stats(
+        add_card_stats({}, card_stats_row(*counted), sign=-1)
+    )
+
+
+def move_container_stats(sender, instance, created, **kwargs):
+    """Carry a Container's CardStats along when it moves to another Board."""
+    if not created and \
+            instance.board_id != instance.loaded_value('board_id'):
+        CardStats.objects.filter(container=instance).update(
+            board_id=instance.board_id
+        )
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop a saved, deactivated or deleted user from the auth cache."""
+    invalidate_user(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+def connect():
+    for model in SYNCED_MODELS:
+        post_delete.connect(
+            record_tombstone, sender=model,
+            dispatch_uid=f'kanban_tombstone_{model.__name__}'
+        )
+    for model in (Attachment, Label, Member, Tag):
+        pre_delete.connect(
+            touch_linked_on_delete, sender=model,
+            dispatch_uid=f'kanban_touch_linked_{model.__name__}'
+        )
+    through_models = [
+        Card.assigned_users.through, Card.labels.through,
+        Card.tags.through, Card.attachments.through,
+        Container.labels.through, Container.tags.through,
+    ]
+    for through in through_models:
+        m2m_changed.connect(
+            touch_changed_time, sender=through,
+            dispatch_uid=f'kanban_touch_{through.__name__}'
+        )
+        m2m_changed.connect(
+            invalidate_snapshot_on_m2m, sender=through,
+            dispatch_uid=f'kanban_snapshot_{through.__name__}'
+        )
+    for model in (Container, Card):
+        post_save.connect(
+            publish_change, sender=model,
+            dispatch_uid=f'kanban_publish_{model.__name__}'
+        )
+        post_delete.connect(
+            publish_delete, sender=model,
+            dispatch_uid=f'kanban_publish_delete_{model.__name__}'
+        )
+    for model in (Board, Container, Card, Label):
+        for signal in (post_save, post_delete):
+            signal.connect(
+                invalidate_snapshot, sender=model,
+                dispatch_uid=f'kanban_snapshot_{model.__name__}'
+            )
+    post_save.connect(
+        index_card, sender=Card, dispatch_uid='kanban_search_Card'
+    )
+    post_delete.connect(
+        unindex_card, sender=Card, dispatch_uid='kanban_unsearch_Card'
+    )
+    post_save.connect(
+        index_moved_container, sender=Container,
+        dispatch_uid='kanban_search_Container'
+    )
+    pre_save.connect(
+        remember_counted_card, sender=Card,
+        dispatch_uid='kanban_stats_remember_Card'
+    )
+    post_save.connect(
+        count_card, sender=Card, dispatch_uid='kanban_stats_Card'
+    )
+    post_delete.connect(
+        uncount_card, sender=Card, dispatch_uid='kanban_unstats_Card'
+    )
+    post_save.connect(
+        move_container_stats, sender=Container,
+        dispatch_uid='kanban_stats_Container'
+    )
+    for through in (Card.labels.through, Card.tags.through):
+        m2m_changed.connect(
+            index_relinked_cards, sender=through,
+            dispatch_uid=f'kanban_search_{through.__name__}'
+        )
+    for model in (Label, Tag):
+        post_save.connect(
+            index_renamed_cards, sender=model,
+            dispatch_uid=f'kanban_search_{model.__name__}'
+        )
+        pre_delete.connect(
+            remember_linked_cards, sender=model,
+            dispatch_uid=f'kanban_search_linked_{model.__name__}'
+        )
+        post_delete.connect(
+            index_unlinked_cards, sender=model,
+            dispatch_uid=f'kanban_search_unlinked_{model.__name__}'
+        )
+    for signal in (post_save, post_delete):
+        signal.connect(
+            invalidate_cached_user, sender=KanBanUser,
+            dispatch_uid='kanban_user_cache'
+        )
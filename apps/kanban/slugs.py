@@ -0,0 +1,62 @@
+"""
+Collision-free slugs: a ULID followed by the slugified name.
+
+A ULID is 48 bits of milliseconds since the epoch and 80 random bits,
+written as 26 characters of Crockford's base32 (in lower case here, slugs
+are lower case). They sort by creation time, and ids made by one process
+within the same millisecond count up from a random start rather than
+repeat, so slugs can be made in bulk without asking the database whether
+they are taken.
+"""
+import secrets
+import threading
+import time
+
+from django.template.defaultfilters import slugify
+
+ALPHABET = '0123456789abcdefghjkmnpqrstvwxyz'
+RANDOM_BITS = 80
+# Auditable.slug's max_length
+SLUG_LENGTH = 120
+
+_lock = threading.Lock()
+_last = (0, 0)
+
+
+def encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def ulid_at(milliseconds: int, random: int = None) -> str:
+    """The ULID of a moment, with fresh random bits unless given."""
+    if random is None:
+        random = secrets.randbits(RANDOM_BITS)
+    return encode(milliseconds, 10) + encode(random, 16)
+
+
+def new_ulid() -> str:
+    """A ULID for now, greater than any made before by this process."""
+    global _last
+    with _lock:
+        milliseconds = time.time_ns() // 1_000_000
+        last_milliseconds, last_random = _last
+        if milliseconds <= last_milliseconds:
+            # same millisecond, or the clock stepped back
+            milliseconds, random = last_milliseconds, last_random + 1
+            if random >> RANDOM_BITS:
+                milliseconds, random = milliseconds + 1, 0
+        else:
+            random = secrets.randbits(RANDOM_BITS)
+        _last = (milliseconds, random)
+    return ulid_at(milliseconds, random)
+
+
+def make_slug(name, ulid=None) -> str:
+    """A unique slug for a row named name, at most SLUG_LENGTH long."""
+    ulid = ulid or new_ulid()
+    name = slugify(name)[:SLUG_LENGTH - len(ulid) - 1].strip('-')
+    return f'{ulid}-{name}' if name else ulid
@@ -0,0 +1,84 @@
+"""
+Per-board serialized snapshot cache.
+
+Snapshots are stored under a per-board version token. Invalidating a board
+deletes its token so every cached variant (per host, renderer and flat) is
+orphaned at once and expires on its own. Invalidation runs on commit so a
+reader can never cache rows from a transaction that is still open.
+"""
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .flat import wants_flat
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, 'KANBAN_SNAPSHOT_CACHE', 'default')]
+
+
+def version_key(board_id) -> str:
+    return f'kanban:board:{board_id}:version'
+
+
+def count(outcome: str) -> None:
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def snapshot_stats() -> dict:
+    """Return the hit and miss counts of this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def board_version(board_id) -> str:
+    """
+    The board's current version token, a new one after invalidate_boards.
+    Anything cached per board under it is dropped along with snapshots.
+    """
+    cache = get_cache()
+    version = cache.get(version_key(board_id))
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(version_key(board_id), version, None)
+    return version
+
+
+def get_snapshot(board_id, request, build):
+    """
+    Return (data, hit) for a board, calling build() to serialize it on a
+    miss. Variants are keyed by host and renderer since urls are absolute,
+    and by whether relations are rendered flat.
+    """
+    cache = get_cache()
+    version = board_version(board_id)
+    variant = hashlib.md5(repr((
+        request.build_absolute_uri('/'), request.accepted_renderer.format,
+        wants_flat(request)
+    )).encode()).hexdigest()
+    key = f'kanban:board:{board_id}:snapshot:{version}:{variant}'
+    data = cache.get(key)
+    if data is not None:
+        count('hits')
+        return data, True
+    count('misses')
+    data = build()
+    cache.set(
+        key, data, getattr(settings, 'KANBAN_SNAPSHOT_TIMEOUT', 300)
+    )
+    return data, False
+
+
+def invalidate_boards(board_ids) -> None:
+    """Drop the cached snapshots of these boards once the write commits."""
+    keys = [version_key(board_id) for board_id in set(board_ids) if board_id]
+    if keys:
+        transaction.on_commit(lambda: get_cache().delete_many(keys))
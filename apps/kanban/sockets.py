@@ -0,0 +1,79 @@
+"""
+ASGI WebSocket endpoint streaming a board's change events, see .realtime.
+
+Clients connect to /ws/boards/<id>/?token=<JWT access token> and receive
+one JSON text frame per event. Connecting costs a query for the board,
+and one for the user unless it is cached; after that a socket only waits
+on its broker subscription. Messages from the client are ignored.
+"""
+import asyncio
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .authentication import CachedJWTAuthentication
+from .permissions import board_ids_of
+from .realtime import board_channel, get_broker
+
+BOARD_PATH = re.compile(r'^/ws/boards/(?P<pk>\d+)/$')
+
+# close codes, in the range reserved for applications
+NOT_FOUND = 4404
+FORBIDDEN = 4403
+
+
+@sync_to_async
+def can_listen(query_string, board_id) -> bool:
+    """Whether the token in the query string grants access to the board."""
+    close_old_connections()
+    try:
+        token = parse_qs(query_string.decode()).get('token', [''])[0]
+        auth = CachedJWTAuthentication()
+        try:
+            user = auth.get_user(auth.get_validated_token(token))
+        except (AuthenticationFailed, InvalidToken, TokenError):
+            return False
+        return board_id in set(board_ids_of(user))
+    finally:
+        close_old_connections()
+
+
+async def board_updates(scope, receive, send):
+    """The ASGI application serving board sockets."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    match = BOARD_PATH.match(scope['path'])
+    if match is None:
+        await send({'type': 'websocket.close', 'code': NOT_FOUND})
+        return
+    board_id = int(match['pk'])
+    if not await can_listen(scope.get('query_string', b''), board_id):
+        await send({'type': 'websocket.close', 'code': FORBIDDEN})
+        return
+    subscription = get_broker().subscribe(board_channel(board_id))
+    await send({'type': 'websocket.accept'})
+    receiving = asyncio.ensure_future(receive())
+    delivering = asyncio.ensure_future(subscription.get())
+    try:
+        while True:
+            done, _ = await asyncio.wait(
+                {receiving, delivering}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if delivering in done:
+                await send({
+                    'type': 'websocket.send', 'text': delivering.result()
+                })
+                delivering = asyncio.ensure_future(subscription.get())
+            if receiving in done:
+                if receiving.result()['type'] == 'websocket.disconnect':
+                    return
+                receiving = asyncio.ensure_future(receive())
+    finally:
+        receiving.cancel()
+        delivering.cancel()
+        subscription.close()
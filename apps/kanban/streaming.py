@@ -0,0 +1,119 @@
+"""
+Incremental JSON rendering of large payloads.
+
+Each entity queryset is read in chunks with .iterator() and every chunk is
+serialized, encoded and handed to the response before the next is read, so
+memory is bounded by the chunk size rather than the account size and the
+first bytes go out before the last rows are read. Hyperlinked rows get their
+prefetches applied per chunk; flat rows load their relations per chunk.
+
+Under ASGI, Django 3.1 iterates a streaming body on the event loop, where
+the queries of the next chunk are refused; ASGIHandler reads each part on
+the thread sync views run on instead.
+"""
+import json
+from datetime import datetime
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers import asgi
+from django.db.models import QuerySet, prefetch_related_objects
+from rest_framework.utils.encoders import JSONEncoder
+
+from .flat import format_datetime, wants_flat
+from .serializers import FLAT_SERIALIZERS
+
+STREAM_PARAM = 'stream'
+
+
+def wants_stream(request) -> bool:
+    return request.query_params.get(STREAM_PARAM) in ('true', '1')
+
+
+def get_chunk_size() -> int:
+    return getattr(settings, 'KANBAN_STREAM_CHUNK_SIZE', 500)
+
+
+def encode(value) -> str:
+    """Encode like DRF's JSONRenderer with its default settings."""
+    return json.dumps(
+        value, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')
+    )
+
+
+def iter_instances(queryset, chunk_size):
+    """Yield lists of model instances, prefetching per chunk."""
+    lookups = queryset._prefetch_related_lookups
+    instances = queryset.prefetch_related(None).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(instances, chunk_size))
+        if not chunk:
+            return
+        prefetch_related_objects(chunk, *lookups)
+        yield chunk
+
+
+def stream_entities(request, entities, serializer_class):
+    """
+    Yield the JSON of a payload of querysets piece by piece. Querysets are
+    rendered by the list field of the same key on serializer_class, or as
+    flat rows when the request asks for them.
+    """
+    chunk_size = get_chunk_size()
+    flat = wants_flat(request)
+    context = {'request': request}
+    yield '{'
+    for i, (key, value) in enumerate(entities.items()):
+        yield f'{"," if i else ""}{encode(key)}:'
+        if not isinstance(value, QuerySet):
+            if isinstance(value, datetime):
+                value = format_datetime(value)
+            yield encode(value)
+            continue
+        if flat:
+            chunks = FLAT_SERIALIZERS[value.model].iter_rows(
+                value, chunk_size
+            )
+        else:
+            # fresh fields per chunk, bound fields memoize urls (see
+            # CachedHyperlinkedRelatedField) and would grow with the export
+            chunks = (
+                serializer_class(context=context).fields[key]
+                .to_representation(instances)
+                for instances in iter_instances(value, chunk_size)
+            )
+        yield '['
+        for n, rows in enumerate(chunks):
+            yield f'{"," if n else ""}{encode(rows)[1:-1]}'
+        yield ']'
+    yield '}'
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """Django's ASGI handler, reading streaming bodies off the event loop."""
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        parts = iter(response)
+        # an empty body for Django to send after the headers, the parts
+        # follow before its closing message
+        response.streaming_content = []
+
+        async def send_parts(message):
+            if message['type'] == 'http.response.body' and \
+                    not message.get('more_body'):
+                read = sync_to_async(next, thread_sensitive=True)
+                while True:
+                    part = await read(parts, None)
+                    if part is None:
+                        break
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({
+                            'type': 'http.response.body', 'body': chunk,
+                            'more_body': True,
+                        })
+            await send(message)
+
+        await super().send_response(response, send_parts)
@@ -1,3 +1,1954 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import analytics
+from .archives import compact_cards
+from .async_views import to_thread
+from .authentication import (CachedJWTAuthentication, UserCache,
+                             cache_user, clear_user_cache, get_cached_user)
+from .backends import PooledModelBackend
+from .hashing import get_pool, get_slots, reset_pool
+from .models import (MAX_POSITION, POSITION_GAP, ArchivedCard, Attachment,
+                     Board, Card, CardStats, Container, KanBanUser, Label,
+                     Member, Tag, Tombstone, bulk_create_auditable,
+                     bulk_move_cards, rebalance_positions, rebuild_card_stats,
+                     reserve_positions)
+from .permissions import board_ids_of
+from .realtime import get_broker
+from .search import get_backend, terms_of
+from .slugs import make_slug, new_ulid, ulid_at
+from .snapshots import snapshot_stats
+from .sockets import board_updates
+from .streaming import ASGIHandler
+
+
+class KanbanFixtures:
+    """Common fixtures: one user owning one board with one container."""
+
+    @classmethod
+    def create_fixtures(cls):
+        cls.user = KanBanUser.objects.create_user('alice', password='pw')
+        cls.board = Board.objects.create(name='Board', created_by=cls.user)
+        cls.container = Container.objects.create(
+            board=cls.board, name='Todo', created_by=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+        clear_user_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_cards(self, count, container=None):
+        return [
+            Card.objects.create(
+                container=container or self.container,
+                name=f'card {i}', created_by=self.user
+            )
+            for i in range(count)
+        ]
+
+    def positions(self, container=None):
+        return list(
+            (container or self.container).cards
+            .order_by('position').values_list('name', flat=True)
+        )
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class KanbanTestCase(KanbanFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class KanbanTransactionTestCase(KanbanFixtures, TransactionTestCase):
+    """For tests that rely on transaction.on_commit callbacks running."""
+
+    def setUp(self):
+        self.create_fixtures()
+        super().setUp()
+
+
+class SparseOrderingTests(KanbanTestCase):
+
+    def test_new_cards_are_appended_with_gaps(self):
+        cards = self.make_cards(3)
+        self.assertEqual(
+            [c.position for c in cards],
+            [POSITION_GAP, 2 * POSITION_GAP, 3 * POSITION_GAP]
+        )
+
+    def test_move_into_gap_touches_one_row(self):
+        first, second, third = self.make_cards(3)
+        third.position = first.position + 1
+        # the collision check and the card's own update
+        with self.assertNumQueries(2):
+            third.save()
+        self.assertEqual(
+            self.positions(), ['card 0', 'card 2', 'card 1']
+        )
+
+    def test_move_onto_occupied_position_goes_ahead_of_occupant(self):
+        first, second, third = self.make_cards(3)
+        third.position = second.position
+        third.save()
+        self.assertEqual(
+            self.positions(), ['card 0', 'card 2', 'card 1']
+        )
+        self.assertEqual(
+            Card.objects.get(pk=second.pk).position, second.position
+        )
+
+    def test_rebalances_when_gap_runs_out(self):
+        first, second, third = self.make_cards(3)
+        second.position = first.position + 1
+        second.save()
+        third.position = second.position
+        third.save()
+        self.assertEqual(
+            self.positions(), ['card 0', 'card 2', 'card 1']
+        )
+        self.assertEqual(
+            list(self.container.cards.order_by('position')
+                 .values_list('position', flat=True)),
+            [POSITION_GAP, 2 * POSITION_GAP, 3 * POSITION_GAP]
+        )
+
+    def test_rebalance_positions_keeps_order(self):
+        cards = self.make_cards(3)
+        for i, card in enumerate(cards):
+            card.position = i + 1
+            card.save(reorder=False)
+        rebalance_positions(Card, self.container.pk)
+        self.assertEqual(
+            list(self.container.cards.order_by('position')
+                 .values_list('position', flat=True)),
+            [POSITION_GAP, 2 * POSITION_GAP, 3 * POSITION_GAP]
+        )
+
+    def test_positions_stay_unique_after_deletes(self):
+        first, second, third = self.make_cards(3)
+        third.delete()
+        second.delete()
+        (fourth,) = self.make_cards(1)
+        # the counter never goes back, the freed positions stay unused
+        self.assertEqual(fourth.position, 4 * POSITION_GAP)
+        fourth.position = 5 * POSITION_GAP
+        fourth.save()
+        (fifth,) = self.make_cards(1)
+        self.assertEqual(fifth.position, 6 * POSITION_GAP)
+        positions = list(
+            self.container.cards.values_list('position', flat=True)
+        )
+        self.assertEqual(len(set(positions)), len(positions))
+
+    def test_bulk_create_reserves_one_block(self):
+        self.make_cards(2)
+        first = reserve_positions(Card, self.container.pk, count=3)
+        self.assertEqual(first, 3 * POSITION_GAP)
+        self.assertEqual(
+            reserve_positions(Card, self.container.pk), 6 * POSITION_GAP
+        )
+        container = f'http://testserver/containers/{self.container.pk}/'
+        response = self.client.post('/cards/', [
+            {'name': f'new {i}', 'container': container} for i in range(3)
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [row['position'] for row in response.data],
+            [7 * POSITION_GAP, 8 * POSITION_GAP, 9 * POSITION_GAP]
+        )
+        self.container.refresh_from_db()
+        self.assertEqual(
+            self.container.last_card_position, 9 * POSITION_GAP
+        )
+
+    def test_counter_overflow_rebalances(self):
+        first, second = self.make_cards(2)
+        # no room for another POSITION_GAP after it
+        second.position = MAX_POSITION - POSITION_GAP + 1
+        second.save()
+        self.container.refresh_from_db()
+        self.assertEqual(self.container.last_card_position, second.position)
+        (third,) = self.make_cards(1)
+        self.assertEqual(
+            list(self.container.cards.order_by('position')
+                 .values_list('pk', 'position')),
+            [(first.pk, POSITION_GAP), (second.pk, 2 * POSITION_GAP),
+             (third.pk, 3 * POSITION_GAP)]
+        )
+        self.container.refresh_from_db()
+        self.assertEqual(
+            self.container.last_card_position, 3 * POSITION_GAP
+        )
+
+    def test_containers_use_sparse_positions(self):
+        done = Container.objects.create(
+            board=self.board, name='Done', created_by=self.user
+        )
+        self.assertEqual(done.position, 2 * POSITION_GAP)
+        done.position = self.container.position
+        done.save()
+        self.assertLess(done.position, self.container.position)
+
+
+class BulkMoveTests(KanbanTestCase):
+
+    def test_bulk_move_reorders_in_one_request(self):
+        done = Container.objects.create(
+            board=self.board, name='Done', created_by=self.user
+        )
+        first, second, third = self.make_cards(3)
+        existing = Card.objects.create(
+            container=done, name='existing', created_by=self.user
+        )
+        response = self.client.post('/cards/bulk-move/', [
+            {'card': third.pk, 'container': self.container.pk,
+             'position': first.position},
+            {'card': first.pk, 'container': done.pk,
+             'position': existing.position},
+            {'card': second.pk, 'container': done.pk},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(self.positions(), ['card 2'])
+        self.assertEqual(
+            self.positions(done), ['card 0', 'existing', 'card 1']
+        )
+        self.assertEqual(
+            Card.objects.get(pk=existing.pk).position, 2 * POSITION_GAP
+        )
+
+    def test_bulk_move_rejects_unknown_and_duplicate_cards(self):
+        (card,) = self.make_cards(1)
+        move = {'card': card.pk, 'container': self.container.pk}
+        response = self.client.post(
+            '/cards/bulk-move/', [move, move], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/cards/bulk-move/', [
+            {'card': card.pk + 100, 'container': self.container.pk}
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class NormalizedQueryCountTests(KanbanTestCase):
+
+    def populate(self, boards):
+        """Give the user boards, each with related rows on every relation."""
+        start = Board.objects.count()
+        for b in range(start, start + boards):
+            board = Board.objects.create(
+                name=f'board {b}', created_by=self.user
+            )
+            member = Member.objects.create(
+                board=board, user=self.user, position=b
+            )
+            label = Label.objects.create(board=board, name=f'label {b}')
+            tag = Tag.objects.create(user=self.user, name=f'tag {b}')
+            attachment = Attachment.objects.create(
+                board=board, name=f'file {b}', uploaded_by=self.user,
+                file_path='https://example.com/file'
+            )
+            container = Container.objects.create(
+                board=board, name='Todo', created_by=self.user
+            )
+            container.labels.add(label)
+            container.tags.add(tag)
+            for card in self.make_cards(3, container=container):
+                card.labels.add(label)
+                card.tags.add(tag)
+                card.attachments.add(attachment)
+                card.assigned_users.add(member)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/normalized/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_account_size(self):
+        self.populate(1)
+        small = self.count_queries()
+        self.populate(5)
+        self.assertEqual(self.count_queries(), small)
+
+    def test_query_count(self):
+        self.populate(2)
+        # the user's board ids, one query per entity list plus one per
+        # prefetched relation, plus one aggregate per table for the ETag
+        with self.assertNumQueries(29):
+            self.client.get('/normalized/')
+
+
+class NormalizedScopeTests(KanbanTestCase):
+
+    def setUp(self):
+        super().setUp()
+        bob = KanBanUser.objects.create_user('bob', password='pw')
+        self.shared = Board.objects.create(name='Shared', created_by=bob)
+        Member.objects.create(board=self.shared, user=self.user, position=1)
+        self.private = Board.objects.create(name='Private', created_by=bob)
+
+    def test_lists_only_rows_on_reachable_boards(self):
+        mine = Label.objects.create(board=self.board, name='mine')
+        shared = Label.objects.create(board=self.shared, name='shared')
+        Label.objects.create(board=self.private, name='private')
+        response = self.client.get('/normalized/')
+        self.assertEqual(
+            sorted(label['id'] for label in response.data['labels']),
+            [mine.pk, shared.pk]
+        )
+        # the user's card on a board they have left
+        container = Container.objects.create(
+            board=self.shared, name='Todo', created_by=self.user
+        )
+        (card,) = self.make_cards(1, container=container)
+        cursor = response.data['cursor']
+        Member.objects.filter(board=self.shared, user=self.user).delete()
+        response = self.client.get('/normalized/')
+        self.assertEqual(response.data['cards'], [])
+        self.assertEqual(response.data['containers'][0]['id'],
+                         self.container.pk)
+        self.assertEqual(len(response.data['containers']), 1)
+        changes = self.client.get('/normalized/', {'since': cursor}).data
+        self.assertEqual(changes['cards'], [])
+        self.assertEqual(changes['tombstones']['cards'], [card.pk])
+
+    def test_etag_ignores_other_boards(self):
+        etag = self.client.get('/normalized/')['ETag']
+        Label.objects.create(board=self.private, name='private')
+        response = self.client.get('/normalized/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Label.objects.create(board=self.shared, name='shared')
+        response = self.client.get('/normalized/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class IncrementalSyncTests(KanbanTestCase):
+
+    def sync(self, since):
+        response = self.client.get('/normalized/', {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_full_payload_includes_cursor(self):
+        response = self.client.get('/normalized/')
+        self.assertIn('cursor', response.data)
+
+    @override_settings(KANBAN_SYNC_OVERLAP=0)
+    def test_up_to_date_client_gets_nothing(self):
+        self.make_cards(2)
+        cursor = self.client.get('/normalized/').data['cursor']
+        changes = self.sync(cursor)
+        self.assertEqual(changes['cards'], [])
+        self.assertEqual(changes['boards'], [])
+        self.assertEqual(changes['tombstones']['cards'], [])
+        self.assertGreaterEqual(changes['cursor'], cursor)
+
+    def test_changed_archived_and_deleted_rows(self):
+        kept, archived, deleted = self.make_cards(3)
+        cursor = self.client.get('/normalized/').data['cursor']
+        kept.name = 'renamed'
+        kept.save()
+        archived.archived = True
+        archived.save()
+        deleted_id = deleted.pk
+        deleted.delete()
+        changes = self.sync(cursor)
+        self.assertEqual(
+            [card['name'] for card in changes['cards']], ['renamed']
+        )
+        self.assertEqual(
+            sorted(changes['tombstones']['cards']),
+            sorted([archived.pk, deleted_id])
+        )
+
+    def test_write_committing_after_the_read_is_not_missed(self):
+        (card,) = self.make_cards(1)
+        started = timezone.now()
+        cursor = self.client.get('/normalized/').data['cursor']
+        # a write stamped before the request came in that committed only
+        # once the payload had been read
+        Card.objects.filter(pk=card.pk).update(
+            name='late', changed_time=started - timedelta(seconds=1)
+        )
+        self.assertEqual(
+            [row['name'] for row in self.sync(cursor)['cards']], ['late']
+        )
+
+    def test_m2m_change_bumps_changed_time(self):
+        (card,) = self.make_cards(1)
+        cursor = self.client.get('/normalized/').data['cursor']
+        card.labels.add(Label.objects.create(board=self.board, name='bug'))
+        self.assertEqual(len(self.sync(cursor)['cards']), 1)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/normalized/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(KanbanTestCase):
+
+    def assert_revalidates(self, url, change):
+        response = self.client.get(url)
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_normalized(self):
+        (card,) = self.make_cards(1)
+        self.assert_revalidates('/normalized/', card.delete)
+
+    def test_normalized_skips_serializers_when_unchanged(self):
+        self.make_cards(3)
+        etag = self.client.get('/normalized/')['ETag']
+        # only the user's board ids and the ETag aggregates run
+        with self.assertNumQueries(8):
+            self.client.get('/normalized/', HTTP_IF_NONE_MATCH=etag)
+
+    def test_board_detail(self):
+        url = f'/boards/{self.board.pk}/'
+        self.assert_revalidates(url, lambda: Label.objects.create(
+            board=self.board, name='new label'
+        ))
+
+    def test_card_detail(self):
+        (card,) = self.make_cards(1)
+        label = Label.objects.create(board=self.board, name='bug')
+        card.labels.add(label)
+        self.assert_revalidates(f'/cards/{card.pk}/', label.delete)
+
+    def test_missing_card_is_404(self):
+        response = self.client.get('/cards/999/')
+        self.assertEqual(response.status_code, 404)
+
+
+class BoardSnapshotTests(KanbanTransactionTestCase):
+
+    def snapshot(self, board=None):
+        board = board or self.board
+        response = self.client.get(f'/boards/{board.pk}/snapshot/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assert_invalidated_by(self, change):
+        self.snapshot()
+        self.assertEqual(self.snapshot()['X-Cache'], 'hit')
+        change()
+        self.assertEqual(self.snapshot()['X-Cache'], 'miss')
+
+    def test_hit_skips_queries_and_counts(self):
+        self.make_cards(2)
+        before = snapshot_stats()
+        self.assertEqual(self.snapshot()['X-Cache'], 'miss')
+        # only the user's boards, the board lookup and its prefetches run
+        # on a hit
+        with self.assertNumQueries(6):
+            response = self.snapshot()
+        self.assertEqual(response['X-Cache'], 'hit')
+        self.assertEqual(len(response.data['cards']), 2)
+        after = snapshot_stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+
+    def test_card_save_invalidates(self):
+        (card,) = self.make_cards(1)
+        card.name = 'renamed'
+        self.assert_invalidated_by(card.save)
+
+    def test_card_move_invalidates_source_board(self):
+        (card,) = self.make_cards(1)
+        card = Card.objects.get(pk=card.pk)
+        other = Board.objects.create(name='Other', created_by=self.user)
+        target = Container.objects.create(
+            board=other, name='Todo', created_by=self.user
+        )
+
+        def move():
+            card.container = target
+            card.save()
+        self.assert_invalidated_by(move)
+
+    def test_container_save_invalidates(self):
+        self.container.name = 'Doing'
+        self.assert_invalidated_by(self.container.save)
+
+    def test_m2m_change_invalidates(self):
+        (card,) = self.make_cards(1)
+        label = Label.objects.create(board=self.board, name='bug')
+        self.assert_invalidated_by(lambda: label.card_set.add(card))
+
+    def test_deleting_linked_rows_invalidates(self):
+        (card,) = self.make_cards(1)
+        tag = Tag.objects.create(user=self.user, name='urgent')
+        bob = KanBanUser.objects.create_user('bob', password='pw')
+        member = Member.objects.create(board=self.board, user=bob, position=1)
+        attachment = Attachment.objects.create(
+            board=self.board, name='spec', file_path='http://example.com/',
+            uploaded_by=self.user
+        )
+        card.tags.add(tag)
+        card.assigned_users.add(member)
+        card.attachments.add(attachment)
+        self.container.tags.add(tag)
+        for row in (tag, member, attachment):
+            self.assert_invalidated_by(row.delete)
+        self.assertEqual(self.snapshot().data['cards'][0]['tags'], [])
+
+    def test_bulk_move_invalidates(self):
+        (card,) = self.make_cards(1)
+        self.assert_invalidated_by(lambda: self.client.post(
+            '/cards/bulk-move/',
+            [{'card': card.pk, 'container': self.container.pk}],
+            format='json'
+        ))
+
+    def test_rebalance_invalidates(self):
+        for i, card in enumerate(self.make_cards(2), start=1):
+            card.position = i
+            card.save(reorder=False)
+        self.assert_invalidated_by(
+            lambda: call_command('rebalance_positions', stdout=StringIO())
+        )
+
+
+class BulkCreateTests(KanbanTestCase):
+
+    def url(self, name, pk):
+        return f'http://testserver/{name}/{pk}/'
+
+    def test_bulk_create_cards(self):
+        (existing,) = self.make_cards(1)
+        label = Label.objects.create(board=self.board, name='bug')
+        container = self.url('containers', self.container.pk)
+        payload = [
+            {'name': f'new {i}', 'container': container,
+             'labels': [self.url('labels', label.pk)]}
+            for i in range(20)
+        ]
+        payload[5]['position'] = existing.position
+        # constant in the number of cards, savepoints, the search index and
+        # the card stats included
+        with self.assertNumQueries(23):
+            response = self.client.post('/cards/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(
+            set(response.data[0]), {'url', 'id', 'slug', 'position'}
+        )
+        self.assertEqual(label.card_set.count(), 20)
+        names = self.positions()
+        self.assertEqual(names[:2], ['new 5', 'card 0'])
+        self.assertEqual(names[2:], [f'new {i}' for i in range(20) if i != 5])
+        self.assertEqual(
+            Card.objects.filter(created_by=self.user).count(), 21
+        )
+
+    def test_bulk_create_containers(self):
+        board = self.url('boards', self.board.pk)
+        payload = [{'name': f'column {i}', 'board': board} for i in range(3)]
+        response = self.client.post('/containers/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(self.board.containers.order_by('position')
+                 .values_list('name', flat=True)),
+            ['Todo', 'column 0', 'column 1', 'column 2']
+        )
+
+    def test_bulk_create_appends_without_moves(self):
+        container = self.url('containers', self.container.pk)
+        with mock.patch('apps.kanban.models.bulk_move_cards') as move:
+            response = self.client.post('/cards/', [
+                {'name': f'new {i}', 'container': container}
+                for i in range(3)
+            ], format='json')
+        self.assertEqual(response.status_code, 201)
+        move.assert_not_called()
+
+    def test_bulk_create_overrides_audit_fields(self):
+        bob = KanBanUser.objects.create_user('bob', password='pw')
+        bob_url = self.url('users', bob.pk)
+        for name, parent in (('cards', 'container'), ('containers', 'board')):
+            pk = self.container.pk if parent == 'container' else self.board.pk
+            single = {
+                'name': 'single', parent: self.url(f'{parent}s', pk),
+                'created_by': bob_url, 'changed_by': bob_url,
+                'archived_by': bob_url,
+            }
+            response = self.client.post(f'/{name}/', single, format='json')
+            self.assertEqual(response.status_code, 201)
+            response = self.client.post(
+                f'/{name}/', [dict(single, name=f'row {i}') for i in range(2)],
+                format='json'
+            )
+            self.assertEqual(response.status_code, 201, response.data)
+        model_rows = (
+            list(Card.objects.all()) + list(Container.objects.exclude(
+                pk=self.container.pk
+            ))
+        )
+        self.assertEqual(len(model_rows), 6)
+        self.assertTrue(all(row.created_by == self.user for row in model_rows))
+
+    def test_single_create_still_works(self):
+        response = self.client.post('/cards/', {
+            'name': 'single',
+            'container': self.url('containers', self.container.pk)
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['position'], POSITION_GAP)
+
+    def test_bulk_create_validates_every_row(self):
+        response = self.client.post('/cards/', [
+            {'name': 'ok',
+             'container': self.url('containers', self.container.pk)},
+            {'name': 'no container'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Card.objects.exists())
+
+
+class PaginationTests(KanbanTestCase):
+
+    def test_walks_every_card_once_in_order(self):
+        done = Container.objects.create(
+            board=self.board, name='Done', created_by=self.user
+        )
+        self.make_cards(5)
+        self.make_cards(4, container=done)
+        url, seen = '/cards/?page_size=2', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen += [card['id'] for card in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, list(
+            Card.objects.order_by('container', 'position', 'id')
+            .values_list('id', flat=True)
+        ))
+
+    def test_deep_page_costs_the_same_as_the_first(self):
+        self.make_cards(6)
+        first = self.client.get('/cards/?page_size=2')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data['next'])
+        with self.assertNumQueries(len(queries)):
+            self.client.get('/cards/?page_size=2')
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/cards/?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+
+class SparseFieldsTests(KanbanTestCase):
+
+    def test_fields_limits_output_and_prefetches(self):
+        self.make_cards(3)
+        # the user's boards and the page only, no m2m prefetch queries
+        with self.assertNumQueries(2):
+            response = self.client.get('/cards/?fields=id,name')
+        self.assertEqual(
+            set(response.data['results'][0]), {'id', 'name'}
+        )
+
+    def test_fields_ignored_on_writes(self):
+        response = self.client.post('/cards/?fields=id', {
+            'name': 'new',
+            'container': f'http://testserver/containers/{self.container.pk}/'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('container', response.data)
+
+
+@override_settings(KANBAN_REQUEST_METRICS=True)
+class RequestMetricsTests(KanbanTestCase):
+
+    def test_server_timing_header_and_log_line(self):
+        self.make_cards(2)
+        with self.assertLogs('apps.kanban.metrics', 'INFO') as logs:
+            response = self.client.get('/normalized/')
+        timing = response['Server-Timing']
+        for name in ('db', 'serialize', 'view', 'total'):
+            self.assertIn(f'{name};dur=', timing)
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['path'], '/normalized/')
+        self.assertEqual(line['bytes'], len(response.content))
+        self.assertIn(f'desc="{line["queries"]} queries"', timing)
+        self.assertGreater(line['queries'], 0)
+
+    @override_settings(KANBAN_SLOW_QUERY_MS=0)
+    def test_slow_queries_are_logged_with_stack(self):
+        with self.assertLogs('apps.kanban.metrics', 'WARNING') as logs:
+            self.client.get('/boards/')
+        message = logs.records[1].getMessage()
+        self.assertIn('pagination.py', message)
+        self.assertNotIn('metrics.py', message)
+
+    @override_settings(KANBAN_REQUEST_METRICS=False)
+    def test_disabled_by_default(self):
+        response = self.client.get('/boards/')
+        self.assertNotIn('Server-Timing', response)
+
+
+class FlatSerializerTests(KanbanTestCase):
+
+    def setUp(self):
+        super().setUp()
+        label = Label.objects.create(board=self.board, name='bug')
+        tag = Tag.objects.create(user=self.user, name='home')
+        member = Member.objects.create(
+            board=self.board, user=self.user, position=0
+        )
+        Attachment.objects.create(
+            board=self.board, name='file', uploaded_by=self.user,
+            file_path='https://example.com/file'
+        )
+        self.container.labels.add(label)
+        for card in self.make_cards(2):
+            card.labels.add(label)
+            card.tags.add(tag)
+            card.assigned_users.add(member)
+        Card.objects.filter(pk=card.pk).update(hours='2.5', complexity=3)
+
+    def unlink(self, value):
+        """Turn hyperlinks into the primary keys they point at."""
+        if isinstance(value, list):
+            return [self.unlink(item) for item in value]
+        if isinstance(value, str) and value.startswith('http://testserver/'):
+            return int(value.rstrip('/').rsplit('/', 1)[1])
+        return value
+
+    def assert_same_rows(self, hyperlinked, flat):
+        for key, rows in hyperlinked.items():
+            if not isinstance(rows, list):
+                continue
+            expected = [
+                {name: self.unlink(value) for name, value in row.items()
+                 if name != 'url'}
+                for row in rows
+            ]
+            self.assertEqual(
+                json.loads(json.dumps(expected)), flat[key], key
+            )
+
+    def test_normalized_matches_hyperlinked_with_ids(self):
+        hyperlinked = self.client.get('/normalized/')
+        flat = self.client.get('/normalized/?flat=true')
+        self.assertEqual(flat.status_code, 200)
+        flat = json.loads(flat.content)
+        self.assertEqual(flat['cursor'][-1], 'Z')
+        self.assert_same_rows(json.loads(hyperlinked.content), flat)
+
+    def test_selected_by_accept_header(self):
+        response = self.client.get(
+            '/normalized/', HTTP_ACCEPT='application/json; flat=true'
+        )
+        self.assertEqual(
+            response.data['cards'][0]['container'], self.container.pk
+        )
+        self.assertIn('Accept', response['Vary'])
+        self.assertNotEqual(
+            response['ETag'], self.client.get('/normalized/')['ETag']
+        )
+
+    @override_settings(KANBAN_SYNC_OVERLAP=0)
+    def test_changes_and_snapshot(self):
+        cursor = self.client.get('/normalized/').data['cursor']
+        card = Card.objects.first()
+        card.name = 'renamed'
+        card.save()
+        changes = self.client.get(
+            '/normalized/', {'since': cursor, 'flat': 'true'}
+        ).data
+        self.assertEqual(
+            [card['name'] for card in changes['cards']], ['renamed']
+        )
+        url = f'/boards/{self.board.pk}/snapshot/'
+        self.assert_same_rows(
+            json.loads(self.client.get(url).content),
+            json.loads(self.client.get(url, {'flat': 'true'}).content)
+        )
+
+
+@override_settings(KANBAN_STREAM_CHUNK_SIZE=2)
+class StreamingExportTests(KanbanTestCase):
+
+    def setUp(self):
+        super().setUp()
+        label = Label.objects.create(board=self.board, name='bug')
+        for card in self.make_cards(5):
+            card.labels.add(label)
+
+    def streamed(self, query):
+        response = self.client.get(f'/normalized/?stream=true&{query}')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_matches_rendered_payload(self):
+        for query in ('', 'flat=true'):
+            rendered = json.loads(
+                self.client.get(f'/normalized/?{query}').content
+            )
+            streamed = self.streamed(query)
+            # taken when each request starts
+            rendered.pop('cursor')
+            streamed.pop('cursor')
+            self.assertEqual(streamed, rendered)
+
+    def test_relations_are_loaded_per_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.streamed('')
+        small = len(queries)
+        self.make_cards(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.streamed('')
+        # one more chunk of cards, one query each for its 4 relations
+        self.assertEqual(len(queries), small + 4)
+
+    def test_conditional_get(self):
+        etag = self.client.get('/normalized/?stream=true')['ETag']
+        response = self.client.get(
+            '/normalized/?stream=true', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class BoardSocketTests(KanbanTransactionTestCase):
+
+    def connect(self, path=None, token=None):
+        """Open a socket, returning (outbox, inbox, task)."""
+        if token is None:
+            token = str(AccessToken.for_user(self.user))
+        scope = {
+            'type': 'websocket',
+            'path': path or f'/ws/boards/{self.board.pk}/',
+            'query_string': f'token={token}'.encode(),
+        }
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        inbox.put_nowait({'type': 'websocket.connect'})
+        task = asyncio.ensure_future(
+            board_updates(scope, inbox.get, outbox.put)
+        )
+        return outbox, inbox, task
+
+    async def events(self, outbox, count):
+        messages = [
+            await asyncio.wait_for(outbox.get(), 2) for _ in range(count)
+        ]
+        return [json.loads(message['text']) for message in messages]
+
+    def test_card_events(self):
+        async def scenario():
+            outbox, inbox, task = self.connect()
+            self.assertEqual(
+                (await outbox.get())['type'], 'websocket.accept'
+            )
+            first, second = await sync_to_async(self.make_cards)(2)
+            second.position = 1
+            await sync_to_async(second.save)()
+            second.archived = True
+            await sync_to_async(second.save)()
+            events = await self.events(outbox, 4)
+            await inbox.put({'type': 'websocket.disconnect'})
+            await task
+            return first, second, events
+
+        first, second, events = async_to_sync(scenario)()
+        self.assertEqual(events, [
+            {'type': 'card.created', 'id': first.pk,
+             'container': self.container.pk, 'position': POSITION_GAP},
+            {'type': 'card.created', 'id': second.pk,
+             'container': self.container.pk, 'position': 2 * POSITION_GAP},
+            {'type': 'card.moved', 'id': second.pk,
+             'container': self.container.pk, 'position': 1},
+            {'type': 'card.archived', 'id': second.pk},
+        ])
+        self.assertEqual(get_broker().channels, {})
+
+    def test_bulk_move_sends_one_event(self):
+        cards = self.make_cards(2)
+
+        async def scenario():
+            outbox, inbox, task = self.connect()
+            await outbox.get()
+            await sync_to_async(bulk_move_cards)(
+                [(cards[1], self.container.pk, 1)]
+            )
+            (event,) = await self.events(outbox, 1)
+            await inbox.put({'type': 'websocket.disconnect'})
+            await task
+            return event
+
+        event = async_to_sync(scenario)()
+        self.assertEqual(event, {'type': 'cards.moved', 'cards': [
+            [cards[1].pk, self.container.pk, POSITION_GAP],
+            [cards[0].pk, self.container.pk, 2 * POSITION_GAP],
+        ]})
+
+    def test_rejects_other_users_and_bad_tokens(self):
+        other = KanBanUser.objects.create_user('bob', password='pw')
+
+        async def close_code(**kwargs):
+            outbox, inbox, task = self.connect(**kwargs)
+            await task
+            return (await outbox.get())['code']
+
+        self.assertEqual(async_to_sync(close_code)(
+            token=str(AccessToken.for_user(other))
+        ), 4403)
+        self.assertEqual(async_to_sync(close_code)(token='bogus'), 4403)
+        self.assertEqual(async_to_sync(close_code)(path='/ws/nope/'), 4404)
+
+
+class AsyncViewTests(KanbanTransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        label = Label.objects.create(board=self.board, name='bug')
+        for card in self.make_cards(3):
+            card.labels.add(label)
+
+    def test_normalized_matches_sync_view(self):
+        for query in ('', '?flat=true'):
+            sync = json.loads(self.client.get(f'/normalized/{query}').content)
+            response = self.client.get(f'/async/normalized/{query}')
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content)
+            data.pop('cursor')
+            sync.pop('cursor')
+            self.assertEqual(data, sync)
+
+    def test_list_and_retrieve_match_sync_views(self):
+        card = Card.objects.first()
+        for path in ('boards/', 'containers/', 'cards/', f'cards/{card.pk}/'):
+            self.assertEqual(
+                self.client.get(f'/async/{path}').data,
+                self.client.get(f'/{path}').data
+            )
+
+    def test_conditional_retrieve(self):
+        url = f'/async/boards/{self.board.pk}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/async/cards/').status_code, 401)
+        self.assertEqual(
+            self.client.get('/async/normalized/').status_code, 401
+        )
+
+    def test_worker_connections_follow_conn_max_age(self):
+        wrapper = type(connections['default'])
+        for max_age, closes in ((None, 0), (60, 0), (0, 1)):
+            with mock.patch.dict(connection.settings_dict,
+                                 CONN_MAX_AGE=max_age), \
+                    mock.patch.object(wrapper, 'close') as close:
+                # a fresh connection, as a new worker thread opens
+                async_to_sync(to_thread)(lambda: connection.connect())
+            self.assertEqual(close.call_count, closes)
+
+    @override_settings(KANBAN_REQUEST_METRICS=True)
+    def test_metrics_count_queries_of_worker_threads(self):
+        with self.assertLogs('apps.kanban.metrics', 'INFO') as logs:
+            self.client.get('/async/normalized/')
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['path'], '/async/normalized/')
+        # the ETag aggregates plus at least one query per entity list
+        self.assertGreater(line['queries'], 15)
+
+    def asgi_get(self, path, query_string=b''):
+        """The messages the deployed ASGI handler sends for a GET."""
+        token = str(AccessToken.for_user(self.user))
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': query_string, 'scheme': 'http',
+            'server': ('testserver', 80),
+            'headers': [(b'authorization', f'Bearer {token}'.encode())],
+        }
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        async_to_sync(ASGIHandler())(scope, receive, send)
+        return sent
+
+    @override_settings(KANBAN_REQUEST_METRICS=False, ALLOWED_HOSTS=['*'])
+    def test_served_by_asgi_handler(self):
+        sent = self.asgi_get('/async/cards/')
+        self.assertEqual(sent[0]['status'], 200)
+
+    @override_settings(KANBAN_REQUEST_METRICS=False, ALLOWED_HOSTS=['*'],
+                       KANBAN_STREAM_CHUNK_SIZE=2)
+    def test_streams_under_asgi(self):
+        self.make_cards(5)
+        expected = self.client.get('/normalized/').json()
+        for path in ('/normalized/', '/async/normalized/'):
+            sent = self.asgi_get(path, b'stream=true')
+            self.assertEqual(sent[0]['status'], 200)
+            # the body is sent in several parts and then closed
+            self.assertGreater(len(sent), 3)
+            self.assertFalse(sent[-1].get('more_body'))
+            payload = json.loads(b''.join(m.get('body', b'') for m in sent))
+            for key in ('cards', 'containers', 'boards'):
+                self.assertEqual(payload[key], expected[key])
+
+
+class CachedAuthenticationTests(KanbanTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+        # these tests change the user, the class fixture is shared
+        self.user = KanBanUser.objects.get(pk=self.user.pk)
+        self.token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/boards/')
+        self.assertEqual(response.status_code, 200)
+        return [
+            query for query in queries
+            if 'FROM "kanban_kanbanuser"' in query['sql']
+        ]
+
+    def test_user_is_loaded_once(self):
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries(), [])
+
+    def test_each_request_gets_its_own_instance(self):
+        auth = CachedJWTAuthentication()
+        first = auth.get_user(self.token)
+        first.first_name = 'changed'
+        self.assertEqual(auth.get_user(self.token).first_name, '')
+
+    def test_save_invalidates(self):
+        self.user_queries()
+        self.user.first_name = 'Alice'
+        self.user.save()
+        with self.assertNumQueries(1):
+            user = CachedJWTAuthentication().get_user(self.token)
+        self.assertEqual(user.first_name, 'Alice')
+
+    def test_deactivated_user_is_rejected(self):
+        self.user_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/boards/').status_code, 401)
+
+    def test_deleted_user_is_rejected(self):
+        self.user_queries()
+        self.user.delete()
+        self.assertEqual(self.client.get('/boards/').status_code, 401)
+
+    @override_settings(KANBAN_USER_CACHE='default')
+    def test_shared_cache_backs_the_lru(self):
+        cache_user(self.user.pk, self.user)
+        clear_user_cache()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_user(self.user.pk), self.user)
+
+    def test_lru_is_bounded(self):
+        users = UserCache(size=2, timeout=60)
+        users.set(1, 'a')
+        users.set(2, 'b')
+        users.get(1)
+        users.set(3, 'c')
+        self.assertEqual(
+            [users.get(1), users.get(2), users.get(3)], ['a', None, 'c']
+        )
+
+    def test_entries_expire(self):
+        users = UserCache(size=2, timeout=0)
+        users.set(1, 'a')
+        self.assertIsNone(users.get(1))
+
+
+class BoardPermissionTests(KanbanTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.bob = KanBanUser.objects.create_user('bob', password='pw')
+        cls.bobs_board = Board.objects.create(name='Bob', created_by=cls.bob)
+        cls.bobs_container = Container.objects.create(
+            board=cls.bobs_board, name='Doing', created_by=cls.bob
+        )
+        cls.bobs_card = Card.objects.create(
+            container=cls.bobs_container, name='secret', created_by=cls.bob
+        )
+
+    def ids(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data['results']}
+
+    def join(self):
+        Member.objects.create(board=self.bobs_board, user=self.user,
+                              position=1)
+
+    def test_rows_on_other_boards_are_hidden(self):
+        self.assertEqual(self.ids('/boards/'), {self.board.pk})
+        self.assertEqual(self.ids('/containers/'), {self.container.pk})
+        self.assertEqual(self.ids('/cards/'), set())
+        response = self.client.get(f'/cards/{self.bobs_card.pk}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_members_reach_the_board(self):
+        self.join()
+        self.assertEqual(
+            self.ids('/boards/'), {self.board.pk, self.bobs_board.pk}
+        )
+        self.assertEqual(self.ids('/cards/'), {self.bobs_card.pk})
+        response = self.client.get(f'/cards/{self.bobs_card.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_boards_are_resolved_once_per_request(self):
+        self.join()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f'/cards/{self.bobs_card.pk}/', {'name': 'renamed'}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sum('UNION' in query['sql'] for query in queries), 1
+        )
+
+    def test_cannot_write_to_other_boards(self):
+        response = self.client.post('/containers/', {
+            'board': f'http://testserver/boards/{self.bobs_board.pk}/',
+            'name': 'intruder',
+        })
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post('/cards/', [{
+            'name': 'intruder',
+            'container':
+                f'http://testserver/containers/{self.bobs_container.pk}/',
+        }], format='json')
+        self.assertEqual(response.status_code, 403)
+        (card,) = self.make_cards(1)
+        response = self.client.post('/cards/bulk-move/', [
+            {'card': card.pk, 'container': self.bobs_container.pk}
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.bobs_container.cards.filter(pk=card.pk))
+
+    def test_containers_cannot_take_cards(self):
+        board = f'http://testserver/boards/{self.board.pk}/'
+        card = f'http://testserver/cards/{self.bobs_card.pk}/'
+        response = self.client.post('/containers/', {
+            'board': board, 'name': 'single', 'cards': [card],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post('/containers/', [
+            {'board': board, 'name': 'bulk', 'cards': [card]},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.patch(
+            f'/containers/{self.container.pk}/', {'cards': [card]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            Card.objects.get(pk=self.bobs_card.pk).container_id,
+            self.bobs_container.pk
+        )
+
+    def test_cannot_link_rows_of_other_boards(self):
+        label = Label.objects.create(board=self.bobs_board, name='bobs')
+        tag = Tag.objects.create(user=self.bob, name='bobs')
+        attachment = Attachment.objects.create(
+            board=self.bobs_board, name='bobs', uploaded_by=self.bob,
+            file_path='https://example.com/file'
+        )
+        member = Member.objects.create(
+            board=self.bobs_board, user=self.bob, position=0
+        )
+        (card,) = self.make_cards(1)
+        links = {
+            'labels': f'http://testserver/labels/{label.pk}/',
+            'tags': f'http://testserver/tags/{tag.pk}/',
+            'attachments':
+                f'http://testserver/attachments/{attachment.pk}/',
+            'assigned_users': f'http://testserver/members/{member.pk}/',
+        }
+        for name, url in links.items():
+            response = self.client.patch(
+                f'/cards/{card.pk}/', {name: [url]}, format='json'
+            )
+            self.assertEqual(response.status_code, 400, name)
+            self.assertFalse(getattr(card, name).exists(), name)
+        for name in ('labels', 'tags'):
+            response = self.client.post('/containers/', [{
+                'board': f'http://testserver/boards/{self.board.pk}/',
+                'name': 'linked', name: [links[name]],
+            }], format='json')
+            self.assertEqual(response.status_code, 400, name)
+        # once a member of the board its labels can be used
+        self.join()
+        response = self.client.patch(
+            f'/cards/{card.pk}/', {'labels': [links['labels']]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(card.labels.all()), [label])
+
+    def test_tags_are_private(self):
+        Tag.objects.create(user=self.bob, name='bobs')
+        mine = Tag.objects.create(user=self.user, name='mine')
+        self.assertEqual(self.ids('/tags/'), {mine.pk})
+
+
+class HashingPoolTests(KanbanTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+        self.addCleanup(reset_pool)
+
+    def test_register_and_login_hash_on_the_pool(self):
+        response = self.client.post(
+            '/register/', {'username': 'carol', 'password': 'secret'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(get_pool.cache_info().currsize)
+        self.assertTrue(
+            KanBanUser.objects.get(username='carol').check_password('secret')
+        )
+        response = self.client.post(
+            '/token/', {'username': 'carol', 'password': 'secret'}
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            '/token/', {'username': 'carol', 'password': 'wrong'}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(KANBAN_HASHING_QUEUE_SIZE=1, KANBAN_HASHING_WAIT=0)
+    def test_full_queue_throttles(self):
+        reset_pool()
+        get_slots().acquire()
+        self.addCleanup(get_slots().release)
+        response = self.client.post(
+            '/register/', {'username': 'carol', 'password': 'secret'}
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertFalse(KanBanUser.objects.filter(username='carol'))
+        response = self.client.post(
+            '/token/', {'username': 'alice', 'password': 'pw'}
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # outside the API a full pool is a failed login, not an error
+        with self.assertRaises(PermissionDenied):
+            PooledModelBackend().authenticate(
+                None, username='alice', password='pw'
+            )
+        response = self.client.post(
+            '/admin/login/', {'username': 'alice', 'password': 'pw'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    @override_settings(KANBAN_HASHING_WORKERS=0, KANBAN_PBKDF2_ITERATIONS=1000)
+    def test_outdated_hashes_are_upgraded(self):
+        self.user.set_password('pw')
+        self.user.save()
+        with self.settings(KANBAN_PBKDF2_ITERATIONS=2000):
+            user = PooledModelBackend().authenticate(
+                None, username='alice', password='pw'
+            )
+            self.assertEqual(user, self.user)
+            self.assertIn('$2000$', user.password)
+        self.assertIsNone(PooledModelBackend().authenticate(
+            None, username='nobody', password='pw'
+        ))
+
+
+class SlugTests(KanbanTestCase):
+
+    def test_ulids_increase_within_a_millisecond(self):
+        ulids = [new_ulid() for _ in range(1000)]
+        self.assertEqual(ulids, sorted(set(ulids)))
+        self.assertTrue(all(len(ulid) == 26 for ulid in ulids))
+
+    def test_ulids_sort_by_time(self):
+        self.assertLess(ulid_at(1000, 2 ** 80 - 1), ulid_at(1001, 0))
+
+    def test_slugs_fit_the_field(self):
+        slug = make_slug('A very long name ' * 20)
+        self.assertLessEqual(len(slug), 120)
+        self.assertFalse(slug.endswith('-'))
+        self.assertEqual(len(make_slug('!!!')), 26)
+
+    def test_cards_with_one_name_get_distinct_slugs(self):
+        cards = self.make_cards(2) + bulk_create_auditable(
+            Card, [({'container': self.container, 'name': 'card 0'}, {}, None)
+                   for _ in range(50)], user=self.user
+        )
+        self.assertEqual(len({card.slug for card in cards}), 52)
+        self.assertRegex(cards[0].slug, r'^[0-9a-z]{26}-card-0$')
+
+
+class ArchiveTests(KanbanTestCase):
+
+    def post(self, path):
+        return self.client.post(path)
+
+    def test_archive_board_cascades_with_one_update_per_table(self):
+        self.make_cards(3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(f'/boards/{self.board.pk}/archive/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data, {'boards': 1, 'containers': 1, 'cards': 3}
+        )
+        # and one for the card stats bucket the cards leave
+        self.assertEqual(
+            sum(query['sql'].startswith('UPDATE') for query in queries), 4
+        )
+        self.assertFalse(Card.live.exists())
+        self.assertEqual(Card.objects.filter(archived=True).count(), 3)
+        board = Board.objects.get(pk=self.board.pk)
+        self.assertEqual(board.archived_by, self.user)
+        self.assertEqual(self.client.get('/boards/').data['results'], [])
+        self.assertEqual(self.client.get('/cards/').data['results'], [])
+
+    def test_unarchive_restores_what_was_archived_along(self):
+        first, second = self.make_cards(2)
+        first.archived = True
+        first.save()
+        self.post(f'/boards/{self.board.pk}/archive/')
+        response = self.post(f'/boards/{self.board.pk}/unarchive/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data, {'boards': 1, 'containers': 1, 'cards': 1}
+        )
+        self.assertEqual(list(Card.live.all()), [second])
+        self.assertTrue(Card.objects.get(pk=first.pk).archived)
+
+    def test_archive_container(self):
+        self.make_cards(2)
+        response = self.post(f'/containers/{self.container.pk}/archive/')
+        self.assertEqual(response.data, {'containers': 1, 'cards': 2})
+        self.assertEqual(self.client.get('/containers/').data['results'], [])
+        self.assertEqual(len(self.client.get('/boards/').data['results']), 1)
+        response = self.post(f'/containers/{self.container.pk}/archive/')
+        self.assertEqual(response.status_code, 400)
+        response = self.post(f'/containers/{self.container.pk}/unarchive/')
+        self.assertEqual(response.data, {'containers': 1, 'cards': 2})
+
+    def test_archived_card_stays_reachable(self):
+        (card,) = self.make_cards(1)
+        response = self.client.patch(f'/cards/{card.pk}/', {'archived': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/cards/').data['results'], [])
+        response = self.client.patch(f'/cards/{card.pk}/', {'name': 'old'})
+        self.assertEqual(response.status_code, 200)
+        response = self.post(f'/cards/{card.pk}/unarchive/')
+        self.assertEqual(response.data, {'cards': 1})
+        self.assertEqual(len(self.client.get('/cards/').data['results']), 1)
+        response = self.post(f'/cards/{card.pk}/archive/')
+        self.assertEqual(response.data, {'cards': 1})
+        self.assertEqual(rebuild_card_stats(), 0)
+
+    def test_archived_cards_keep_their_positions(self):
+        first, second = self.make_cards(2)
+        second.archived = True
+        second.save()
+        # placing a card counts the archived card's slot as taken
+        (third,) = self.make_cards(1)
+        third.position = second.position
+        third.save()
+        second.archived = False
+        second.save()
+        positions = list(
+            Card.objects.filter(container=self.container)
+            .values_list('position', flat=True)
+        )
+        self.assertEqual(len(set(positions)), 3)
+
+    def test_dumpdata_keeps_archived_rows(self):
+        (card,) = self.make_cards(1)
+        self.post(f'/boards/{self.board.pk}/archive/')
+        out = StringIO()
+        call_command('dumpdata', 'kanban.card', stdout=out)
+        self.assertEqual([row['pk'] for row in json.loads(out.getvalue())],
+                         [card.pk])
+
+    def test_unarchive_needs_an_archived_row(self):
+        response = self.post(f'/boards/{self.board.pk}/unarchive/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
+
+
+class ArchiveTierTests(KanbanTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.label = Label.objects.create(board=self.board, name='bug')
+        self.kept, self.old = self.make_cards(2)
+        self.old.content = 'the flaky login test'
+        self.old.archived = True
+        self.old.save()
+        self.old.labels.add(self.label)
+
+    def post(self, path):
+        return self.client.post(path)
+
+    def compact(self):
+        call_command('compact_archives', days=0, stdout=StringIO())
+
+    def test_compaction_moves_archived_cards_and_links(self):
+        self.compact()
+        self.assertEqual(list(Card.objects.all()), [self.kept])
+        archived = ArchivedCard.objects.get()
+        self.assertEqual(
+            (archived.id, archived.slug), (self.old.pk, self.old.slug)
+        )
+        self.assertEqual(archived.links, {'labels': [self.label.pk]})
+        self.assertFalse(Card.labels.through.objects.exists())
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_search_and_restore(self):
+        self.compact()
+        response = self.client.get('/archived-cards/?q=FLAKY')
+        self.assertEqual(
+            [row['id'] for row in response.data['results']], [self.old.pk]
+        )
+        self.assertEqual(
+            self.client.get('/archived-cards/?q=nothing').data['results'], []
+        )
+        response = self.post(f'/archived-cards/{self.old.pk}/restore/')
+        self.assertEqual(response.status_code, 201)
+        card = Card.objects.get(pk=self.old.pk)
+        self.assertEqual(card.slug, self.old.slug)
+        self.assertEqual(list(card.labels.all()), [self.label])
+        self.assertGreater(card.position, self.kept.position)
+        self.assertFalse(ArchivedCard.objects.exists())
+        self.assertEqual(rebuild_card_stats(), 0)
+
+    def test_compacted_cards_stay_sync_tombstones(self):
+        since = timezone.now() - timedelta(minutes=1)
+        self.compact()
+        response = self.client.get(
+            '/normalized/', {'since': since.isoformat()}
+        )
+        self.assertIn(self.old.pk, response.data['tombstones']['cards'])
+
+
+class CardSearchTests(KanbanTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.login, self.flaky = self.make_cards(2)
+        self.login.name = 'login form'
+        self.login.save()
+        self.flaky.content = 'the login test is flaky'
+        self.flaky.save()
+
+    def search(self, query, **params):
+        response = self.client.get('/cards/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(
+            self.search('login'), [self.login.pk, self.flaky.pk]
+        )
+        self.assertEqual(self.search('LOGIN', limit=1), [self.login.pk])
+        self.assertEqual(self.search('log'), [])
+        self.assertEqual(self.search('flaky login'), [self.flaky.pk])
+        self.assertEqual(self.search('login" (flaky*'), [self.flaky.pk])
+
+    def test_ranks_by_column_then_newest(self):
+        labelled, newer = self.make_cards(2)
+        labelled.labels.add(
+            Label.objects.create(board=self.board, name='login')
+        )
+        newer.content = 'login again'
+        newer.save()
+        self.assertEqual(self.search('login'), [
+            self.login.pk, labelled.pk, newer.pk, self.flaky.pk
+        ])
+        self.assertEqual(self.search('login', limit=2),
+                         [self.login.pk, labelled.pk])
+        # every word within the name, else within labels and tags
+        self.assertEqual(self.search('login form'), [self.login.pk])
+        self.assertEqual(self.search('login again'), [newer.pk])
+
+    @override_settings(KANBAN_SEARCH_RANKING='bm25')
+    def test_ranks_every_match_by_bm25(self):
+        newer = self.make_cards(3)
+        for card in newer:
+            card.content = 'see the login page'
+            card.save()
+        self.assertEqual(self.search('login', limit=1), [self.login.pk])
+        # only the newest matches are ranked when asked to, approximately
+        with self.settings(KANBAN_SEARCH_CANDIDATES=2):
+            self.assertEqual(
+                set(self.search('login')), {card.pk for card in newer[1:]}
+            )
+
+    def test_index_follows_changes(self):
+        card = Card.objects.get(pk=self.login.pk)
+        card.name = 'signup form'
+        card.save()
+        self.assertEqual(self.search('signup'), [card.pk])
+        label = Label.objects.create(board=self.board, name='urgent')
+        tag = Tag.objects.create(user=self.user, name='backend')
+        card.labels.add(label)
+        tag.card_set.add(card)
+        self.assertEqual(self.search('urgent'), [card.pk])
+        self.assertEqual(self.search('backend'), [card.pk])
+        label.name = 'blocker'
+        label.save()
+        self.assertEqual(self.search('urgent'), [])
+        self.assertEqual(self.search('blocker'), [card.pk])
+        tag.card_set.clear()
+        self.assertEqual(self.search('backend'), [])
+        label.delete()
+        self.assertEqual(self.search('blocker'), [])
+        card.delete()
+        self.assertEqual(self.search('signup'), [])
+
+    def test_index_follows_cards_to_other_boards(self):
+        board = Board.objects.create(name='Other', created_by=self.user)
+        container = Container.objects.create(
+            board=board, name='Done', created_by=self.user
+        )
+        bulk_move_cards([(self.login, container.pk, None)])
+        self.assertEqual(
+            get_backend().search('login', [board.pk], 20), [self.login.pk]
+        )
+        card = Card.objects.get(pk=self.flaky.pk)
+        card.container = container
+        card.save()
+        container.board = self.board
+        container.save()
+        self.assertEqual(
+            get_backend().search('login', [board.pk], 20), []
+        )
+
+    def test_bulk_created_cards_are_indexed(self):
+        container = f'http://testserver/containers/{self.container.pk}/'
+        response = self.client.post('/cards/', [
+            {'name': 'imported', 'container': container},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            self.search('imported'), [response.data[0]['id']]
+        )
+
+    def test_only_live_cards_on_own_boards(self):
+        bob = KanBanUser.objects.create_user('bob', password='pw')
+        board = Board.objects.create(name='Bob', created_by=bob)
+        container = Container.objects.create(
+            board=board, name='Todo', created_by=bob
+        )
+        Card.objects.create(
+            container=container, name='login secret', created_by=bob
+        )
+        Card.objects.filter(pk=self.flaky.pk).update(archived=True)
+        self.assertEqual(self.search('login'), [self.login.pk])
+
+    def test_seeded_cards_are_searchable(self):
+        call_command('seed_kanban', users=2, boards=1, containers=2,
+                     cards=5, prefix='s', stdout=StringIO())
+        user = KanBanUser.objects.get(username='s-user-0')
+        board_ids = set(board_ids_of(user))
+        expected = {
+            card.pk
+            for card in Card.live.filter(container__board__in=board_ids)
+            if 'fix' in terms_of(f'{card.name} {card.content}')
+        }
+        self.assertTrue(expected)
+        self.assertEqual(
+            set(get_backend().search('fix', board_ids, 100)), expected
+        )
+
+    def test_reindex_search_rebuilds_the_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM kanban_card_search')
+        self.assertEqual(self.search('login'), [])
+        out = StringIO()
+        call_command('reindex_search', stdout=out)
+        self.assertIn('indexed 2 cards', out.getvalue())
+        self.assertEqual(
+            self.search('login'), [self.login.pk, self.flaky.pk]
+        )
+
+    def test_rejects_empty_queries(self):
+        for params in ({'q': ' '}, {'q': 'login', 'limit': 0},
+                       {'q': 'login', 'limit': 'all'}):
+            response = self.client.get('/cards/search/', params)
+            self.assertEqual(response.status_code, 400)
+
+
+class CardStatsTests(KanbanTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.done = Container.objects.create(
+            board=self.board, name='Done', created_by=self.user
+        )
+        now = timezone.now()
+        self.late, self.due, self.undated = self.make_cards(3)
+        for card, end_time, hours in ((self.late, now - timedelta(days=2), 2),
+                                      (self.due, now + timedelta(days=2), 3),
+                                      (self.undated, None, 5)):
+            card.end_time, card.hours, card.complexity = end_time, hours, 1
+            card.save()
+
+    def stats(self):
+        response = self.client.get(f'/boards/{self.board.pk}/stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def totals(self, data):
+        return (data['cards'], data['complexity'], data['hours'],
+                data['overdue'])
+
+    def assertNoDrift(self):
+        self.assertEqual(rebuild_card_stats(), 0)
+
+    def test_totals_per_board_and_container(self):
+        data = self.stats()
+        self.assertEqual(self.totals(data), (3, '3.0000', '10.0000', 1))
+        self.assertEqual(
+            [(row['container'], self.totals(row))
+             for row in data['containers']],
+            [(self.container.pk, (3, '3.0000', '10.0000', 1))]
+        )
+        self.assertNoDrift()
+
+    def test_bulk_moving_archived_cards_leaves_totals(self):
+        archived = Card.objects.get(pk=self.late.pk)
+        archived.archived = True
+        archived.save()
+        bulk_move_cards([(archived, self.done.pk, None)])
+        containers = {
+            row['container']: self.totals(row)
+            for row in self.stats()['containers']
+        }
+        self.assertEqual(
+            containers, {self.container.pk: (2, '2.0000', '8.0000', 0)}
+        )
+        self.assertNoDrift()
+
+    def test_seeded_cards_are_totalled(self):
+        call_command('seed_kanban', users=2, boards=1, containers=2,
+                     cards=10, prefix='s', stdout=StringIO())
+        expected = {
+            (row['container_id'], row['due_date']): (
+                row['container__board_id'], row['cards'], row['complexity'],
+                row['hours']
+            )
+            for row in Card.objects.filter(archived=False)
+            .values('container_id', 'container__board_id',
+                    due_date=TruncDate('end_time'))
+            .annotate(cards=Count('id'), complexity=Sum('complexity'),
+                      hours=Sum('hours'))
+            .order_by()
+        }
+        self.assertGreater(len(expected), 3)
+        self.assertEqual({
+            (row.container_id, row.due_date): (
+                row.board_id, row.cards, row.complexity, row.hours
+            )
+            for row in CardStats.objects.all()
+        }, expected)
+
+    def test_follows_edits_moves_archives_and_deletes(self):
+        response = self.client.patch(
+            f'/cards/{self.due.pk}/',
+            {'hours': '4.5', 'end_time': '2000-01-01T00:00:00Z'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.totals(self.stats()), (3, '3.0000', '11.5000', 2)
+        )
+        self.assertNoDrift()
+        response = self.client.post('/cards/bulk-move/', [
+            {'card': self.late.pk, 'container': self.done.pk}
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        containers = {
+            row['container']: row['cards']
+            for row in self.stats()['containers']
+        }
+        self.assertEqual(containers, {self.container.pk: 2, self.done.pk: 1})
+        self.assertNoDrift()
+        card = Card.objects.get(pk=self.undated.pk)
+        card.archived = True
+        card.save()
+        self.assertEqual(
+            self.totals(self.stats()), (2, '2.0000', '6.5000', 2)
+        )
+        self.assertNoDrift()
+        self.client.post(f'/containers/{self.done.pk}/archive/')
+        self.assertEqual(self.stats()['cards'], 1)
+        self.assertNoDrift()
+        self.client.post(f'/containers/{self.done.pk}/unarchive/')
+        self.assertEqual(self.stats()['cards'], 2)
+        self.client.delete(f'/cards/{self.due.pk}/')
+        self.assertEqual(
+            self.totals(self.stats()), (1, '1.0000', '2.0000', 1)
+        )
+        self.assertNoDrift()
+        Container.objects.get(pk=self.done.pk).delete()
+        self.assertEqual(self.stats()['containers'], [])
+        self.assertNoDrift()
+
+    def test_bulk_created_cards_count(self):
+        container = f'http://testserver/containers/{self.done.pk}/'
+        response = self.client.post('/cards/', [
+            {'name': f'new {i}', 'container': container, 'hours': '1'}
+            for i in range(5)
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            self.totals(self.stats()), (8, '3.0000', '15.0000', 1)
+        )
+        self.assertNoDrift()
+
+    def test_reads_do_not_scale_with_cards(self):
+        self.stats()
+        with CaptureQueriesContext(connection) as few:
+            self.stats()
+        self.make_cards(20, container=self.done)
+        with CaptureQueriesContext(connection) as many:
+            self.stats()
+        self.assertEqual(len(few), len(many))
+
+    def test_reconcile_rebuilds_drifted_totals(self):
+        CardStats.objects.update(cards=99)
+        out = StringIO()
+        call_command('reconcile_stats', stdout=out)
+        self.assertIn('3 buckets were off', out.getvalue())
+        self.assertEqual(self.stats()['cards'], 3)
+
+    def test_other_boards_are_hidden(self):
+        bob = KanBanUser.objects.create_user('bob', password='pw')
+        board = Board.objects.create(name='Bob', created_by=bob)
+        response = self.client.get(f'/boards/{board.pk}/stats/')
+        self.assertEqual(response.status_code, 404)
+
+
+class BoardAnalyticsTests(KanbanTransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # (created, start, end, complexity, hours) on days of January 2026
+        rows = [
+            (1, (6, 0), (7, 0), 2, 3),
+            (1, (12, 0), (14, 0), 3, 1),
+            (8, None, (13, 0), 5, None),
+            (2, None, None, 1, None),
+            (2, None, 'later', 4, None),
+            (1, (6, 0), (6, 12), 1, None),
+        ]
+        for card, (created, start, end, complexity, hours) in zip(
+                self.make_cards(len(rows)), rows):
+            card.start_time = start and self.at(*start)
+            card.end_time = (
+                timezone.now() + timedelta(days=10) if end == 'later'
+                else end and self.at(*end)
+            )
+            card.complexity, card.hours = complexity, hours
+            card.save()
+            # created_time is auto_now_add, set it behind the model's back
+            Card.objects.filter(pk=card.pk).update(
+                created_time=self.at(created)
+            )
+        # the last card is archived and moved to the archive tier
+        card.refresh_from_db()
+        card.archived = True
+        card.save()
+        compact_cards([card.pk])
+        cache.clear()
+
+    def at(self, day, hour=0):
+        return timezone.make_aware(datetime(2026, 1, day, hour))
+
+    def analytics(self, **params):
+        return self.client.get(
+            f'/boards/{self.board.pk}/analytics/',
+            {'since': '2026-01-05', 'until': '2026-01-18', 'bin': 'week',
+             **params}
+        )
+
+    def test_series(self):
+        expected = {
+            'bins': ['2026-01-05', '2026-01-12'],
+            'throughput': [2, 2],
+            'velocity': [3.0, 8.0],
+            'hours': [3.0, 1.0],
+            'burndown': {'cards': [4, 2], 'complexity': [13.0, 5.0]},
+            'cycle_time': [18.0, 48.0],
+            'cycle_time_summary': {
+                'cards': 3, 'mean': 28.0, 'p50': 24.0, 'p85': 40.8,
+                'p95': 45.6
+            },
+        }
+        self.assertEqual(ArchivedCard.objects.count(), 1)
+        response = self.analytics()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: response.data[key] for key in expected}, expected
+        )
+        with mock.patch.object(analytics, 'numpy', None):
+            data = analytics.board_analytics(
+                self.board.pk, *analytics.parse_range(
+                    {'since': '2026-01-05', 'until': '2026-01-18'}
+                )
+            )
+        self.assertEqual({key: data[key] for key in expected}, expected)
+
+    def test_reads_do_not_scale_with_cards(self):
+        with CaptureQueriesContext(connection) as few:
+            self.analytics(bin='day')
+        cache.clear()
+        self.make_cards(20)
+        with CaptureQueriesContext(connection) as many:
+            self.analytics(bin='day')
+        self.assertEqual(len(few), len(many))
+
+    def test_cached_until_a_card_changes(self):
+        self.assertEqual(self.analytics()['X-Cache'], 'miss')
+        self.assertEqual(self.analytics()['X-Cache'], 'hit')
+        self.assertEqual(self.analytics(bin='day')['X-Cache'], 'miss')
+        card = Card.objects.filter(end_time__isnull=True).get()
+        card.end_time = self.at(15)
+        card.save()
+        response = self.analytics()
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual(response.data['throughput'], [2, 3])
+
+    def test_bad_parameters(self):
+        for params in ({'bin': 'year'}, {'since': 'soon'},
+                       {'until': '2026-02-30'},
+                       {'since': '2026-02-01', 'until': '2026-01-01'},
+                       {'since': '2000-01-01', 'bin': 'day'}):
+            response = self.analytics(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.data)
+
+    def test_months_and_defaults(self):
+        # cards done before the first bin are left out of every series
+        response = self.analytics(since='2026-01-12')
+        self.assertEqual(response.data['throughput'], [2])
+        self.assertEqual(response.data['burndown'],
+                         {'cards': [2], 'complexity': [5.0]})
+        response = self.analytics(since='2025-12-15', bin='month')
+        self.assertEqual(response.data['bins'], ['2025-12-01', '2026-01-01'])
+        self.assertEqual(response.data['throughput'], [0, 4])
+        response = self.client.get(f'/boards/{self.board.pk}/analytics/')
+        self.assertEqual(response.data['until'],
+                         timezone.localdate().isoformat())
+        self.assertEqual(response.data['bin'], 'week')
+
+    def test_other_boards_are_hidden(self):
+        bob = KanBanUser.objects.create_user('bob', password='pw')
+        board = Board.objects.create(name='Bob', created_by=bob)
+        response = self.client.get(f'/boards/{board.pk}/analytics/')
+        self.assertEqual(response.status_code, 404)
+
+
+class SeedCommandTests(KanbanTestCase):
+
+    def seed(self, prefix, seed=42):
+        out = StringIO()
+        call_command('seed_kanban', users=3, boards=2, containers=2, cards=10,
+                     labels=2, tags=2, members=1, seed=seed, prefix=prefix,
+                     stdout=out)
+        return out.getvalue().strip()
+
+    def rows(self, prefix):
+        return list(
+            Card.objects.filter(slug__startswith=f'{prefix}-')
+            .order_by('id').values_list('name', 'content', 'archived',
+                                        'complexity', 'hours')
+        )
+
+    def test_counts_every_seeded_row(self):
+        summary = self.seed('a', seed=7)
+        cards = Card.objects.filter(slug__startswith='a-')
+        # 3 users with 2 boards of 2 containers of 10 cards, archived too
+        self.assertEqual(cards.count(), 120)
+        self.assertTrue(cards.filter(archived=True).exists())
+        links = sum(
+            Card._meta.get_field(name).remote_field.through.objects
+            .filter(card__in=cards).count()
+            for name in ('labels', 'tags', 'assigned_users')
+        )
+        self.assertEqual(
+            summary,
+            f'3 users, 6 boards, 12 containers, 120 cards, 12 labels, '
+            f'6 tags, {links} card links'
+        )
+        with self.assertRaises(CommandError):
+            self.seed('a')
+
+    def test_same_seed_same_data(self):
+        self.seed('a')
+        self.seed('b')
+        self.seed('c', seed=1)
+        self.assertEqual(self.rows('a'), self.rows('b'))
+        self.assertNotEqual(self.rows('a'), self.rows('c'))
+
+    def test_bench_kanban_rolls_back(self):
+        self.seed('s')
+        cards = Card.objects.count()
+        out = StringIO()
+        # the test runner has set the test environment up already
+        with mock.patch.multiple(
+                'apps.kanban.management.commands.bench_kanban',
+                setup_test_environment=mock.DEFAULT,
+                teardown_test_environment=mock.DEFAULT):
+            call_command('bench_kanban', user='s-user-0', requests=2,
+                         warmup=0, stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(
+            set(results),
+            {'normalized', 'normalized_flat', 'board_list', 'card_create',
+             'card_move'}
+        )
+        self.assertEqual(results['card_create']['requests'], 2)
+        self.assertEqual(Card.objects.count(), cards)
+        with self.assertRaises(CommandError):
+            call_command('bench_kanban', user='s-user-0', requests=1,
+                         stdout=out)
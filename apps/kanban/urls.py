@@ -1,28 +1,45 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import (  # TokenVerifyView
-    TokenObtainPairView, TokenRefreshView)
+    TokenRefreshView)
 
-from .views import (AttachmentViewSet, BoardViewSet, CardViewSet,
-                    ContainerViewSet, KanBanUserViewSet, LabelViewSet,
-                    MemberViewSet, NormalizedView, Register, TagViewSet)
+from .async_views import AsyncNormalizedView, async_view
+from .views import (ArchivedCardViewSet, AttachmentViewSet, BoardViewSet,
+                    CardViewSet, ContainerViewSet, KanBanUserViewSet,
+                    LabelViewSet, MemberViewSet, NormalizedView, Register,
+                    TagViewSet, TokenObtainView)
 
 router = DefaultRouter()
 
 router.register(r'boards', BoardViewSet, basename='board')
 router.register(r'containers', ContainerViewSet)
 router.register(r'cards', CardViewSet)
+router.register(r'archived-cards', ArchivedCardViewSet)
 router.register(r'labels', LabelViewSet)
 router.register(r'attachments', AttachmentViewSet)
 router.register(r'members', MemberViewSet)
 router.register(r'users', KanBanUserViewSet)
 router.register(r'tags', TagViewSet)
 
+# async versions of the read endpoints, see .async_views
+async_urls = [
+    path('normalized/', async_view(AsyncNormalizedView.as_view())),
+]
+for prefix, viewset in [('boards', BoardViewSet),
+                        ('containers', ContainerViewSet),
+                        ('cards', CardViewSet)]:
+    async_urls += [
+        path(f'{prefix}/', async_view(viewset.as_view({'get': 'list'}))),
+        path(f'{prefix}/<int:pk>/',
+             async_view(viewset.as_view({'get': 'retrieve'}))),
+    ]
+
 urlpatterns = [
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/', TokenObtainView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('register/', Register.as_view(), name='register'),
     # path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
     path('normalized/', NormalizedView.as_view()),
+    path('async/', include(async_urls)),
     path('', include(router.urls))
 ]
@@ -1,99 +1,475 @@
 from rest_framework import viewsets, status
 from rest_framework.authentication import SessionAuthentication
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, Throttled
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
-from django.contrib.auth.hashers import make_password
+from rest_framework_simplejwt.views import TokenObtainPairView
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import IntegrityError
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_datetime
 
-from .models import (Attachment, Board, Card, Container, KanBanUser, Label,
-                     Member, Tag)
-from .serializers import (AttachmentSerializer, BoardSerializer,
-                          CardSerializer, ContainerSerializer,
+from .analytics import get_analytics, parse_range
+from .archives import restore_card
+from .authentication import CachedJWTAuthentication
+from .etags import board_etag, card_etag, normalized_etag
+from .flat import flat_data, wants_flat
+from .hashing import HashingBusy, hash_password
+from .models import (ArchivedCard, Attachment, Board, Card, Container,
+                     KanBanUser, Label, Member, Tag, Tombstone, board_stats,
+                     bulk_move_cards, set_archived)
+from .permissions import (BoardScopedMixin, IsBoardMember,
+                          accessible_board_ids)
+from .search import get_backend
+from .serializers import (FLAT_SERIALIZERS, ArchivedCardSerializer,
+                          AttachmentSerializer, BoardSerializer,
+                          BoardSnapshotSerializer, BoardStatsSerializer,
+                          CardMoveSerializer, CardSerializer,
+                          ChangesSerializer, ContainerSerializer,
                           KanBanUserSerializer, LabelSerializer,
                           MemberSerializer, NormalizedSerializer,
-                          TagSerializer)
+                          TagSerializer, requested_fields)
+from .snapshots import get_snapshot
+from .streaming import stream_entities, wants_stream
+
+
+# results of a card search, by default and at most
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+def serialize_entities(request, entities, serializer_class):
+    """
+    Render a payload of querysets with serializer_class, or as flat rows
+    when the request asks for them (see .flat).
+    """
+    if wants_flat(request):
+        return flat_data(entities, FLAT_SERIALIZERS)
+    return serializer_class(entities, context={'request': request}).data
+
+
+class ConditionalRetrieveMixin:
+    """
+    Answer a retrieve's If-None-Match with 304 before the object is
+    serialized. Subclasses set etag_func to one of the .etags helpers.
+    """
+    etag_func = None
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            etag = self.etag_func(
+                request, self.filter_queryset(self.get_queryset()), lookup
+            )
+        except ValueError:
+            # malformed lookup, let the normal path answer 404
+            etag = None
+        if etag is None:
+            return super().retrieve(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+
+class EagerLoadingMixin:
+    """Prefetch what the serializer renders, honouring ?fields=."""
+
+    def get_queryset(self):
+        return self.get_serializer_class().setup_eager_loading(
+            super().get_queryset(), requested_fields(self.request)
+        )
+
+
+class BulkCreateMixin:
+    """
+    Accept a list payload on create and insert the rows in bulk. The
+    response is a compact receipt per row, rendering every new row in full
+    would cost more than creating it.
+    """
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        instances = serializer.instance
+        view_name = f'{self.basename}-detail'
+        receipts = [
+            {
+                "url": reverse(view_name, args=[instance.pk], request=request),
+                "id": instance.pk,
+                "slug": instance.slug,
+                "position": instance.position,
+            }
+            for instance in instances
+        ]
+        return Response(receipts, status=status.HTTP_201_CREATED)
+
+
+class ArchiveMixin:
+    """
+    archive and unarchive actions cascading to every row on the object,
+    see set_archived. Lists leave archived rows out, the detail routes
+    still reach them so they can be read, edited and unarchived.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = queryset.filter(archived=False)
+        return queryset
+
+    @action(detail=True, methods=['post'])
+    def archive(self, request, pk=None):
+        """Archive this and everything on it."""
+        return self.set_archived(request, True)
+
+    @action(detail=True, methods=['post'])
+    def unarchive(self, request, pk=None):
+        """Restore this and the rows archived along with it."""
+        return self.set_archived(request, False)
+
+    def set_archived(self, request, archived):
+        instance = self.get_object()
+        if instance.archived == archived:
+            state = 'archived' if archived else 'not archived'
+            return Response(
+                {"error": f"{instance._meta.verbose_name} is already {state}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(set_archived(instance, archived, user=request.user))
 
 
-# TODO: be more granular with user level permissions here
-# TODO: implement user level permissions across all views/models
 class NormalizedView(APIView):
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated]
 
+    def serialize(self, request, entities, serializer_class):
+        return serialize_entities(request, entities, serializer_class)
+
     def get(self, request):
+        # taken before reading and reaching back KANBAN_SYNC_OVERLAP seconds:
+        # changed_time is stamped before a write commits, so a write still
+        # in flight now commits behind it. Rows in the overlap are sent
+        # again, clients upsert rows and tombstones by id
+        cursor = timezone.now() - timedelta(
+            seconds=getattr(settings, 'KANBAN_SYNC_OVERLAP', 30)
+        )
+        if 'since' in request.query_params:
+            return self.get_changes(request, cursor)
+        etag = normalized_etag(request)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        # only rows on boards the user can still reach, eager loading keeps
+        # the query count constant as accounts grow
+        board_ids = accessible_board_ids(request)
         entities = {
-            "boards": Board.objects.filter(created_by=request.user),
-            "containers": Container.objects.filter(created_by=request.user),
-            "cards": Card.objects.filter(created_by=request.user),
+            "boards": BoardSerializer.setup_eager_loading(
+                Board.live.filter(created_by=request.user)
+            ),
+            "containers": ContainerSerializer.setup_eager_loading(
+                Container.live.filter(
+                    created_by=request.user, board__in=board_ids
+                )
+            ),
+            "cards": CardSerializer.setup_eager_loading(
+                Card.live.filter(
+                    created_by=request.user, container__board__in=board_ids
+                )
+            ),
             "members": Member.objects.filter(user=request.user),
             "tags": Tag.objects.filter(user=request.user),
-            "labels": Label.objects.all(),
-            "attachments": Attachment.objects.filter(uploaded_by=request.user),
-            "users": KanBanUser.objects.filter(pk=request.user.pk)
+            "labels": Label.objects.filter(board__in=board_ids),
+            "attachments": Attachment.objects.filter(
+                uploaded_by=request.user, board__in=board_ids
+            ),
+            "users": KanBanUserSerializer.setup_eager_loading(
+                KanBanUser.objects.filter(pk=request.user.pk)
+            ),
+            "cursor": cursor
         }
-        serializer = NormalizedSerializer(
-            entities, context={'request': request}
+        if wants_stream(request):
+            response = StreamingHttpResponse(
+                stream_entities(request, entities, NormalizedSerializer),
+                content_type='application/json'
+            )
+            response['ETag'] = etag
+        else:
+            data = self.serialize(request, entities, NormalizedSerializer)
+            response = Response(data, headers={'ETag': etag})
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    def get_changes(self, request, cursor):
+        """Return only the boards, containers and cards changed since."""
+        try:
+            since = parse_datetime(request.query_params['since'])
+        except ValueError:
+            since = None
+        if since is None:
+            return Response(
+                {"error": "since must be a cursor from a previous response"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+        querysets = {
+            "boards": (BoardSerializer, Board, 'pk'),
+            "containers": (ContainerSerializer, Container, 'board'),
+            "cards": (CardSerializer, Card, 'container__board'),
+        }
+        board_ids = accessible_board_ids(request)
+        changes = {"tombstones": {}, "cursor": cursor}
+        for key, (serializer_class, model, board_lookup) in querysets.items():
+            # rows changed exactly at the cursor are sent twice rather than
+            # never, clients upsert by id
+            rows = model.objects.filter(
+                created_by=request.user, changed_time__gte=since
+            )
+            live = Q(archived=False, **{f'{board_lookup}__in': board_ids})
+            changes[key] = serializer_class.setup_eager_loading(
+                rows.filter(live)
+            )
+            # archived, or moved to a board the user can no longer reach
+            changes["tombstones"][key] = list(
+                rows.exclude(live).values_list('id', flat=True)
+            )
+        deleted = (
+            Tombstone.objects
+            .filter(created_by=request.user, deleted_time__gte=since)
+            .values_list('entity', 'object_id')
         )
-        return Response(serializer.data)
+        for entity, object_id in deleted:
+            changes["tombstones"][entity].append(object_id)
+        # cards moved to the archive tier were archived, so tombstones too
+        changes["tombstones"]["cards"] += (
+            ArchivedCard.objects
+            .filter(created_by=request.user, changed_time__gte=since)
+            .values_list('id', flat=True)
+        )
+        data = self.serialize(request, changes, ChangesSerializer)
+        response = Response(data)
+        patch_vary_headers(response, ['Accept'])
+        return response
 
 
-class BoardViewSet(viewsets.ModelViewSet):
+class BoardViewSet(ArchiveMixin, BoardScopedMixin, EagerLoadingMixin,
+                   ConditionalRetrieveMixin, viewsets.ModelViewSet):
+    queryset = Board.objects.all()
     serializer_class = BoardSerializer
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
-    permission_classes = [IsAuthenticated]
+    etag_func = staticmethod(board_etag)
+    ordering = ('id',)
+    board_lookup = 'pk'
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated, IsBoardMember]
 
-    def get_queryset(self):
-        return Board.objects.filter(created_by=self.request.user)
+    @action(detail=True)
+    def snapshot(self, request, pk=None):
+        """The board's containers, cards and labels, served from cache."""
+        board = self.get_object()
+
+        def build():
+            entities = {
+                "containers": ContainerSerializer.setup_eager_loading(
+                    Container.live.filter(board=board)
+                ),
+                "cards": CardSerializer.setup_eager_loading(
+                    Card.live.filter(container__board=board)
+                ),
+                "labels": Label.objects.filter(board=board),
+            }
+            return serialize_entities(
+                request, entities, BoardSnapshotSerializer
+            )
+
+        data, hit = get_snapshot(board.pk, request, build)
+        response = Response(
+            data, headers={'X-Cache': 'hit' if hit else 'miss'}
+        )
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        """Live card totals of the board and its containers."""
+        board = self.get_object()
+        return Response(BoardStatsSerializer(board_stats(board.pk)).data)
+
+    @action(detail=True)
+    def analytics(self, request, pk=None):
+        """
+        Throughput, velocity, burndown and cycle time of the board per
+        ?bin=day|week|month from ?since= to ?until=, served from cache.
+        """
+        board = self.get_object()
+        try:
+            since, until, size = parse_range(request.query_params)
+            data, hit = get_analytics(board.pk, since, until, size)
+        except ValueError as error:
+            return Response(
+                {"error": str(error)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(data, headers={'X-Cache': 'hit' if hit else 'miss'})
 
 
-class MemberViewSet(viewsets.ModelViewSet):
+class MemberViewSet(BoardScopedMixin, viewsets.ModelViewSet):
     queryset = Member.objects.all()
     serializer_class = MemberSerializer
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated, IsBoardMember]
 
 
-class ContainerViewSet(viewsets.ModelViewSet):
+class ContainerViewSet(ArchiveMixin, BoardScopedMixin, EagerLoadingMixin,
+                       BulkCreateMixin, viewsets.ModelViewSet):
     queryset = Container.objects.all()
     serializer_class = ContainerSerializer
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
-    permission_classes = [IsAuthenticated]
+    ordering = ('board', 'position', 'id')
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated, IsBoardMember]
 
 
-class CardViewSet(viewsets.ModelViewSet):
+class CardViewSet(ArchiveMixin, BoardScopedMixin, EagerLoadingMixin,
+                  BulkCreateMixin, ConditionalRetrieveMixin,
+                  viewsets.ModelViewSet):
     queryset = Card.objects.all()
     serializer_class = CardSerializer
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
-    permission_classes = [IsAuthenticated]
+    ordering = ('container', 'position', 'id')
+    etag_func = staticmethod(card_etag)
+    board_lookup = 'container__board'
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated, IsBoardMember]
 
+    @action(detail=False, methods=['post'], url_path='bulk-move')
+    def bulk_move(self, request):
+        """Move many cards at once, body is a list of card moves."""
+        moves = CardMoveSerializer(data=request.data, many=True)
+        moves.is_valid(raise_exception=True)
+        card_ids = [move['card'] for move in moves.validated_data]
+        if len(set(card_ids)) != len(card_ids):
+            return Response(
+                {"error": "a card can only be moved once per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        container_ids = {move['container'] for move in moves.validated_data}
+        cards = self.get_queryset().in_bulk(card_ids)
+        containers = Container.objects.filter(
+            board__in=accessible_board_ids(request)
+        ).in_bulk(container_ids)
+        if len(cards) != len(card_ids) or \
+                len(containers) != len(container_ids):
+            return Response(
+                {"error": "unknown card or container"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        moved = bulk_move_cards(
+            [(cards[move['card']], move['container'], move.get('position'))
+             for move in moves.validated_data],
+            user=request.user
+        )
+        serializer = self.get_serializer(moved, many=True)
+        return Response(serializer.data)
 
-class AttachmentViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        The live cards on the caller's boards matching ?q= in their name,
+        content, labels or tags, best match first, at most ?limit= of them.
+        """
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', SEARCH_LIMIT))
+        except ValueError:
+            limit = 0
+        if not query or not 0 < limit <= MAX_SEARCH_LIMIT:
+            return Response(
+                {"error": "q must be given and limit be between 1 and "
+                          f"{MAX_SEARCH_LIMIT}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        card_ids = get_backend().search(
+            query, accessible_board_ids(request), limit
+        )
+        cards = self.get_queryset().in_bulk(card_ids)
+        serializer = self.get_serializer(
+            [cards[card_id] for card_id in card_ids if card_id in cards],
+            many=True
+        )
+        return Response({"results": serializer.data})
+
+
+class ArchivedCardViewSet(BoardScopedMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Cards moved to the archive tier by compact_archives. ?q= finds the
+    cards whose name or content contains it.
+    """
+    queryset = ArchivedCard.objects.all()
+    serializer_class = ArchivedCardSerializer
+    ordering = ('container', 'position', 'id')
+    board_lookup = 'container__board'
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated, IsBoardMember]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        query = self.request.query_params.get('q')
+        if query:
+            queryset = queryset.filter(
+                Q(name__icontains=query) | Q(content__icontains=query)
+            )
+        return queryset
+
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        """Move the card back to its container, unarchived."""
+        card = restore_card(self.get_object(), user=request.user)
+        serializer = CardSerializer(
+            card, context=self.get_serializer_context()
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class AttachmentViewSet(BoardScopedMixin, viewsets.ModelViewSet):
     queryset = Attachment.objects.all()
     serializer_class = AttachmentSerializer
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated, IsBoardMember]
 
 
 class TagViewSet(viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        # tags are private to the user that created them
+        return super().get_queryset().filter(user=self.request.user)
+
 
-class LabelViewSet(viewsets.ModelViewSet):
+class LabelViewSet(BoardScopedMixin, viewsets.ModelViewSet):
     queryset = Label.objects.all()
     serializer_class = LabelSerializer
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
-    permission_classes = [IsAuthenticated]
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated, IsBoardMember]
 
 
-class KanBanUserViewSet(viewsets.ModelViewSet):
+class KanBanUserViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = KanBanUser.objects.all()
     serializer_class = KanBanUserSerializer
-    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated]
 
     # the following code is left only as a helpful reminder, it CAN be removed
@@ -110,6 +486,27 @@ class KanBanUserViewSet(viewsets.ModelViewSet):
     #         return [permission() for permission in self.permission_classes]
 
 
+def hashing_throttled(busy) -> Throttled:
+    """The 429 answering a request the hashing pool had no room for."""
+    return Throttled(wait=busy.wait, detail=str(busy))
+
+
+class TokenObtainView(TokenObtainPairView):
+    """
+    TokenObtainPairView answering with a 429 rather than a 401 when the
+    authentication backend found the hashing pool full.
+    """
+
+    def post(self, request, *args, **kwargs):
+        try:
+            return super().post(request, *args, **kwargs)
+        except AuthenticationFailed:
+            busy = getattr(request, '_kanban_hashing_busy', None)
+            if busy is None:
+                raise
+            raise hashing_throttled(busy)
+
+
 class Register(APIView):
     """View for new user registration"""
     permission_classes = [AllowAny]
@@ -130,7 +527,10 @@ class Register(APIView):
                 )
             else:
                 user.username = request.data['username']
-                user.password = make_password(request.data['password'])
+                try:
+                    user.password = hash_password(request.data['password'])
+                except HashingBusy as busy:
+                    raise hashing_throttled(busy)
                 user.save()
         except KeyError:
             # username or password weren't in the POST body
@@ -2,6 +2,7 @@
 ASGI config for base project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP is served by Django, WebSockets by apps.kanban.sockets.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
@@ -9,8 +10,22 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'base.settings')
 
-application = get_asgi_application()
+# what get_asgi_application() does, with a handler that can stream bodies
+# read from the database
+django.setup(set_prefix=False)
+
+# imported once the apps are loaded by django.setup()
+from apps.kanban.sockets import board_updates  # noqa: E402
+from apps.kanban.streaming import ASGIHandler  # noqa: E402
+
+django_application = ASGIHandler()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await board_updates(scope, receive, send)
+    return await django_application(scope, receive, send)
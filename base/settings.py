@@ -60,6 +60,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its timings cover the rest of the stack
+    'apps.kanban.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -70,6 +72,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Server-Timing headers and a log line per request with query counts and
+# db, serializer and view time, off unless KANBAN_REQUEST_METRICS=True
+try:
+    KANBAN_REQUEST_METRICS = os.environ['KANBAN_REQUEST_METRICS'] == 'True'
+except KeyError:
+    KANBAN_REQUEST_METRICS = False
+# while metrics are on, queries slower than this (ms) are logged with the
+# stack that issued them
+KANBAN_SLOW_QUERY_MS = 200
+
 ROOT_URLCONF = 'base.urls'
 
 TEMPLATES = [
@@ -102,6 +114,84 @@ DATABASES = {
 }
 
 
+# Caching
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# locmem is private to each process, configure a shared backend such as
+# memcached or redis in production so invalidations reach every worker
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# cache alias and lifetime (seconds) of serialized board snapshots
+KANBAN_SNAPSHOT_CACHE = 'default'
+KANBAN_SNAPSHOT_TIMEOUT = 300
+
+# rows read and rendered at a time by ?stream=true exports, keep it under
+# the database's limit on query parameters (999 on older SQLite)
+KANBAN_STREAM_CHUNK_SIZE = 500
+
+# fan out of board change events to WebSocket clients (see base/asgi.py);
+# the in-process broker only reaches sockets served by the same process
+KANBAN_REALTIME_BROKER = 'apps.kanban.realtime.InProcessBroker'
+# events buffered per socket before a slow client is told to resync
+KANBAN_REALTIME_QUEUE_SIZE = 100
+
+# users resolved from JWTs are kept in an in-process LRU of this many
+# entries for this many seconds, set KANBAN_USER_CACHE to a cache alias to
+# share them between processes as well
+KANBAN_USER_CACHE = None
+KANBAN_USER_CACHE_SIZE = 1024
+KANBAN_USER_CACHE_TIMEOUT = 60
+
+# sync cursors handed out by /normalized/ reach back this many seconds so
+# writes committing while it reads are sent next time, keep it above the
+# longest write transaction
+KANBAN_SYNC_OVERLAP = 30
+
+# card search (see apps.kanban.search), None picks SQLite FTS5, a Postgres
+# tsvector or a LIKE scan by database; SQLite ranks name, then label and
+# tag, then content matches, newest first, unless the ranking is 'bm25';
+# a number of candidates ranks only that many of a query's newest matches
+# by bm25, faster but approximate, None ranks them all
+KANBAN_SEARCH_BACKEND = None
+KANBAN_SEARCH_RANKING = 'columns'
+KANBAN_SEARCH_CANDIDATES = None
+
+# board analytics (see apps.kanban.analytics) are cached next to snapshots
+# for at most this many seconds, cards become done as their end_time passes
+KANBAN_ANALYTICS_TIMEOUT = 300
+
+# sessions are read through the cache, written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.1/topics/auth/passwords/
+# Register and token logins hash on a pool of niced processes (see
+# apps.kanban.hashing) so signup bursts don't starve the board APIs;
+# 0 workers hashes inline
+
+PASSWORD_HASHERS = [
+    'apps.kanban.hashing.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+KANBAN_PBKDF2_ITERATIONS = 216000
+
+AUTHENTICATION_BACKENDS = ['apps.kanban.backends.PooledModelBackend']
+
+KANBAN_HASHING_WORKERS = 1
+KANBAN_HASHING_NICE = 10
+# hashes in flight per web process, and how long (seconds) a caller waits
+# for room before it is throttled
+KANBAN_HASHING_QUEUE_SIZE = 16
+KANBAN_HASHING_WAIT = 1
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -156,15 +246,37 @@ MEDIA_URL = "/media/"
 
 # Django Rest Framework
 REST_FRAMEWORK = {
-    # Use Django's standard `django.contrib.auth` permissions,
-    # or allow read-only access for unauthenticated users.
+    # views set their own permission classes, board rows are scoped by
+    # membership in apps.kanban.permissions
     'DEFAULT_PERMISSION_CLASSES': [
-        # TODO: configure object level permissions
-        'rest_framework.permissions.DjangoModelPermissions'
+        'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ]
+        'apps.kanban.authentication.CachedJWTAuthentication',
+    ],
+    # keyset pagination, views order by their `ordering` attribute
+    'DEFAULT_PAGINATION_CLASS': 'apps.kanban.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
+}
+
+
+# Logging
+# https://docs.djangoproject.com/en/3.1/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'apps.kanban': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
 }
 
 